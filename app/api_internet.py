@@ -1,9 +1,27 @@
-import os, json, re, requests
+import os, json, re, time, hashlib, unicodedata
 from typing import List, Dict, Any, Optional
 
+from .cache import TTLCache
+from .metrics import register_gauge
+from .normalize import normalize_item
+from .connectors import transport
+from .timing import stage
+from .log import get_logger
+
+log = get_logger("api_internet")
+
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "").strip()
-GROQ_ENDPOINT = "https://api.groq.com/openai/v1/chat/completions"
+# Endpoint compatible con OpenAI; bench/ lo apunta a un Groq falso local
+GROQ_ENDPOINT = os.getenv("SEAC_GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+# Techo del timeout de la búsqueda de productos (el efectivo se adapta; ver connectors/breaker.py)
+GROQ_TIMEOUT = float(os.getenv("SEAC_GROQ_TIMEOUT", "60"))
+
+# Caché de listas de productos (memoria TTL+LRU y, opcionalmente, disco)
+CACHE_TTL = float(os.getenv("SEAC_GROQ_CACHE_TTL", "900"))
+CACHE_SIZE = int(os.getenv("SEAC_GROQ_CACHE_SIZE", "256"))
+CACHE_BUDGET_BUCKET = float(os.getenv("SEAC_GROQ_CACHE_BUCKET", "50"))
+CACHE_DIR = os.getenv("SEAC_GROQ_CACHE_DIR", "").strip()
 
 SYSTEM_PROMPT = (
     "Eres un experto en tecnología. Devuelve una lista JSON llamada 'laptops' o 'productos', "
@@ -12,11 +30,7 @@ SYSTEM_PROMPT = (
     "para qué tipo de usuario o tarea es ideal, y sus ventajas principales."
 )
 
-def _call_groq_json(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-    if not GROQ_API_KEY:
-        print("[api_internet] ⚠️ Falta GROQ_API_KEY en .env")
-        return []
-
+def _build_request(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None):
     prefs_text = json.dumps(preferencias or {}, ensure_ascii=False)
     user_prompt = (
         f"Necesito laptops para {uso}, con un presupuesto máximo de {presupuesto} USD. "
@@ -33,61 +47,171 @@ def _call_groq_json(uso: str, presupuesto: float, preferencias: Optional[Dict[st
         ],
         "response_format": {"type": "json_object"}
     }
+    return headers, body
 
+def _parse_response(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+
+    if "```" in content:
+        content = re.sub(r"^```(json)?", "", content, flags=re.IGNORECASE).replace("```", "").strip()
+
+    parsed = json.loads(content)
+    if isinstance(parsed, dict):
+        for k in ("laptops", "productos"):
+            if k in parsed:
+                parsed = parsed[k]
+                break
+    if isinstance(parsed, dict):
+        parsed = [parsed]
+
+    log.info("groq.products", "Productos recibidos desde Groq", count=len(parsed))
+    return parsed
+
+def _call_groq_json(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    if not GROQ_API_KEY and not transport.get_transport().offline:
+        log.warning("groq.no_key", "Falta GROQ_API_KEY en .env")
+        return []
+
+    headers, body = _build_request(uso, presupuesto, preferencias)
     try:
-        r = requests.post(GROQ_ENDPOINT, headers=headers, json=body, timeout=60)
+        r = transport.post(GROQ_ENDPOINT, headers, body, timeout=GROQ_TIMEOUT, op="products")
         r.raise_for_status()
-        data = r.json()
-        content = data.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+        return _parse_response(r.json())
 
-        if "```" in content:
-            content = re.sub(r"^```(json)?", "", content, flags=re.IGNORECASE).replace("```", "").strip()
+    except transport.CircuitOpen:
+        log.info("groq.circuit_open", "Circuito de Groq abierto; se usa el catálogo local")
+        return []
+    except Exception as e:
+        log.error("groq.error", f"Error al consultar Groq: {e}", error=type(e).__name__)
+        return []
 
-        parsed = json.loads(content)
-        if isinstance(parsed, dict):
-            for k in ("laptops", "productos"):
-                if k in parsed:
-                    parsed = parsed[k]
-                    break
-        if isinstance(parsed, dict):
-            parsed = [parsed]
+async def _call_groq_json_async(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    if not GROQ_API_KEY and not transport.get_transport().offline:
+        log.warning("groq.no_key", "Falta GROQ_API_KEY en .env")
+        return []
 
-        print(f"[api_internet] ✅ {len(parsed)} productos recibidos desde Groq.")
-        return parsed
+    headers, body = _build_request(uso, presupuesto, preferencias)
+    try:
+        r = await transport.apost(GROQ_ENDPOINT, headers, body, timeout=GROQ_TIMEOUT, op="products")
+        r.raise_for_status()
+        return _parse_response(r.json())
 
+    except transport.CircuitOpen:
+        log.info("groq.circuit_open", "Circuito de Groq abierto; se usa el catálogo local")
+        return []
     except Exception as e:
-        print(f"[api_internet] ❌ Error: {e}")
+        log.error("groq.error", f"Error al consultar Groq: {e}", error=type(e).__name__)
         return []
 
-def _normalize_item(p: Dict[str, Any]) -> Dict[str, Any]:
-    def g(k, *alts): 
-        for key in (k,) + alts:
-            if key in p and p[key] not in (None, ""):
-                return str(p[key])
-        return ""
-    def num_price(v):
-        try:
-            return float(str(v).replace("$", "").replace(",", "").strip())
-        except:
-            return 0.0
-
-    return {
-        "marca": g("marca", "brand"),
-        "modelo": g("modelo", "name"),
-        "procesador": g("cpu"),
-        "tarjeta_grafica": g("gpu"),
-        "memoria_ram": g("ram"),
-        "almacenamiento": g("almacenamiento", "storage"),
-        "sistema_operativo": g("sistema_operativo", "os"),
-        "precio": num_price(p.get("precio", p.get("price", 0))),
-        "descripcion": g("descripcion", "description"),
-        "link": g("link", "url"),
+_normalize_item = normalize_item  # ver app/normalize.py
+
+# ------------------------------------------------------
+# Caché de respuestas de Groq
+# ------------------------------------------------------
+def _canon(text: str) -> str:
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().split())
+
+def cache_key(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None) -> str:
+    """Forma canónica de (uso, tramo de presupuesto, preferencias)."""
+    bucket = int(round(float(presupuesto or 0) / CACHE_BUDGET_BUCKET)) if CACHE_BUDGET_BUCKET > 0 else float(presupuesto or 0)
+    prefs = {
+        _canon(k): (_canon(v) if isinstance(v, str) else v)
+        for k, v in (preferencias or {}).items()
+        if v not in (None, "")
     }
+    return f"{_canon(uso)}|{bucket}|{json.dumps(prefs, sort_keys=True)}"
 
-def fetch_products_from_internet(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None, max_items: int = 8) -> List[Dict[str, Any]]:
-    raw = _call_groq_json(uso, presupuesto, preferencias)
+
+class _DiskTier:
+    """Un archivo JSON por clave; sobrevive a reinicios del proceso."""
+
+    def __init__(self, directory: str, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("key") != key or time.time() - float(data.get("ts", 0)) > self.ttl:
+            return None
+        return data.get("items")
+
+    def set(self, key: str, items: List[Dict[str, Any]]):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "ts": time.time(), "items": items}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.warning("cache.disk_write_failed", f"No se pudo escribir la caché en disco: {e}")
+
+
+_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+_disk = _DiskTier(CACHE_DIR, CACHE_TTL) if CACHE_DIR else None
+_disk_hits = 0
+
+def cache_stats() -> Dict[str, Any]:
+    stats = _cache.stats()
+    stats["disk_enabled"] = _disk is not None
+    stats["disk_hits"] = _disk_hits
+    return stats
+
+register_gauge("seac_cache", cache_stats, "Estadísticas de las cachés en memoria", labels={"cache": "groq"})
+
+def _cache_get(key: str) -> Optional[List[Dict[str, Any]]]:
+    global _disk_hits
+    items = _cache.get(key)
+    if items is None and _disk is not None:
+        items = _disk.get(key)
+        if items is not None:
+            _disk_hits += 1
+            _cache.set(key, items)
+    return items
+
+def _cache_set(key: str, items: List[Dict[str, Any]]):
+    _cache.set(key, items)
+    if _disk is not None:
+        _disk.set(key, items)
+
+def _from_cache(key: str, max_items: int) -> Optional[List[Dict[str, Any]]]:
+    cached = _cache_get(key)
+    if cached is None:
+        return None
+    log.info("groq.cache_hit", "Productos servidos desde caché", count=len(cached))
+    return [dict(x) for x in cached[:max_items]]
+
+def _store(key: str, raw: List[Dict[str, Any]], max_items: int) -> List[Dict[str, Any]]:
     if not raw:
-        print("[api_internet] ⚠️ No se obtuvieron productos válidos de Groq.")
+        log.warning("groq.empty", "No se obtuvieron productos válidos de Groq")
         return []
     out = [_normalize_item(x) for x in raw if isinstance(x, dict)]
-    return out[:max_items]
\ No newline at end of file
+    if out:
+        _cache_set(key, out)
+    return [dict(x) for x in out[:max_items]]
+
+def fetch_products_from_internet(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None, max_items: int = 8) -> List[Dict[str, Any]]:
+    key = cache_key(uso, presupuesto, preferencias)
+    cached = _from_cache(key, max_items)
+    if cached is not None:
+        return cached
+    with stage("groq"):
+        raw = _call_groq_json(uso, presupuesto, preferencias)
+    return _store(key, raw, max_items)
+
+async def fetch_products_from_internet_async(uso: str, presupuesto: float, preferencias: Optional[Dict[str, Any]] = None, max_items: int = 8) -> List[Dict[str, Any]]:
+    key = cache_key(uso, presupuesto, preferencias)
+    cached = _from_cache(key, max_items)
+    if cached is not None:
+        return cached
+    with stage("groq"):
+        raw = await _call_groq_json_async(uso, presupuesto, preferencias)
+    return _store(key, raw, max_items)
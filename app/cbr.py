@@ -1,23 +1,110 @@
-from typing import Dict, Any, List
-from .persistence_sql import load_history
+# =====================================================
+# SEAC v1.6 — Razonamiento basado en casos (CBR)
+# =====================================================
+# Índice en memoria de los casos "me gusta" (rating ≥ 0.8) agrupados por uso
+# y ordenados por presupuesto. La similitud promedio se calcula con búsqueda
+# binaria + sumas prefijas de 1/presupuesto, sin leer el historial por consulta.
+import os
+import threading
+import time
+from bisect import bisect_right, insort
+from itertools import accumulate
+from typing import Dict, Any, List, Optional
+from .db import get_conn
 
-def calcular_similitud(query: Dict[str, Any]) -> float:
-    hist = load_history()
-    if not hist:
-        return 0.0
+LIKE_THRESHOLD = 0.8
+# Recarga completa periódica para ver feedback escrito por otros procesos (s)
+CBR_TTL = float(os.getenv("SEAC_CBR_TTL", "300"))
+
+
+class _Bucket:
+    """Presupuestos (> 0) de los casos de un mismo uso, ordenados."""
+
+    __slots__ = ("budgets", "_inv_prefix")
+
+    def __init__(self):
+        self.budgets: List[float] = []
+        self._inv_prefix: Optional[List[float]] = None
+
+    def add(self, presupuesto: float):
+        insort(self.budgets, presupuesto)
+        self._inv_prefix = None
+
+    def mean_similarity(self, nuevo: float) -> float:
+        """
+        Promedio de max(0, 1 - |nuevo - ant| / ant) sobre todos los casos:
+          ant ≤ nuevo/2        → 0
+          nuevo/2 < ant ≤ nuevo → 2 - nuevo/ant
+          ant > nuevo          → nuevo/ant
+        """
+        n = len(self.budgets)
+        if self._inv_prefix is None:
+            self._inv_prefix = [0.0] + list(accumulate(1.0 / b for b in self.budgets))
+        pre = self._inv_prefix
+        lo = bisect_right(self.budgets, nuevo / 2)
+        mid = bisect_right(self.budgets, nuevo)
+        total = 2.0 * (mid - lo) - nuevo * (pre[mid] - pre[lo]) + nuevo * (pre[n] - pre[mid])
+        return max(0.0, min(1.0, total / n))
+
+
+class CBRIndex:
+    def __init__(self):
+        self._buckets: Dict[str, _Bucket] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
 
+    def _reload_locked(self):
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+            SELECT f.uso, s.presupuesto
+            FROM feedback f
+            JOIN sessions s ON s.session_id = f.session_id
+            WHERE f.rating >= ? AND s.presupuesto > 0;
+            """, (LIKE_THRESHOLD,))
+            rows = cur.fetchall()
+        buckets: Dict[str, List[float]] = {}
+        for uso, presupuesto in rows:
+            buckets.setdefault(uso, []).append(float(presupuesto))
+        self._buckets = {}
+        for uso, budgets in buckets.items():
+            b = _Bucket()
+            b.budgets = sorted(budgets)
+            self._buckets[uso] = b
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded_locked(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > CBR_TTL:
+            self._reload_locked()
+
+    def add_case(self, uso: str, presupuesto: float, rating: float):
+        if float(rating or 0) < LIKE_THRESHOLD or not presupuesto or presupuesto <= 0:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                return  # se leerá completo en la primera consulta
+            self._buckets.setdefault(uso, _Bucket()).add(float(presupuesto))
+
+    def similarity(self, uso: str, presupuesto: float) -> float:
+        with self._lock:
+            self._ensure_loaded_locked()
+            bucket = self._buckets.get(uso)
+            if not bucket or not bucket.budgets or presupuesto <= 0:
+                return 0.0
+            return bucket.mean_similarity(presupuesto)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+_index = CBRIndex()
+
+def register_case(uso: str, presupuesto: float, rating: float):
+    """Agrega un caso recién registrado al índice (llamar tras insertar feedback)."""
+    _index.add_case(uso, presupuesto, rating)
+
+def calcular_similitud(query: Dict[str, Any]) -> float:
     uso_actual = query.get("uso", "default")
     presupuesto_nuevo = float(query.get("presupuesto", 0) or 0.0)
-    similares: List[float] = []
-
-    for h in hist:
-        if h.get("uso") == uso_actual and float(h.get("rating",0)) >= 0.8:
-            pres_ant = float(h.get("presupuesto") or 0.0)
-            if pres_ant > 0 and presupuesto_nuevo > 0:
-                sim = 1 - abs(presupuesto_nuevo - pres_ant) / pres_ant
-                sim = max(0.0, min(1.0, sim))
-                similares.append(sim)
-
-    if not similares:
-        return 0.0
-    return round(sum(similares) / len(similares), 3)
\ No newline at end of file
+    return round(_index.similarity(uso_actual, presupuesto_nuevo), 3)
@@ -0,0 +1,28 @@
+# =====================================================
+# SEAC v1.7 — Cliente HTTP asíncrono compartido (httpx)
+# =====================================================
+import os
+from typing import Optional
+
+import httpx
+
+# Conexiones simultáneas máximas hacia APIs externas (Groq)
+HTTP_MAX_CONNECTIONS = int(os.getenv("SEAC_HTTP_MAX_CONNECTIONS", "20"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_async_client() -> httpx.AsyncClient:
+    """Cliente reutilizable (keep-alive) creado al primer uso dentro del event loop."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                                max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+        )
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
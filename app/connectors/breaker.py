@@ -0,0 +1,179 @@
+# =====================================================
+# SEAC v1.8 — Circuit breaker y timeouts adaptativos para Groq
+# =====================================================
+# Lo usa el transporte (connectors/transport.py), así que vale para api_internet
+# y llm_groq a la vez:
+#   - CircuitBreaker: ventana de las últimas llamadas; se abre si la fracción de
+#     fallos (timeouts, red, 429/5xx) o de llamadas lentas supera el umbral.
+#     Abierto → las llamadas fallan al instante (CircuitOpen) y los llamadores
+#     usan el catálogo local / llm_stub. Tras el enfriamiento pasa a semiabierto
+#     y deja pasar unas pocas llamadas de prueba: si responden bien se cierra,
+#     si fallan vuelve a abrirse.
+#   - AdaptiveTimeout: timeout por operación = factor × percentil observado de la
+#     latencia, entre un mínimo y el techo que pasa el llamador (el antiguo fijo).
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Tuple
+
+from ..log import get_logger
+
+log = get_logger("breaker")
+
+BREAKER = os.getenv("SEAC_GROQ_BREAKER", "1") == "1"
+BREAKER_WINDOW = int(os.getenv("SEAC_GROQ_BREAKER_WINDOW", "20"))          # últimas llamadas evaluadas
+BREAKER_MIN_CALLS = int(os.getenv("SEAC_GROQ_BREAKER_MIN_CALLS", "5"))     # mínimo para decidir
+BREAKER_ERROR_RATE = float(os.getenv("SEAC_GROQ_BREAKER_ERROR_RATE", "0.5"))
+BREAKER_SLOW_MS = float(os.getenv("SEAC_GROQ_BREAKER_SLOW_MS", "10000"))   # llamada "lenta"
+BREAKER_SLOW_RATE = float(os.getenv("SEAC_GROQ_BREAKER_SLOW_RATE", "0.8"))
+BREAKER_COOLDOWN = float(os.getenv("SEAC_GROQ_BREAKER_COOLDOWN", "15"))    # segundos abierto
+BREAKER_PROBES = int(os.getenv("SEAC_GROQ_BREAKER_PROBES", "1"))           # pruebas en semiabierto
+
+TIMEOUT_ADAPTIVE = os.getenv("SEAC_GROQ_TIMEOUT_ADAPTIVE", "1") == "1"
+TIMEOUT_QUANTILE = float(os.getenv("SEAC_GROQ_TIMEOUT_QUANTILE", "0.99"))
+TIMEOUT_FACTOR = float(os.getenv("SEAC_GROQ_TIMEOUT_FACTOR", "2"))
+TIMEOUT_MIN = float(os.getenv("SEAC_GROQ_TIMEOUT_MIN", "2"))               # segundos
+TIMEOUT_MIN_SAMPLES = int(os.getenv("SEAC_GROQ_TIMEOUT_MIN_SAMPLES", "20"))
+TIMEOUT_WINDOW = int(os.getenv("SEAC_GROQ_TIMEOUT_WINDOW", "200"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_CODE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, name: str = "groq", enabled: bool = BREAKER, window: int = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS, error_rate: float = BREAKER_ERROR_RATE,
+                 slow_ms: float = BREAKER_SLOW_MS, slow_rate: float = BREAKER_SLOW_RATE,
+                 cooldown: float = BREAKER_COOLDOWN, probes: int = BREAKER_PROBES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.enabled = enabled
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_s = slow_ms / 1000
+        self.slow_rate = slow_rate
+        self.cooldown = cooldown
+        self.probes = max(1, probes)
+        self._clock = clock
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=max(1, window))  # (fallo, lenta)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = 0
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "short_circuited": 0, "probes": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._tick()
+            return self._state
+
+    def _tick(self):
+        if self._state == OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probing = 0
+            log.info("breaker.half_open", "Enfriamiento cumplido; se prueba de nuevo", breaker=self.name)
+
+    def _open(self, motivo: str):
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._calls.clear()
+        self.stats["opened"] += 1
+        log.warning("breaker.open", f"Circuito abierto ({motivo}); se responde sin llamar durante "
+                    f"{self.cooldown:.0f}s", breaker=self.name, reason=motivo)
+
+    def acquire(self) -> bool:
+        """True si la llamada puede salir (prueba o normal); False si hay que cortocircuitarla."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            self._tick()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probing < self.probes:
+                self._probing += 1
+                self.stats["probes"] += 1
+                return True
+            self.stats["short_circuited"] += 1
+            return False
+
+    def record(self, ok: bool, seconds: float):
+        if not self.enabled:
+            return
+        lenta = seconds >= self.slow_s
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = max(0, self._probing - 1)
+                if ok and not lenta:
+                    self._state = CLOSED
+                    self._calls.clear()
+                    log.info("breaker.closed", "La llamada de prueba respondió; circuito cerrado", breaker=self.name)
+                else:
+                    self._open("falló la llamada de prueba")
+                return
+            if self._state == OPEN:
+                return  # respuesta tardía de una llamada anterior a la apertura
+            self._calls.append((not ok, lenta))
+            n = len(self._calls)
+            if n < self.min_calls:
+                return
+            fallos = sum(1 for f, _ in self._calls if f) / n
+            lentas = sum(1 for _, s in self._calls if s) / n
+            if fallos >= self.error_rate:
+                self._open(f"{fallos:.0%} de fallos")
+            elif lentas >= self.slow_rate:
+                self._open(f"{lentas:.0%} de llamadas lentas")
+
+    def release(self):
+        """Llamada sin resultado útil (cassette faltante, cancelada): libera su cupo de prueba."""
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = max(0, self._probing - 1)
+
+    def describe(self) -> Dict[str, object]:
+        with self._lock:
+            self._tick()
+            return {"state": self._state, "state_code": _STATE_CODE[self._state],
+                    "window_calls": len(self._calls), **self.stats}
+
+
+class AdaptiveTimeout:
+    """Timeout = factor × percentil de las latencias recientes, acotado a [floor, techo]."""
+
+    def __init__(self, enabled: bool = TIMEOUT_ADAPTIVE, quantile: float = TIMEOUT_QUANTILE,
+                 factor: float = TIMEOUT_FACTOR, floor: float = TIMEOUT_MIN,
+                 min_samples: int = TIMEOUT_MIN_SAMPLES, window: int = TIMEOUT_WINDOW):
+        self.enabled = enabled
+        self.quantile = quantile
+        self.factor = factor
+        self.floor = floor
+        self.min_samples = max(1, min_samples)
+        self._samples: Deque[float] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+        self._last = 0.0
+
+    def observe(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self) -> float:
+        with self._lock:
+            datos = sorted(self._samples)
+        if not datos:
+            return 0.0
+        return datos[min(len(datos) - 1, int(self.quantile * len(datos)))]
+
+    def current(self, ceiling: float) -> float:
+        """Timeout para la próxima llamada; sin muestras suficientes, el techo del llamador."""
+        t = ceiling
+        if self.enabled and len(self._samples) >= self.min_samples:
+            t = min(ceiling, max(self.floor, self.factor * self.percentile()))
+        self._last = t
+        return t
+
+    def describe(self) -> Dict[str, float]:
+        return {"timeout_seconds": self._last, "latency_percentile_seconds": self.percentile(),
+                "latency_samples": len(self._samples)}
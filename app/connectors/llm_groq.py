@@ -1,15 +1,34 @@
-import os, requests
+import os, hashlib
 
-def summarize_reasons_groq(name: str, reasons: list[str], uso: str = "") -> str:
-    """
-    Genera una explicación más extensa (2-3 oraciones) en español natural sobre por qué este producto es recomendable.
-    Usa Groq (Llama 3.3-70B) con un tono profesional y descriptivo.
-    """
+from ..cache import TTLCache
+from ..metrics import register_gauge
+from . import transport
+from .llm_stub import summarize_reasons
 
-    api_key = os.getenv("GROQ_API_KEY")
-    if not api_key:
-        return f"{name}: no se encontró GROQ_API_KEY en el entorno."
+# Caché de explicaciones: (producto, uso, razones) → texto. Nunca guarda mensajes de error.
+EXPLAIN_CACHE_TTL = float(os.getenv("SEAC_EXPLAIN_CACHE_TTL", "86400"))
+EXPLAIN_CACHE_SIZE = int(os.getenv("SEAC_EXPLAIN_CACHE_SIZE", "2048"))
+
+_explain_cache = TTLCache(maxsize=EXPLAIN_CACHE_SIZE, ttl=EXPLAIN_CACHE_TTL)
+
+def explain_cache_key(name: str, reasons: list[str], uso: str = "") -> tuple:
+    digest = hashlib.sha1("\n".join(reasons).encode("utf-8")).hexdigest()
+    return (" ".join((name or "").lower().split()), " ".join((uso or "").lower().split()), digest)
+
+def explain_cache_stats() -> dict:
+    return _explain_cache.stats()
 
+register_gauge("seac_cache", explain_cache_stats, "Estadísticas de las cachés en memoria", labels={"cache": "explain"})
+
+def is_cached(name: str, reasons: list[str], uso: str = "") -> bool:
+    return explain_cache_key(name, reasons, uso) in _explain_cache
+
+# Mismo endpoint que api_internet (SEAC_GROQ_ENDPOINT)
+GROQ_ENDPOINT = os.getenv("SEAC_GROQ_ENDPOINT", "https://api.groq.com/openai/v1/chat/completions")
+# Techo del timeout por explicación (el efectivo se adapta; ver connectors/breaker.py)
+EXPLAIN_TIMEOUT = float(os.getenv("SEAC_EXPLAIN_TIMEOUT", "25"))
+
+def _build_request(name: str, reasons: list[str], uso: str, api_key: str):
     # Nuevo prompt ampliado
     prompt = f"""
 Eres un experto en tecnología que redacta reseñas profesionales y concisas.
@@ -28,36 +47,78 @@ Requisitos:
 Ejemplo de estilo:
 "La ASUS ROG Zephyrus G14 ofrece gran potencia con su procesador Ryzen 9 y GPU RTX 4060. Ideal para jugadores y diseñadores que buscan equilibrio entre rendimiento y portabilidad, con un diseño elegante y compacto."
 """
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    body = {
+        "model": "llama-3.3-70b-versatile",
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": 0.8,
+        "max_tokens": 120,
+    }
+    return headers, body
+
+def _parse_response(name: str, data: dict, key: tuple) -> str:
+    if "error" in data:
+        return f"{name}: error de Groq API → {data['error'].get('message', str(data))}"
 
+    if "choices" in data and data["choices"]:
+        texto = data["choices"][0]["message"]["content"].strip()
+        texto = texto.replace("\n", " ").replace('"', "").strip()
+        if texto:
+            _explain_cache.set(key, texto)
+        return texto
+
+    return f"{name}: respuesta inesperada de Groq."
+
+def summarize_reasons_groq(name: str, reasons: list[str], uso: str = "") -> str:
+    """
+    Genera una explicación más extensa (2-3 oraciones) en español natural sobre por qué este producto es recomendable.
+    Usa Groq (Llama 3.3-70B) con un tono profesional y descriptivo.
+    Las respuestas válidas se guardan en caché por (producto, uso, razones).
+    """
+
+    api_key = os.getenv("GROQ_API_KEY") or ""
+    if not api_key and not transport.get_transport().offline:
+        return f"{name}: no se encontró GROQ_API_KEY en el entorno."
+
+    key = explain_cache_key(name, reasons, uso)
+    cached = _explain_cache.get(key)
+    if cached is not None:
+        return cached
+
+    headers, body = _build_request(name, reasons, uso, api_key)
+    try:
+        response = transport.post(GROQ_ENDPOINT, headers, body, timeout=EXPLAIN_TIMEOUT, op="explain")
+        return _parse_response(name, response.json(), key)
+
+    except transport.CircuitOpen:
+        return summarize_reasons(name, reasons)
+    except transport.TransportTimeout:
+        return f"{name}: tiempo de espera agotado con Groq."
+    except Exception as e:
+        return f"{name}: error general con Groq ({e})."
+
+async def summarize_reasons_groq_async(name: str, reasons: list[str], uso: str = "") -> str:
+    """Versión asíncrona de summarize_reasons_groq (mismo prompt, misma caché)."""
+    api_key = os.getenv("GROQ_API_KEY") or ""
+    if not api_key and not transport.get_transport().offline:
+        return f"{name}: no se encontró GROQ_API_KEY en el entorno."
+
+    key = explain_cache_key(name, reasons, uso)
+    cached = _explain_cache.get(key)
+    if cached is not None:
+        return cached
+
+    headers, body = _build_request(name, reasons, uso, api_key)
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "llama-3.3-70b-versatile",
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.8,
-                "max_tokens": 120,
-            },
-            timeout=25,
-        )
-
-        data = response.json()
-
-        if "error" in data:
-            return f"{name}: error de Groq API → {data['error'].get('message', str(data))}"
-
-        if "choices" in data and data["choices"]:
-            texto = data["choices"][0]["message"]["content"].strip()
-            texto = texto.replace("\n", " ").replace('"', "").strip()
-            return texto
-
-        return f"{name}: respuesta inesperada de Groq."
-
-    except requests.exceptions.Timeout:
+        response = await transport.apost(GROQ_ENDPOINT, headers, body, timeout=EXPLAIN_TIMEOUT, op="explain")
+        return _parse_response(name, response.json(), key)
+
+    except transport.CircuitOpen:
+        return summarize_reasons(name, reasons)
+    except transport.TransportTimeout:
         return f"{name}: tiempo de espera agotado con Groq."
     except Exception as e:
-        return f"{name}: error general con Groq ({e})."
\ No newline at end of file
+        return f"{name}: error general con Groq ({e})."
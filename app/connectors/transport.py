@@ -0,0 +1,333 @@
+# =====================================================
+# SEAC v1.8 — Transporte de las llamadas al LLM (live / record / replay)
+# =====================================================
+# Todas las peticiones a Groq (api_internet y llm_groq) pasan por aquí:
+#   live   → HTTP real (requests / cliente httpx compartido)
+#   record → HTTP real y guarda cada par petición/respuesta en un "cassette"
+#   replay → responde desde los cassettes, sin red, con latencia, variación y
+#            fallos sintéticos reproducibles (semilla fija)
+# Un cassette es un JSON por petición en SEAC_LLM_CASSETTE_DIR, nombrado por el
+# SHA-1 del cuerpo canónico (sin cabeceras: la API key nunca se guarda).
+# En los tres modos cada llamada pasa por el circuit breaker y usa un timeout
+# adaptativo por operación ("products", "explain"); ver connectors/breaker.py.
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+
+from ..metrics import GROQ_ERRORS, GROQ_REQUESTS, register_gauge
+from .async_http import get_async_client
+from .breaker import AdaptiveTimeout, CircuitBreaker
+
+MODES = ("live", "record", "replay")
+
+
+class TransportError(RuntimeError):
+    """Fallo del transporte (red, cassette faltante o fallo inyectado)."""
+
+
+class TransportTimeout(TransportError, TimeoutError):
+    """La petición superó su timeout (real o simulado)."""
+
+
+class CassetteMiss(TransportError):
+    """Modo replay sin cassette para esta petición."""
+
+
+class CircuitOpen(TransportError):
+    """Circuito abierto: la llamada no sale y el llamador usa su respaldo local."""
+
+
+class HTTPStatusError(TransportError):
+    def __init__(self, status_code: int, data: Any):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.data = data
+
+
+class LLMResponse:
+    """Respuesta mínima con la misma forma que usan los llamadores (status_code, json(), raise_for_status())."""
+
+    __slots__ = ("status_code", "_data", "source")
+
+    def __init__(self, status_code: int, data: Any, source: str):
+        self.status_code = status_code
+        self._data = data
+        self.source = source  # "live" | "replay"
+
+    def json(self) -> Any:
+        return self._data
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise HTTPStatusError(self.status_code, self._data)
+
+
+class Transport:
+    def __init__(self, mode: str = "live", cassette_dir: str = "cassettes", latency_ms: Optional[float] = 0.0,
+                 jitter_ms: float = 0.0, failure_rate: float = 0.0, failure_kind: str = "500",
+                 seed: Optional[int] = None, on_miss: str = "error", breaker: Optional[CircuitBreaker] = None):
+        if mode not in MODES:
+            raise ValueError(f"Modo de transporte desconocido: {mode!r} (usar {', '.join(MODES)}).")
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.latency_ms = latency_ms        # None → la latencia grabada en el cassette
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.failure_kind = failure_kind    # "timeout" | "429" | "500"
+        self.on_miss = on_miss              # "error" | "live" (y grabar)
+        self._rnd = random.Random(seed)
+        self._rnd_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"live": 0, "recorded": 0, "replayed": 0, "misses": 0, "injected_failures": 0}
+        self.breaker = breaker or CircuitBreaker()
+        self._timeouts: Dict[str, AdaptiveTimeout] = {}
+
+    @property
+    def offline(self) -> bool:
+        """En replay no se necesita API key ni red."""
+        return self.mode == "replay" and self.on_miss == "error"
+
+    # --- cassettes ---
+    @staticmethod
+    def cassette_key(body: Dict[str, Any]) -> str:
+        canon = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha1(canon.encode("utf-8")).hexdigest()
+
+    def _path(self, body: Dict[str, Any]) -> str:
+        return os.path.join(self.cassette_dir, self.cassette_key(body) + ".json")
+
+    def load(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(body), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, url: str, body: Dict[str, Any], status_code: int, data: Any, elapsed_ms: float):
+        os.makedirs(self.cassette_dir, exist_ok=True)
+        path = self._path(body)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "request": body, "status": status_code, "response": data,
+                       "elapsed_ms": round(elapsed_ms, 1), "recorded_at": time.time()},
+                      f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+        self._count("recorded")
+
+    # --- replay ---
+    def _plan(self, cassette: Optional[Dict[str, Any]]):
+        """(segundos de espera, fallo inyectado o None) para una respuesta de replay."""
+        with self._rnd_lock:
+            base = self.latency_ms
+            if base is None:
+                base = float((cassette or {}).get("elapsed_ms", 0.0))
+            delay = max(0.0, base + self._rnd.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fallo = self.failure_kind if self._rnd.random() < self.failure_rate else None
+        return delay, fallo
+
+    def _replay_prepare(self, body: Dict[str, Any], timeout: float):
+        """(cassette, fallo, latencia, segundos a esperar) o None si falta el cassette y on_miss=live."""
+        cassette = self.load(body)
+        if cassette is None:
+            self._count("misses")
+            if self.on_miss != "live":
+                raise CassetteMiss(f"Sin cassette para la petición {self.cassette_key(body)[:12]} en {self.cassette_dir}")
+            return None
+        delay, fallo = self._plan(cassette)
+        if fallo:
+            self._count("injected_failures")
+        espera = timeout if fallo == "timeout" else min(delay, timeout)
+        return cassette, fallo, delay, espera
+
+    def _replay_result(self, cassette: Dict[str, Any], fallo: Optional[str], delay: float,
+                       timeout: float) -> LLMResponse:
+        if fallo == "timeout" or delay > timeout:
+            raise TransportTimeout(f"timeout simulado ({timeout:.0f}s)")
+        if fallo is not None:
+            return LLMResponse(int(fallo), {"error": {"message": f"fallo inyectado ({fallo})"}}, "replay")
+        self._count("replayed")
+        return LLMResponse(int(cassette.get("status", 200)), cassette.get("response"), "replay")
+
+    # --- API ---
+    # 'timeout' es el techo; el efectivo lo ajusta AdaptiveTimeout según la latencia de 'op'.
+    def post(self, url: str, headers: Dict[str, str], body: Dict[str, Any], timeout: float,
+             op: str = "llm") -> LLMResponse:
+        timeout = self._begin(op, timeout)
+        t0 = time.perf_counter()
+        resultado = None
+        try:
+            resultado = self._post(url, headers, body, timeout)
+            return self._metered(resultado)
+        except TransportError as e:
+            resultado = e
+            self._metered_error(e)
+            raise
+        finally:
+            self._settle(op, resultado, time.perf_counter() - t0, timeout)
+
+    async def apost(self, url: str, headers: Dict[str, str], body: Dict[str, Any], timeout: float,
+                    op: str = "llm") -> LLMResponse:
+        timeout = self._begin(op, timeout)
+        t0 = time.perf_counter()
+        resultado = None
+        try:
+            resultado = await self._apost(url, headers, body, timeout)
+            return self._metered(resultado)
+        except TransportError as e:
+            resultado = e
+            self._metered_error(e)
+            raise
+        finally:
+            self._settle(op, resultado, time.perf_counter() - t0, timeout)
+
+    # --- breaker y timeouts ---
+    def timeout(self, op: str) -> AdaptiveTimeout:
+        t = self._timeouts.get(op)
+        if t is None:
+            t = self._timeouts.setdefault(op, AdaptiveTimeout())
+        return t
+
+    def _begin(self, op: str, ceiling: float) -> float:
+        if not self.breaker.acquire():
+            GROQ_ERRORS.inc("circuit_open")
+            raise CircuitOpen(f"circuito '{self.breaker.name}' abierto")
+        return self.timeout(op).current(ceiling)
+
+    def _settle(self, op: str, resultado, elapsed: float, timeout: float):
+        """Informa el resultado al breaker y la latencia al timeout adaptativo de 'op'."""
+        if isinstance(resultado, LLMResponse):
+            self.timeout(op).observe(elapsed)
+            self.breaker.record(resultado.status_code != 429 and resultado.status_code < 500, elapsed)
+        elif isinstance(resultado, TransportTimeout):
+            self.timeout(op).observe(timeout)  # latencia censurada: al menos el timeout
+            self.breaker.record(False, elapsed)
+        elif isinstance(resultado, TransportError) and not isinstance(resultado, CassetteMiss):
+            self.breaker.record(False, elapsed)
+        else:
+            self.breaker.release()  # sin dato sobre Groq (cassette faltante, cancelación)
+
+    def _post(self, url: str, headers: Dict[str, str], body: Dict[str, Any], timeout: float) -> LLMResponse:
+        plan = self._replay_prepare(body, timeout) if self.mode == "replay" else None
+        if plan is not None:
+            cassette, fallo, delay, espera = plan
+            time.sleep(espera)
+            return self._replay_result(cassette, fallo, delay, timeout)
+
+        t0 = time.perf_counter()
+        try:
+            r = requests.post(url, headers=headers, json=body, timeout=timeout)
+        except requests.exceptions.Timeout as e:
+            raise TransportTimeout(str(e)) from e
+        except requests.exceptions.RequestException as e:
+            raise TransportError(str(e)) from e
+        return self._live_result(url, body, r.status_code, r, (time.perf_counter() - t0) * 1000)
+
+    async def _apost(self, url: str, headers: Dict[str, str], body: Dict[str, Any], timeout: float) -> LLMResponse:
+        plan = self._replay_prepare(body, timeout) if self.mode == "replay" else None
+        if plan is not None:
+            cassette, fallo, delay, espera = plan
+            await asyncio.sleep(espera)
+            return self._replay_result(cassette, fallo, delay, timeout)
+
+        t0 = time.perf_counter()
+        try:
+            r = await get_async_client().post(url, headers=headers, json=body, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise TransportTimeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+        return self._live_result(url, body, r.status_code, r, (time.perf_counter() - t0) * 1000)
+
+    def _live_result(self, url: str, body: Dict[str, Any], status_code: int, r, elapsed_ms: float) -> LLMResponse:
+        self._count("live")
+        try:
+            data = r.json()
+        except ValueError:
+            data = {"error": {"message": f"respuesta no JSON (HTTP {status_code})"}}
+        # Solo se graban respuestas correctas: un replay no debe reproducir un 429 puntual
+        if self.mode in ("record", "replay") and status_code < 400:
+            self.save(url, body, status_code, data, elapsed_ms)
+        return LLMResponse(status_code, data, "live")
+
+    @staticmethod
+    def _metered(r: LLMResponse) -> LLMResponse:
+        GROQ_REQUESTS.inc(r.source, r.status_code)
+        if r.status_code >= 400:
+            GROQ_ERRORS.inc("http")
+        return r
+
+    @staticmethod
+    def _metered_error(e: TransportError):
+        if isinstance(e, TransportTimeout):
+            GROQ_ERRORS.inc("timeout")
+        elif isinstance(e, CassetteMiss):
+            GROQ_ERRORS.inc("cassette_miss")
+        else:
+            GROQ_ERRORS.inc("network")
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def describe(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return {"mode": self.mode, "cassette_dir": self.cassette_dir, **stats,
+                "breaker": self.breaker.describe()["state"],
+                "timeouts": {op: round(t.describe()["timeout_seconds"], 2) for op, t in list(self._timeouts.items())}}
+
+
+def _latency_env() -> Optional[float]:
+    v = os.getenv("SEAC_LLM_REPLAY_LATENCY", "0").strip().lower()
+    return None if v == "recorded" else float(v)
+
+
+def _from_env() -> Transport:
+    seed = os.getenv("SEAC_LLM_REPLAY_SEED", "").strip()
+    return Transport(
+        mode=os.getenv("SEAC_LLM_TRANSPORT", "live").strip().lower(),
+        cassette_dir=os.getenv("SEAC_LLM_CASSETTE_DIR", "cassettes"),
+        latency_ms=_latency_env(),
+        jitter_ms=float(os.getenv("SEAC_LLM_REPLAY_JITTER", "0")),
+        failure_rate=float(os.getenv("SEAC_LLM_FAILURE_RATE", "0")),
+        failure_kind=os.getenv("SEAC_LLM_FAILURE_KIND", "500").strip().lower(),
+        seed=int(seed) if seed else None,
+        on_miss=os.getenv("SEAC_LLM_REPLAY_MISS", "error").strip().lower(),
+    )
+
+
+_transport = _from_env()
+register_gauge("seac_llm_transport", lambda: _transport.stats, "Contadores del transporte de Groq (live/record/replay)")
+register_gauge("seac_groq_breaker", lambda: _transport.breaker.describe(),
+               "Circuit breaker de Groq (state_code: 0 cerrado, 1 semiabierto, 2 abierto)")
+for _op in ("products", "explain"):
+    register_gauge("seac_groq", lambda op=_op: _transport.timeout(op).describe(),
+                   "Timeout adaptativo de Groq por operación", labels={"op": _op})
+
+
+def get_transport() -> Transport:
+    return _transport
+
+
+def configure(**kwargs) -> Transport:
+    """Reemplaza el transporte activo (pruebas y bench): configure(mode="replay", cassette_dir=..., latency_ms=50)."""
+    global _transport
+    _transport = Transport(**kwargs)
+    return _transport
+
+
+def post(url: str, headers: Dict[str, str], body: Dict[str, Any], timeout: float, op: str = "llm") -> LLMResponse:
+    return _transport.post(url, headers, body, timeout, op)
+
+
+async def apost(url: str, headers: Dict[str, str], body: Dict[str, Any], timeout: float,
+                op: str = "llm") -> LLMResponse:
+    return await _transport.apost(url, headers, body, timeout, op)
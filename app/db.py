@@ -1,151 +1,269 @@
 # =====================================================
-# SEAC v1.3 — Base de datos SQL Server (autoinicialización)
+# SEAC v1.3 — Base de datos: pool y transacciones (el esquema, en app/migrations.py)
 # =====================================================
+# El motor (SQL Server o SQLite) lo elige app/storage según SEAC_DB_BACKEND.
+import asyncio
+import contextvars
+import functools
 import os
-import pyodbc
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
-# Cadena de conexión: lee del entorno o usa un valor por defecto
-SQLSERVER_CONN = os.getenv(
-    "SEAC_SQLSERVER_CONN",
-    "DRIVER={ODBC Driver 17 for SQL Server};SERVER=localhost\\SQLEXPRESS;DATABASE=SEACDB;Trusted_Connection=yes;TrustServerCertificate=yes;"
-)
+from .storage import get_storage
+from .metrics import register_gauge
+from .profiling import span
+from .log import get_logger
+
+log = get_logger("db")
+
+# Motor configurado (SEAC_DB_BACKEND): conexión, esquema y sentencias propias de cada BD
+storage = get_storage()
+DB_ERRORS = storage.Error
 
 # -----------------------------------------------------
-# Función auxiliar para reemplazar base de datos en cadena
+# Pool de conexiones
 # -----------------------------------------------------
-def _conn_replace_db(conn_str: str, new_db: str) -> str:
-    parts = conn_str.split(";")
-    out = []
-    db_set = False
-    for p in parts:
-        if not p:
-            continue
-        kv = p.split("=", 1)
-        if len(kv) == 2 and kv[0].strip().lower() in ("database", "initial catalog"):
-            out.append(f"DATABASE={new_db}")
-            db_set = True
-        else:
-            out.append(p)
-    if not db_set:
-        out.append(f"DATABASE={new_db}")
-    return ";".join(out) + ";"
+POOL_SIZE = int(os.getenv("SEAC_POOL_SIZE", "10"))
+POOL_TIMEOUT = float(os.getenv("SEAC_POOL_TIMEOUT", "10"))        # espera máx. al pedir conexión (s)
+POOL_MAX_IDLE = float(os.getenv("SEAC_POOL_MAX_IDLE", "300"))     # inactividad antes de descartar (s)
+POOL_PING_AFTER = float(os.getenv("SEAC_POOL_PING_AFTER", "30"))  # inactividad antes de verificar (s)
+
+
+class PoolTimeout(RuntimeError):
+    """No hubo una conexión libre dentro del tiempo de espera del pool."""
+
+
+class PooledConnection:
+    """
+    Envoltura de una conexión del driver prestada por el pool.
+    close() la devuelve al pool en lugar de cerrarla; también puede usarse con 'with'.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw):
+        self._pool = pool
+        self._raw = raw
+        self._broken = False
+
+    def cursor(self):
+        return self._raw.cursor()
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw, broken=self._broken)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, DB_ERRORS):
+            self._broken = True
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    """Pool acotado y seguro entre hilos de conexiones a la BD."""
+
+    def __init__(self, connect, max_size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT,
+                 max_idle: float = POOL_MAX_IDLE, ping_after: float = POOL_PING_AFTER):
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self._idle = deque()  # (conexión, último uso)
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._stats = {"created": 0, "reused": 0, "discarded": 0, "evicted": 0, "timeouts": 0, "waits": 0}
+
+    # --- préstamo ---
+    def acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            self._evict_idle()
+            while not self._idle and self._in_use >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"Sin conexiones libres tras {self.timeout:.1f}s (máx. {self.max_size}).")
+                self._stats["waits"] += 1
+                self._cond.wait(remaining)
+            self._in_use += 1
+            item = self._idle.pop() if self._idle else None
+
+        try:
+            raw = self._checkout(item)
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, raw)
+
+    def _checkout(self, item):
+        if item is not None:
+            raw, last_used = item
+            if time.monotonic() - last_used < self.ping_after or self._ping(raw):
+                self._count("reused")
+                return raw
+            self._discard(raw)
+        raw = self._connect()
+        self._count("created")
+        return raw
+
+    def _count(self, key: str):
+        with self._cond:
+            self._stats[key] += 1
+
+    def _ping(self, raw) -> bool:
+        try:
+            raw.cursor().execute("SELECT 1;").fetchone()
+            return True
+        except DB_ERRORS:
+            return False
+
+    # --- devolución ---
+    def _release(self, raw, broken: bool = False):
+        with self._cond:
+            self._in_use -= 1
+            if broken:
+                self._discard(raw)
+            else:
+                self._idle.append((raw, time.monotonic()))
+            self._cond.notify()
+
+    def _discard(self, raw):
+        self._count("discarded")
+        try:
+            raw.close()
+        except DB_ERRORS:
+            pass
+
+    def _evict_idle(self):
+        # Las conexiones más antiguas quedan al inicio de la cola
+        now = time.monotonic()
+        while self._idle and now - self._idle[0][1] > self.max_idle:
+            raw, _ = self._idle.popleft()
+            self._stats["evicted"] += 1
+            try:
+                raw.close()
+            except DB_ERRORS:
+                pass
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                raw, _ = self._idle.popleft()
+                try:
+                    raw.close()
+                except DB_ERRORS:
+                    pass
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                **self._stats,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(storage.connect)
+    return _pool
 
 # -----------------------------------------------------
-# Conexión segura (crea la BD si no existe)
+# Conexión desde el pool (crea la BD si no existe)
 # -----------------------------------------------------
-def get_conn():
-    try:
-        return pyodbc.connect(SQLSERVER_CONN, autocommit=True)
-    except pyodbc.Error:
-        master_conn_str = _conn_replace_db(SQLSERVER_CONN, "master")
-        mconn = pyodbc.connect(master_conn_str, autocommit=True)
-        cur = mconn.cursor()
-        dbname = "SEACDB"
-        for frag in SQLSERVER_CONN.split(";"):
-            if "=" in frag and frag.split("=")[0].strip().lower() in ("database", "initial catalog"):
-                dbname = frag.split("=", 1)[1].strip()
-        cur.execute(f"IF DB_ID('{dbname}') IS NULL CREATE DATABASE [{dbname}];")
-        mconn.close()
-        return pyodbc.connect(SQLSERVER_CONN, autocommit=True)
+def get_conn() -> PooledConnection:
+    """Presta una conexión del pool. Usar con 'with get_conn() as conn:' o llamar a close()."""
+    with span("db.get_conn"):
+        return get_pool().acquire()
+
+def pool_stats() -> dict:
+    return get_pool().stats()
+
+register_gauge("seac_db_pool", pool_stats, "Pool de conexiones a la BD")
+
+@contextmanager
+def transaction():
+    """
+    Conexión del pool sin autocommit: confirma al salir del bloque y revierte si hay error.
+    Uso: with transaction() as conn: ...
+    """
+    with get_conn() as conn:
+        raw = conn._raw
+        storage.begin(raw)
+        try:
+            yield conn
+            raw.commit()
+        except Exception:
+            try:
+                raw.rollback()
+            except DB_ERRORS:
+                pass
+            raise
+        finally:
+            try:
+                storage.end(raw)
+            except DB_ERRORS:
+                conn._broken = True
 
 # -----------------------------------------------------
-# Inicialización automática de las tablas del sistema
+# Ejecutor dedicado para trabajo de BD desde rutas async
 # -----------------------------------------------------
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # === Tabla de sesiones ===
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[sessions]') AND type in (N'U'))
-    CREATE TABLE [dbo].[sessions] (
-        session_id NVARCHAR(100) NOT NULL PRIMARY KEY,
-        uso NVARCHAR(255) NULL,
-        presupuesto FLOAT NULL,
-        created_at DATETIME NOT NULL DEFAULT(GETDATE())
-    );
-    """)
-
-    # === Tabla de productos ===
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[products]') AND type in (N'U'))
-    CREATE TABLE [dbo].[products] (
-        id NVARCHAR(100) NOT NULL PRIMARY KEY,
-        name NVARCHAR(255) NULL,
-        brand NVARCHAR(255) NULL,
-        category NVARCHAR(100) NULL,
-        cpu NVARCHAR(255) NULL,
-        gpu NVARCHAR(255) NULL,
-        ram NVARCHAR(50) NULL,
-        storage NVARCHAR(50) NULL,
-        os NVARCHAR(100) NULL,
-        price FLOAT NULL,
-        url NVARCHAR(MAX) NULL
-    );
-    """)
-
-    # === Tabla de feedback ===
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[feedback]') AND type in (N'U'))
-    CREATE TABLE [dbo].[feedback] (
-        id INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
-        session_id NVARCHAR(100) NULL,
-        product_id NVARCHAR(100) NULL,
-        uso NVARCHAR(255) NULL,
-        rating FLOAT NULL,
-        ts DATETIME NOT NULL DEFAULT(GETDATE()),
-        CONSTRAINT FK_feedback_sessions FOREIGN KEY (session_id) REFERENCES [dbo].[sessions](session_id)
-    );
-    """)
-
-    # === Relación feedback → products ===
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.foreign_keys WHERE name = 'FK_feedback_products')
-    ALTER TABLE [dbo].[feedback]
-    ADD CONSTRAINT FK_feedback_products FOREIGN KEY (product_id) REFERENCES [dbo].[products](id);
-    """)
-
-    # === Tabla de pesos ===
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[weights]') AND type in (N'U'))
-    CREATE TABLE [dbo].[weights] (
-        uso NVARCHAR(255) NOT NULL PRIMARY KEY,
-        w_presupuesto FLOAT NULL,
-        w_uso FLOAT NULL,
-        w_marca FLOAT NULL
-    );
-    """)
-
-        # Tabla de usuarios
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[users]') AND type in (N'U'))
-    CREATE TABLE [dbo].[users] (
-        id INT IDENTITY(1,1) PRIMARY KEY,
-        email NVARCHAR(255) UNIQUE NOT NULL,
-        password NVARCHAR(255) NOT NULL,
-        first_name NVARCHAR(120) NULL,
-        last_name NVARCHAR(120) NULL,
-        created_at DATETIME DEFAULT(GETDATE())
-    );
-    """)
-
-    # Tabla de favoritos (relación usuario-producto)
-    cur.execute("""
-    IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[favorites]') AND type in (N'U'))
-    CREATE TABLE [dbo].[favorites] (
-        id INT IDENTITY(1,1) PRIMARY KEY,
-        user_id INT NOT NULL,
-        product_id NVARCHAR(100) NOT NULL,
-        added_at DATETIME DEFAULT(GETDATE()),
-        CONSTRAINT FK_fav_user FOREIGN KEY (user_id) REFERENCES [dbo].[users](id),
-        CONSTRAINT FK_fav_product FOREIGN KEY (product_id) REFERENCES [dbo].[products](id)
-    );
-    """)
-
-    conn.close()
-    print("✅ Tablas SEAC verificadas o creadas correctamente.")
+# Por defecto tantos hilos como conexiones: nunca hay más consultas en vuelo que el pool.
+DB_WORKERS = int(os.getenv("SEAC_DB_WORKERS", str(POOL_SIZE)))
+
+_db_executor = None
+
+def db_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    if _db_executor is None:
+        with _pool_lock:
+            if _db_executor is None:
+                _db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="seac-db")
+    return _db_executor
+
+async def run_db(fn, *args, **kwargs):
+    """Ejecuta una función bloqueante de BD en el ejecutor dedicado sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(db_executor(), functools.partial(ctx.run, fn, *args, **kwargs))
+
+def shutdown_db():
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
+    if _pool is not None:
+        _pool.close_all()
 
 # -----------------------------------------------------
-# Crear base de datos si no existe al importar (una sola vez)
+# Esquema: ver app/migrations.py (importar este módulo no toca la BD)
 # -----------------------------------------------------
-init_db()
+def init_db():
+    """Aplica las migraciones pendientes (equivale a python -m app.migrations)."""
+    from .migrations import migrate
+    migrate()
@@ -0,0 +1,199 @@
+# =====================================================
+# SEAC v1.8 — Cola de feedback con escritura diferida (write-behind)
+# =====================================================
+# /feedback solo valida y encola; un hilo de fondo vacía la cola por lotes
+# (persistence_sql.write_feedback_batch). Los pesos se actualizan en memoria en
+# la propia ruta (learning.apply_feedback), no aquí.
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .metrics import register_gauge
+from .log import get_logger
+
+log = get_logger("feedback_queue")
+
+# Entradas máximas en espera; con la cola llena /feedback responde 503
+FEEDBACK_QUEUE_SIZE = int(os.getenv("SEAC_FEEDBACK_QUEUE_SIZE", "10000"))
+# Entradas máximas por lote y espera máxima (s) para completar un lote
+FEEDBACK_BATCH_SIZE = int(os.getenv("SEAC_FEEDBACK_BATCH_SIZE", "200"))
+FEEDBACK_FLUSH_INTERVAL = float(os.getenv("SEAC_FEEDBACK_FLUSH_INTERVAL", "0.5"))
+# Reintentos de un lote que falla antes de descartarlo
+FEEDBACK_RETRIES = int(os.getenv("SEAC_FEEDBACK_RETRIES", "3"))
+
+
+class QueueFull(RuntimeError):
+    """La cola de feedback está llena (contrapresión)."""
+
+
+class FeedbackQueue:
+    def __init__(self, writer: Callable[[List[Dict[str, Any]]], Any], maxsize: int = FEEDBACK_QUEUE_SIZE,
+                 batch_size: int = FEEDBACK_BATCH_SIZE, interval: float = FEEDBACK_FLUSH_INTERVAL,
+                 retries: int = FEEDBACK_RETRIES):
+        self._writer = writer
+        self._q: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max(1, maxsize))
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.retries = max(1, retries)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"enqueued": 0, "written": 0, "rejected": 0, "failed": 0, "batches": 0,
+                       "last_flush_ms": 0.0, "max_flush_ms": 0.0, "total_flush_ms": 0.0}
+
+    # --- productor ---
+    def put(self, entry: Dict[str, Any]):
+        self.start()
+        try:
+            self._q.put_nowait(entry)
+        except queue.Full:
+            self._count("rejected")
+            raise QueueFull(f"Cola de feedback llena ({self._q.maxsize} entradas).")
+        self._count("enqueued")
+
+    # --- consumidor ---
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="seac-feedback", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not (self._stop.is_set() and self._q.empty()):
+            try:
+                first = self._q.get(timeout=self.interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stop.is_set():
+                    # Plazo vencido o apagando: tomar lo que ya esté en la cola sin esperar más
+                    try:
+                        batch.append(self._q.get_nowait())
+                        continue
+                    except queue.Empty:
+                        break
+                try:
+                    batch.append(self._q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        t0 = time.perf_counter()
+        try:
+            for intento in range(1, self.retries + 1):
+                try:
+                    self._writer(batch)
+                    self._count("written", len(batch))
+                    break
+                except Exception as e:
+                    log.warning("feedback.batch_failed", f"Falló la escritura de un lote de feedback: {e}",
+                                size=len(batch), attempt=intento, retries=self.retries)
+                    if intento < self.retries:
+                        time.sleep(min(2.0, 0.2 * 2 ** (intento - 1)))
+            else:
+                # Una sola entrada inválida (rating, FK...) hace fallar todo el lote: se divide
+                # para escribir las válidas y descartar solo las que fallan por sí solas
+                escritas = self._write_split(batch) if len(batch) > 1 else 0
+                self._count("written", escritas)
+                self._count("failed", len(batch) - escritas)
+                log.error("feedback.batch_dropped", "Se descartaron entradas de feedback",
+                          size=len(batch) - escritas, written=escritas)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["last_flush_ms"] = round(ms, 2)
+                self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], ms), 2)
+                self._stats["total_flush_ms"] += ms
+            for _ in batch:
+                self._q.task_done()
+
+    def _write_split(self, batch: List[Dict[str, Any]]) -> int:
+        """Escribe las dos mitades por separado (recursivo); devuelve cuántas entradas se escribieron."""
+        if len(batch) == 1:
+            try:
+                self._writer(batch)
+                return 1
+            except Exception as e:
+                log.warning("feedback.entry_dropped", f"Entrada de feedback descartada: {e}",
+                            session_id=batch[0].get("session_id"))
+                return 0
+        mitad = len(batch) // 2
+        escritas = 0
+        for parte in (batch[:mitad], batch[mitad:]):
+            try:
+                self._writer(parte)
+                escritas += len(parte)
+            except Exception:
+                escritas += self._write_split(parte)
+        return escritas
+
+    # --- ciclo de vida ---
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Espera a que todo lo encolado hasta ahora quede escrito (o descartado)."""
+        deadline = time.monotonic() + timeout
+        while self._q.unfinished_tasks:
+            if time.monotonic() >= deadline or not (self._thread and self._thread.is_alive()):
+                return False
+            time.sleep(0.02)
+        return True
+
+    def stop(self, timeout: float = 10.0) -> bool:
+        """Vacía la cola y detiene el hilo (llamar al apagar la aplicación)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self._q.unfinished_tasks == 0
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+        batches = s.pop("batches")
+        total = s.pop("total_flush_ms")
+        return {
+            **s,
+            "depth": self._q.qsize(),
+            "maxsize": self._q.maxsize,
+            "batches": batches,
+            "avg_flush_ms": round(total / batches, 2) if batches else 0.0,
+        }
+
+
+def _procesar_lote(batch: List[Dict[str, Any]]):
+    from .persistence_sql import write_feedback_batch
+    write_feedback_batch(batch)
+
+
+_queue = FeedbackQueue(_procesar_lote)
+
+def enqueue(entry: Dict[str, Any]):
+    """Encola una entrada de feedback; lanza QueueFull si no hay lugar."""
+    _queue.put(entry)
+
+def start():
+    _queue.start()
+
+def flush(timeout: float = 10.0) -> bool:
+    return _queue.flush(timeout)
+
+def shutdown(timeout: float = 10.0) -> bool:
+    return _queue.stop(timeout)
+
+def stats() -> dict:
+    return _queue.stats()
+
+register_gauge("seac_feedback_queue", stats, "Cola de feedback (write-behind)")
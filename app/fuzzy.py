@@ -0,0 +1,161 @@
+# =====================================================
+# SEAC v1.8 — Coincidencia difusa contra el catálogo (trigramas)
+# =====================================================
+# Índice invertido de trigramas de caracteres sobre marca+modelo y cpu+gpu de la
+# foto vigente del catálogo. Sirve para reconocer como productos ya existentes
+# los que devuelve Groq con otro id o con el nombre escrito de otra forma.
+# Los trigramas no distinguen modelos vecinos (Legion 5 / Legion 7, XPS 13 / 15,
+# AN515-57 / -58): los tokens con dígitos del modelo, y los de cpu y gpu cuando
+# ambos lados los tienen, deben coincidir exactamente; si no, no hay coincidencia.
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from collections import Counter, namedtuple
+from typing import Any, Dict, List, Optional
+
+from .kb import CatalogSnapshot, get_catalog
+from .timing import stage
+
+# Confianza mínima (0–1) para considerar que dos productos son el mismo
+FUZZY_THRESHOLD = float(os.getenv("SEAC_FUZZY_THRESHOLD", "0.75"))
+# Candidatos (por trigramas en común) que se puntúan por consulta
+_MAX_CANDIDATES = 50
+# Peso de cpu+gpu frente a marca+modelo cuando ambos lados los tienen
+_SPECS_WEIGHT = 0.25
+# Penalización si las dos marcas son conocidas y distintas
+_BRAND_PENALTY = 0.6
+
+Match = namedtuple("Match", "product score")
+
+_NO_ALNUM = re.compile(r"[^0-9a-z]+")
+# Capacidades y frecuencias (16gb, 512gb, 144hz...) no identifican el modelo
+_UNIDAD = re.compile(r"^\d+(gb|tb|mb|hz|mhz|ghz|w|wh|mah|in|pulgadas)$")
+
+
+def _norm(texto: Any) -> str:
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return " ".join(_NO_ALNUM.sub(" ", texto).split())
+
+
+def trigrams(texto: Any) -> frozenset:
+    t = _norm(texto)
+    if not t:
+        return frozenset()
+    t = f" {t} "
+    return frozenset(t[i:i + 3] for i in range(len(t) - 2))
+
+
+def model_tokens(texto: Any) -> frozenset:
+    """Tokens con dígitos (5, 13, m2, f15, an515, 57, i7, 3060), sin capacidades ni frecuencias."""
+    return frozenset(t for t in _norm(texto).split() if any(c.isdigit() for c in t) and not _UNIDAD.match(t))
+
+
+def _compatibles(a: frozenset, b: frozenset) -> bool:
+    """Requisito duro: si ambos lados tienen tokens de modelo, deben ser los mismos."""
+    return not a or not b or a == b
+
+
+def _dice(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+def _campos(p: Dict[str, Any]):
+    """(marca, modelo, cpu, gpu) de un dict con claves en inglés o en español."""
+    return (
+        p.get("brand") or p.get("marca") or "",
+        p.get("name") or p.get("modelo") or "",
+        p.get("cpu") or p.get("procesador") or "",
+        p.get("gpu") or p.get("tarjeta_grafica") or "",
+    )
+
+
+class TrigramIndex:
+    """Índice de una versión concreta del catálogo (inmutable)."""
+
+    def __init__(self, snap: CatalogSnapshot):
+        self.version = snap.version
+        self._snap = snap
+        brands, names = snap.text["brand"], snap.text["name"]
+        cpus, gpus = snap.text["cpu"], snap.text["gpu"]
+        self._ident: List[frozenset] = []
+        self._specs: List[frozenset] = []
+        self._brand: List[str] = []
+        self._model: List[frozenset] = []
+        self._cpu: List[frozenset] = []
+        self._gpu: List[frozenset] = []
+        postings: Dict[str, List[int]] = {}
+        for i in range(len(snap)):
+            ident = trigrams(f"{brands[i]} {names[i]}")
+            self._ident.append(ident)
+            self._specs.append(trigrams(f"{cpus[i]} {gpus[i]}"))
+            self._brand.append(_norm(brands[i]))
+            self._model.append(model_tokens(names[i]))
+            self._cpu.append(model_tokens(cpus[i]))
+            self._gpu.append(model_tokens(gpus[i]))
+            for g in ident:
+                postings.setdefault(g, []).append(i)
+        self._postings = {g: array("i", v) for g, v in postings.items()}
+
+    def match(self, brand: str, name: str, cpu: str = "", gpu: str = "") -> Optional[Match]:
+        """Mejor producto del catálogo y su confianza (Dice de trigramas), o None."""
+        q_ident = trigrams(f"{brand} {name}")
+        if not q_ident:
+            return None
+        votos = Counter()
+        for g in q_ident:
+            pos = self._postings.get(g)
+            if pos is not None:
+                votos.update(pos)
+        if not votos:
+            return None
+
+        q_specs = trigrams(f"{cpu} {gpu}")
+        q_brand = _norm(brand)
+        q_model, q_cpu, q_gpu = model_tokens(name), model_tokens(cpu), model_tokens(gpu)
+        mejor, mejor_score = None, 0.0
+        for i, _ in votos.most_common(_MAX_CANDIDATES):
+            # El nombre sin números (solo "Legion") no basta para afirmar que es el mismo modelo
+            if q_model != self._model[i]:
+                continue
+            if not (_compatibles(q_cpu, self._cpu[i]) and _compatibles(q_gpu, self._gpu[i])):
+                continue
+            score = _dice(q_ident, self._ident[i])
+            if q_specs and self._specs[i]:
+                score = (1 - _SPECS_WEIGHT) * score + _SPECS_WEIGHT * _dice(q_specs, self._specs[i])
+            if q_brand and self._brand[i] and q_brand != self._brand[i]:
+                score *= _BRAND_PENALTY
+            if score > mejor_score:
+                mejor, mejor_score = i, score
+        if mejor is None:
+            return None
+        return Match(self._snap.row(mejor), round(mejor_score, 3))
+
+
+_index: Optional[TrigramIndex] = None
+_lock = threading.Lock()
+
+
+def get_index() -> TrigramIndex:
+    """Índice de la foto vigente; se reconstruye solo cuando cambia la versión del catálogo."""
+    global _index
+    snap = get_catalog()
+    idx = _index
+    if idx is not None and idx.version == snap.version:
+        return idx
+    with stage("fuzzy_index"), _lock:
+        if _index is None or _index.version != snap.version:
+            _index = TrigramIndex(snap)
+        return _index
+
+
+def best_match(p: Dict[str, Any], threshold: float = FUZZY_THRESHOLD) -> Optional[Match]:
+    """Producto del catálogo equivalente a 'p' si la confianza alcanza 'threshold'."""
+    idx = get_index()
+    with stage("fuzzy"):
+        m = idx.match(*_campos(p))
+    return m if m is not None and m.score >= threshold else None
@@ -1,28 +1,129 @@
 # =========================================================
 # SEAC v1.6 — Motor híbrido con “Ajuste automático” + explicaciones
 # =========================================================
-from .api_internet import fetch_products_from_internet
-from .kb import load_products
-from .connectors.llm_groq import summarize_reasons_groq  # usa tu helper actual
+from .api_internet import fetch_products_from_internet, fetch_products_from_internet_async
+from .fuzzy import best_match
+from .inference import infer
+from .db import run_db
+from .connectors.llm_groq import summarize_reasons_groq, summarize_reasons_groq_async, is_cached  # usa tu helper actual
+from .connectors.llm_stub import summarize_reasons
+from .timing import stage
+from .profiling import span
+from .log import get_logger
+from concurrent.futures import ThreadPoolExecutor, wait
+import asyncio
+import contextvars
+import os
+import time
 import uuid
+import weakref
 
-def infer_hibrido(consulta: dict):
-    """Motor híbrido SEAC — usa Groq si hay conexión, KB local si no.
-       Ahora devuelve (si aplica) una tarjeta informativa de 'Ajuste automático'."""
-    uso = (consulta.get("uso") or "").strip()
-    presupuesto = float(consulta.get("presupuesto", 0) or 0)
-    preferencias = consulta.get("preferencias", {}) or {}
-    top_k = int(consulta.get("top_k", 3) or 3)
+log = get_logger("inference_net")
 
-    # Para explicar los cambios
-    session_id = str(uuid.uuid4())
+# Tiempo total máximo por consulta (Groq + explicaciones), en segundos
+INFER_DEADLINE = float(os.getenv("SEAC_INFER_DEADLINE", "40"))
+# Explicaciones simultáneas como máximo (compartido entre todas las consultas)
+EXPLAIN_WORKERS = int(os.getenv("SEAC_EXPLAIN_WORKERS", "8"))
+# "groq": Groq primero y catálogo local como respaldo; "hedged": ambos a la vez
+INFER_MODE = os.getenv("SEAC_INFER_MODE", "groq").strip().lower()
+# En modo hedged, segundos que se espera a Groq antes de responder con el ranking local
+HEDGE_BUDGET = float(os.getenv("SEAC_HEDGE_BUDGET", "8"))
+# En modo hedged, cancelar la llamada a Groq que llegó tarde (si no, termina y llena la caché)
+HEDGE_CANCEL = os.getenv("SEAC_HEDGE_CANCEL", "0") == "1"
+
+_explain_pool = ThreadPoolExecutor(max_workers=EXPLAIN_WORKERS, thread_name_prefix="seac-explain")
+
+
+def _explicar(nombre: str, razones: list, uso: str) -> str:
+    with span("explain"):
+        try:
+            return summarize_reasons_groq(nombre, razones, uso)
+        except TypeError:
+            # Compatibilidad si tu función tiene firma (name, reasons) sin 'uso'
+            return summarize_reasons_groq(nombre, razones)
+
+
+def _explicar_todos(pedidos: list, uso: str, deadline: float) -> list:
+    """
+    Lanza en paralelo las explicaciones [(nombre, razones), ...] y espera hasta 'deadline'
+    (time.monotonic). Las que no lleguen a tiempo usan el texto local de llm_stub.
+    """
+    if deadline <= time.monotonic():
+        return [summarize_reasons(nombre, razones) for nombre, razones in pedidos]
+
+    # Cada hilo con una copia del contexto: sus spans cuelgan de la petición
+    futuros = [_explain_pool.submit(contextvars.copy_context().run, _explicar, nombre, razones, uso)
+               for nombre, razones in pedidos]
+    with stage("llm"):
+        wait(futuros, timeout=max(0.0, deadline - time.monotonic()))
+
+    textos = []
+    for fut, (nombre, razones) in zip(futuros, pedidos):
+        if fut.done() and not fut.cancelled() and fut.exception() is None:
+            textos.append(fut.result())
+        else:
+            fut.cancel()
+            textos.append(summarize_reasons(nombre, razones))
+    return textos
+
+
+RAZON_LOCAL = "Recomendación basada en catálogo local."
+
+
+def prewarm_explicaciones(usos: list, top_n: int = 5, presupuestos: tuple = (800.0,),
+                          timeout: float = 120.0) -> int:
+    """
+    Precalienta la caché de explicaciones del fallback local: para cada uso y
+    presupuesto indicados toma los 'top_n' productos de _ranking_local (el mismo
+    ranking que se explica al responder), así las claves (nombre, razones, uso)
+    coinciden con las de la petición. Devuelve cuántas explicaciones nuevas quedaron listas.
+    """
+    pedidos = []
+    for uso in usos:
+        for presupuesto in presupuestos:
+            consulta = {"uso": uso, "presupuesto": presupuesto, "top_k": top_n}
+            for nombre, razones in _pedidos_locales(_ranking_local(consulta, presupuesto, top_n), top_n)[1]:
+                if (nombre, razones, uso) not in pedidos:
+                    pedidos.append((nombre, razones, uso))
+    pendientes = [(n, r, u) for n, r, u in pedidos if not is_cached(n, r, u)]
+    futuros = [_explain_pool.submit(_explicar, n, r, u) for n, r, u in pendientes]
+    wait(futuros, timeout=timeout)
+    listos = sum(1 for (n, r, u) in pendientes if is_cached(n, r, u))
+    log.info("explain.prewarm", "Caché de explicaciones precalentada", ready=listos, pending=len(pendientes))
+    return listos
+
+
+def _tarjeta_ajuste(ajustes_info: str, session_id: str) -> dict:
+    return {
+        "product": {
+            "id": "ajuste-info",
+            "name": "Ajuste Automático del Sistema",
+            "brand": "SEAC",
+            "category": "Información",
+            "cpu": "",
+            "gpu": "",
+            "ram": "",
+            "storage": "",
+            "os": "",
+            "price": 0,
+            "url": ""
+        },
+        "score": 1.0,
+        "reasons": [ajustes_info],
+        "session_id": session_id
+    }
+
+def _ajustar_consulta(consulta: dict, uso: str, presupuesto: float):
+    """
+    Ajuste inteligente (presupuesto + posible cambio de gama) según el tipo de uso.
+    Modifica consulta["gama"] si corresponde y devuelve (presupuesto, mensaje o None).
+    """
     uso_lower = uso.lower()
     presupuesto_original = presupuesto
     gama_original = (consulta.get("gama") or "").strip().lower()
     gama_anterior = gama_original  # para reportar si cambia
     ajustes_info = None
 
-    # --- Ajuste inteligente (presupuesto + posible cambio de gama) ---
     # Reglas simples por tipo de uso:
     if "juego" in uso_lower or "gaming" in uso_lower:
         if presupuesto < 500:
@@ -62,104 +163,288 @@ def infer_hibrido(consulta: dict):
 
     if cambios:
         ajustes_info = "💡 Se aplicó un ajuste automático: " + " y ".join(cambios) + "."
+    return presupuesto, ajustes_info
 
-    # --- Intentar con Groq ---
-    print("[inference_net] 🌐 Intentando obtener productos desde Groq...")
-    productos_groq = fetch_products_from_internet(uso, presupuesto, preferencias)
 
-    if productos_groq:
-        print(f"[inference_net] ✅ {len(productos_groq)} productos obtenidos desde Internet (Groq).")
-        resultados = []
-
-        # Insertar tarjeta de “Ajuste automático” si corresponde
-        if ajustes_info:
-            resultados.append({
-                "product": {
-                    "id": "ajuste-info",
-                    "name": "Ajuste Automático del Sistema",
-                    "brand": "SEAC",
-                    "category": "Información",
-                    "cpu": "",
-                    "gpu": "",
-                    "ram": "",
-                    "storage": "",
-                    "os": "",
-                    "price": 0,
-                    "url": ""
-                },
-                "score": 1.0,
-                "reasons": [ajustes_info],
-                "session_id": session_id
-            })
-
-        # Productos recomendados
-        for p in productos_groq[:top_k]:
-            producto = {
-                "id": p.get("id", f"groq-{uuid.uuid4().hex[:6]}"),
-                "name": p.get("modelo", "") or p.get("name", ""),
-                "brand": p.get("marca", "") or p.get("brand", ""),
-                "category": "laptop",
-                "cpu": p.get("procesador", "") or p.get("cpu", ""),
-                "gpu": p.get("tarjeta_grafica", "") or p.get("gpu", ""),
-                "ram": p.get("memoria_ram", "") or p.get("ram", ""),
-                "storage": p.get("almacenamiento", "") or p.get("storage", ""),
-                "os": p.get("sistema_operativo", "") or p.get("os", ""),
-                "price": float(p.get("precio", p.get("price", 0)) or 0),
-                "url": p.get("link", "") or p.get("url", "")
-            }
-
-            # Explicación breve (si tu helper acepta 'uso' como 3er parámetro, déjalo; si no, quítalo)
-            razones_brutas = [p.get("descripcion", "Recomendación generada desde Groq.")]
-            try:
-                explicacion = summarize_reasons_groq(producto["name"], razones_brutas, uso)
-            except TypeError:
-                # Compatibilidad si tu función tiene firma (name, reasons) sin 'uso'
-                explicacion = summarize_reasons_groq(producto["name"], razones_brutas)
-
-            resultados.append({
-                "product": producto,
-                "score": 1.0,
-                "reasons": [explicacion],
-                "session_id": session_id
-            })
-        return resultados
+def _producto_groq(p: dict) -> dict:
+    return {
+        "id": p.get("id", f"groq-{uuid.uuid4().hex[:6]}"),
+        "name": p.get("modelo", "") or p.get("name", ""),
+        "brand": p.get("marca", "") or p.get("brand", ""),
+        "category": "laptop",
+        "cpu": p.get("procesador", "") or p.get("cpu", ""),
+        "gpu": p.get("tarjeta_grafica", "") or p.get("gpu", ""),
+        "ram": p.get("memoria_ram", "") or p.get("ram", ""),
+        "storage": p.get("almacenamiento", "") or p.get("storage", ""),
+        "os": p.get("sistema_operativo", "") or p.get("os", ""),
+        "price": float(p.get("precio", p.get("price", 0)) or 0),
+        "url": p.get("link", "") or p.get("url", "")
+    }
 
-    # --- Fallback a catálogo local ---
-    print("[inference_net] ⚠️ Groq no devolvió datos válidos. Usando catálogo local.")
-    productos_locales = load_products()
-    resultados = []
 
+def _leer_consulta(consulta: dict):
+    uso = (consulta.get("uso") or "").strip()
+    presupuesto = float(consulta.get("presupuesto", 0) or 0)
+    preferencias = consulta.get("preferencias", {}) or {}
+    top_k = int(consulta.get("top_k", 3) or 3)
+    return uso, presupuesto, preferencias, top_k
+
+
+def _armar_resultados(productos: list, explicaciones: list, ajustes_info, session_id: str, source: str) -> list:
+    resultados = []
+    # Insertar tarjeta de “Ajuste automático” si corresponde
     if ajustes_info:
+        resultados.append(_tarjeta_ajuste(ajustes_info, session_id))
+    for producto, explicacion in zip(productos, explicaciones):
         resultados.append({
-            "product": {
-                "id": "ajuste-info",
-                "name": "Ajuste Automático del Sistema",
-                "brand": "SEAC",
-                "category": "Información",
-                "cpu": "",
-                "gpu": "",
-                "ram": "",
-                "storage": "",
-                "os": "",
-                "price": 0,
-                "url": ""
-            },
+            "product": producto,
             "score": 1.0,
-            "reasons": [ajustes_info],
+            "reasons": [explicacion],
             "session_id": session_id
         })
+    # Origen de la respuesta: "groq" o "local"
+    for item in resultados:
+        item["source"] = source
+    return resultados
+
 
-    for prod in productos_locales[:top_k]:
+def _pedidos_groq(productos_groq: list, top_k: int):
+    """
+    Convierte la lista de Groq y la deduplica contra el catálogo: si un producto ya existe
+    en 'products' (coincidencia difusa) se usa su id y sus datos completan los vacíos;
+    dos productos de Groq que resultan ser el mismo se muestran una sola vez.
+    """
+    productos, pedidos, vistos = [], [], set()
+    for p in productos_groq:
+        if len(productos) >= top_k:
+            break
+        producto = _producto_groq(p)
         try:
-            explicacion = summarize_reasons_groq(prod.get("name", "Producto"), ["Recomendación basada en catálogo local."], uso)
-        except TypeError:
-            explicacion = summarize_reasons_groq(prod.get("name", "Producto"), ["Recomendación basada en catálogo local."])
+            match = best_match(producto)
+        except Exception as e:  # sin catálogo disponible se muestra tal cual
+            log.warning("fuzzy.unavailable", f"No se pudo comparar con el catálogo: {e}")
+            match = None
+        if match is not None:
+            producto["id"] = match.product["id"]
+            for k, v in match.product.items():
+                if k in producto and not producto[k] and v:
+                    producto[k] = v
+        if producto["id"] in vistos:
+            continue
+        vistos.add(producto["id"])
+        productos.append(producto)
+        pedidos.append((producto["name"], [p.get("descripcion", "Recomendación generada desde Groq.")]))
+    return productos, pedidos
 
-        resultados.append({
-            "product": prod,
-            "score": 1.0,
-            "reasons": [explicacion],
-            "session_id": session_id
-        })
 
-    return resultados[:top_k + (1 if ajustes_info else 0)]
\ No newline at end of file
+def _ranking_local(consulta: dict, presupuesto: float, top_k: int) -> list:
+    """Mejores productos del catálogo en memoria según el motor de reglas + CBR."""
+    q = {**consulta, "presupuesto": presupuesto, "top_k": top_k}
+    return [item["product"] for item in infer(q)]
+
+
+def _pedidos_locales(productos_locales: list, top_k: int):
+    locales = productos_locales[:top_k]
+    return locales, [(prod.get("name", "Producto"), [RAZON_LOCAL]) for prod in locales]
+
+
+def infer_hibrido(consulta: dict):
+    """Motor híbrido SEAC — usa Groq si hay conexión, KB local si no.
+       Ahora devuelve (si aplica) una tarjeta informativa de 'Ajuste automático'."""
+    uso, presupuesto, preferencias, top_k = _leer_consulta(consulta)
+    deadline = time.monotonic() + INFER_DEADLINE
+    session_id = str(uuid.uuid4())
+    presupuesto, ajustes_info = _ajustar_consulta(consulta, uso, presupuesto)
+
+    # --- Intentar con Groq ---
+    log.debug("groq.request", "Intentando obtener productos desde Groq")
+    productos_groq = fetch_products_from_internet(uso, presupuesto, preferencias)
+
+    if productos_groq:
+        log.info("infer.source", "Productos obtenidos desde Groq", source="groq", count=len(productos_groq))
+        productos, pedidos = _pedidos_groq(productos_groq, top_k)
+        # Explicaciones breves en paralelo, con un único plazo para toda la consulta
+        return _armar_resultados(productos, _explicar_todos(pedidos, uso, deadline), ajustes_info, session_id, "groq")
+
+    # --- Fallback a catálogo local ---
+    log.warning("infer.fallback", "Groq no devolvió datos válidos; se usa el catálogo local", source="local")
+    # Mismo ranking local que el modo hedged: la respuesta no depende de SEAC_INFER_MODE
+    locales, pedidos = _pedidos_locales(_ranking_local(consulta, presupuesto, top_k), top_k)
+    return _armar_resultados(locales, _explicar_todos(pedidos, uso, deadline), ajustes_info, session_id, "local")
+
+
+# ---------------------------------------------------------
+# Versión asíncrona (rutas async de FastAPI)
+# ---------------------------------------------------------
+# Un semáforo por event loop: asyncio.Semaphore queda ligado al loop donde espera por
+# primera vez (varios loops: TestClient, asyncio.run del bench, recargas de uvicorn).
+_explain_sems: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = \
+    weakref.WeakKeyDictionary()
+
+
+def _explain_sem() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _explain_sems.get(loop)
+    if sem is None:
+        sem = _explain_sems[loop] = asyncio.Semaphore(EXPLAIN_WORKERS)
+    return sem
+
+
+async def _explicar_async(nombre: str, razones: list, uso: str) -> str:
+    with span("explain"):
+        async with _explain_sem():
+            return await summarize_reasons_groq_async(nombre, razones, uso)
+
+
+async def _explicaciones_por_llegada(pedidos: list, uso: str, deadline: float):
+    """
+    Generador asíncrono de (índice, texto) en el orden en que terminan las explicaciones.
+    Al vencer 'deadline' las pendientes se cancelan y se entregan con el texto de llm_stub.
+    """
+    if deadline <= time.monotonic() or not pedidos:
+        for i, (nombre, razones) in enumerate(pedidos):
+            yield i, summarize_reasons(nombre, razones)
+        return
+
+    tareas = {asyncio.ensure_future(_explicar_async(nombre, razones, uso)): i
+              for i, (nombre, razones) in enumerate(pedidos)}
+    pendientes = set(tareas)
+    try:
+        while pendientes:
+            restante = deadline - time.monotonic()
+            if restante <= 0:
+                break
+            listas, pendientes = await asyncio.wait(pendientes, timeout=restante,
+                                                    return_when=asyncio.FIRST_COMPLETED)
+            for tarea in sorted(listas, key=tareas.get):
+                i = tareas[tarea]
+                if not tarea.cancelled() and tarea.exception() is None:
+                    yield i, tarea.result()
+                else:
+                    yield i, summarize_reasons(*pedidos[i])
+        for tarea in sorted(pendientes, key=tareas.get):
+            tarea.cancel()
+            yield tareas[tarea], summarize_reasons(*pedidos[tareas[tarea]])
+    finally:
+        # Si el consumidor se va (cliente desconectado), no dejar tareas huérfanas
+        for tarea in pendientes:
+            tarea.cancel()
+
+
+async def _explicar_todos_async(pedidos: list, uso: str, deadline: float) -> list:
+    """Igual que _explicar_todos, pero con tareas asyncio en lugar de hilos."""
+    textos = [None] * len(pedidos)
+    with stage("llm"):
+        async for i, texto in _explicaciones_por_llegada(pedidos, uso, deadline):
+            textos[i] = texto
+    return textos
+
+
+_tareas_fondo: set = set()
+
+def _recuperar_excepcion(fut: asyncio.Future):
+    # Nadie espera este resultado: leer la excepción evita "Task exception was never retrieved"
+    if not fut.cancelled():
+        fut.exception()
+
+
+def _dejar_en_fondo(tarea: asyncio.Task):
+    # Mantener una referencia hasta que termine (si no, el GC podría descartarla)
+    _tareas_fondo.add(tarea)
+    tarea.add_done_callback(_tareas_fondo.discard)
+    tarea.add_done_callback(_recuperar_excepcion)
+
+
+def _descartar(fut: asyncio.Future):
+    """Cancela un resultado que ya no se usa; si ya había terminado con error, lo recupera."""
+    fut.cancel()
+    fut.add_done_callback(_recuperar_excepcion)
+
+
+async def _productos_hedged(consulta: dict, uso: str, presupuesto: float, preferencias: dict,
+                            top_k: int, deadline: float):
+    """
+    Lanza a la vez la consulta a Groq y el ranking local. Si Groq responde dentro de
+    HEDGE_BUDGET se usa su lista; si no, se responde con el ranking local.
+    Devuelve (productos, pedidos de explicación, origen).
+    """
+    groq = asyncio.ensure_future(fetch_products_from_internet_async(uso, presupuesto, preferencias))
+    local = asyncio.ensure_future(run_db(_ranking_local, consulta, presupuesto, top_k))
+
+    await asyncio.wait({groq}, timeout=min(HEDGE_BUDGET, max(0.0, deadline - time.monotonic())))
+    productos_groq = groq.result() if groq.done() and not groq.cancelled() and groq.exception() is None else []
+
+    if productos_groq:
+        log.info("infer.source", "Groq respondió dentro del presupuesto de latencia", source="groq",
+                 count=len(productos_groq), mode="hedged")
+        _descartar(local)
+        return (*await run_db(_pedidos_groq, productos_groq, top_k), "groq")
+
+    if not groq.done():
+        if HEDGE_CANCEL:
+            _descartar(groq)
+        else:
+            _dejar_en_fondo(groq)  # su resultado quedará en la caché para próximas consultas
+    log.warning("infer.hedge_timeout", "Groq no respondió a tiempo; se usa el ranking del catálogo local",
+                source="local", mode="hedged")
+    return (*_pedidos_locales(await local, top_k), "local")
+
+
+async def _obtener_productos_async(consulta: dict, uso: str, presupuesto: float, preferencias: dict,
+                                   top_k: int, deadline: float):
+    """Productos a recomendar según SEAC_INFER_MODE → (productos, pedidos, origen)."""
+    if INFER_MODE == "hedged":
+        return await _productos_hedged(consulta, uso, presupuesto, preferencias, top_k, deadline)
+
+    # --- Intentar con Groq ---
+    log.debug("groq.request", "Intentando obtener productos desde Groq")
+    productos_groq = await fetch_products_from_internet_async(uso, presupuesto, preferencias)
+
+    if productos_groq:
+        log.info("infer.source", "Productos obtenidos desde Groq", source="groq", count=len(productos_groq))
+        # El índice difuso puede necesitar recargar el catálogo: fuera del event loop
+        return (*await run_db(_pedidos_groq, productos_groq, top_k), "groq")
+
+    # --- Fallback a catálogo local ---
+    log.warning("infer.fallback", "Groq no devolvió datos válidos; se usa el catálogo local", source="local")
+    return (*_pedidos_locales(await run_db(_ranking_local, consulta, presupuesto, top_k), top_k), "local")
+
+
+async def infer_hibrido_async(consulta: dict):
+    """Igual que infer_hibrido: HTTP asíncrono hacia Groq y la BD en el ejecutor dedicado."""
+    uso, presupuesto, preferencias, top_k = _leer_consulta(consulta)
+    deadline = time.monotonic() + INFER_DEADLINE
+    session_id = str(uuid.uuid4())
+    presupuesto, ajustes_info = _ajustar_consulta(consulta, uso, presupuesto)
+
+    productos, pedidos, source = await _obtener_productos_async(
+        consulta, uso, presupuesto, preferencias, top_k, deadline)
+    explicaciones = await _explicar_todos_async(pedidos, uso, deadline)
+    return _armar_resultados(productos, explicaciones, ajustes_info, session_id, source)
+
+
+async def infer_hibrido_stream(consulta: dict):
+    """
+    Versión progresiva de infer_hibrido_async. Genera eventos (dict) en este orden:
+      {"event": "session", "session_id"}            → de inmediato
+      {"event": "ajuste", "item"}                   → tarjeta de “Ajuste automático” (si aplica)
+      {"event": "item", "index", "item"}            → cada recomendación apenas tiene su explicación
+      {"event": "done", "session_id", "source", "total"}
+    'index' es la posición de la recomendación en el ranking (los items llegan en orden de llegada).
+    """
+    uso, presupuesto, preferencias, top_k = _leer_consulta(consulta)
+    deadline = time.monotonic() + INFER_DEADLINE
+    session_id = str(uuid.uuid4())
+    presupuesto, ajustes_info = _ajustar_consulta(consulta, uso, presupuesto)
+
+    yield {"event": "session", "session_id": session_id}
+    if ajustes_info:
+        yield {"event": "ajuste", "item": _tarjeta_ajuste(ajustes_info, session_id)}
+
+    productos, pedidos, source = await _obtener_productos_async(
+        consulta, uso, presupuesto, preferencias, top_k, deadline)
+    async for i, explicacion in _explicaciones_por_llegada(pedidos, uso, deadline):
+        item = _armar_resultados([productos[i]], [explicacion], None, session_id, source)[0]
+        yield {"event": "item", "index": i, "item": item}
+
+    yield {"event": "done", "session_id": session_id, "source": source, "total": len(productos)}
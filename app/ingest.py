@@ -0,0 +1,238 @@
+# =====================================================
+# SEAC v1.8 — Importación masiva del catálogo (CSV / JSONL)
+# =====================================================
+# Uso:
+#   python -m app.ingest catalogo.csv
+#   python -m app.ingest catalogo.jsonl --chunk 2000
+#   python -m app.ingest catalogo.csv --dry-run        (solo valida, sin BD)
+#
+# Lee el archivo en streaming, normaliza cada fila con las mismas reglas que la API
+# (normalize.normalize_product / normalize_item), descarta duplicados por marca+modelo
+# y carga por lotes con persistence_sql.upsert_products. Tras cada lote guarda un
+# punto de control (<archivo>.ingest.json) para poder reanudar si se interrumpe.
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from . import log as seac_log
+from .normalize import key_of, normalize_item, normalize_product
+
+log = seac_log.get_logger("ingest")
+
+CHUNK_SIZE = int(os.getenv("SEAC_INGEST_CHUNK", "1000"))
+
+
+# ------------------------------------------------------
+# Lectura en streaming con posición en bytes
+# ------------------------------------------------------
+class _Lines:
+    """Itera las líneas (texto) de un archivo binario llevando la cuenta del byte siguiente."""
+
+    def __init__(self, f, offset: int):
+        self._f = f
+        self.offset = offset
+        f.seek(offset)
+
+    def __iter__(self) -> Iterator[str]:
+        for raw in self._f:
+            if self.offset == 0 and raw.startswith(b"\xef\xbb\xbf"):
+                raw = raw[3:]
+                self.offset += 3
+            self.offset += len(raw)
+            yield raw.decode("utf-8", errors="replace")
+
+
+def _detect_format(path: str, fmt: Optional[str]) -> str:
+    if fmt:
+        return fmt
+    return "jsonl" if path.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _csv_header(path: str) -> Tuple[List[str], int]:
+    """Encabezado del CSV y byte donde empiezan los datos."""
+    with open(path, "rb") as f:
+        lines = _Lines(f, 0)
+        header = next(csv.reader(iter(lines)), [])
+        return [h.strip() for h in header], lines.offset
+
+
+def read_records(path: str, fmt: str, offset: int = 0, header: Optional[List[str]] = None
+                 ) -> Iterator[Tuple[Optional[Dict[str, Any]], int]]:
+    """
+    Genera (fila o None si es inválida, byte siguiente). El csv.reader no lee por
+    adelantado, así que la posición corresponde exactamente al final de cada registro.
+    """
+    with open(path, "rb") as f:
+        lines = _Lines(f, offset)
+        if fmt == "csv":
+            for values in csv.reader(iter(lines)):
+                if not values:
+                    continue
+                yield dict(zip(header, values)), lines.offset
+        else:
+            for line in lines:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield (row if isinstance(row, dict) else None), lines.offset
+
+
+# ------------------------------------------------------
+# Normalización
+# ------------------------------------------------------
+def normalize_row(row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Fila cruda (claves en inglés o español) → producto estándar, o None si no tiene modelo."""
+    row = {str(k).strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+    # normalize_item reconoce los alias de Groq; lo que no cubra se toma de la fila original
+    groq = {k: v for k, v in normalize_item(row).items() if v not in ("", 0.0)}
+    p = normalize_product({**row, **groq})
+    if not p["name"]:
+        return None
+    if not p["id"]:
+        # id estable derivado de la clave: reimportar el mismo archivo no crea filas nuevas
+        p["id"] = "cat-" + hashlib.sha1(key_of(p).encode("utf-8")).hexdigest()[:16]
+    p["id"] = str(p["id"])[:100]
+    return p
+
+
+# ------------------------------------------------------
+# Punto de control
+# ------------------------------------------------------
+def _fingerprint(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime": int(st.st_mtime)}
+
+
+def load_checkpoint(cp_path: str, path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(cp_path):
+        return None
+    try:
+        with open(cp_path, "r", encoding="utf-8") as f:
+            cp = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cp.get("source") != _fingerprint(path):
+        log.warning("ingest.checkpoint_stale", "El archivo cambió desde el último punto de control; se importa desde el inicio")
+        return None
+    return cp
+
+
+def save_checkpoint(cp_path: str, cp: Dict[str, Any]):
+    tmp = cp_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cp, f, ensure_ascii=False)
+    os.replace(tmp, cp_path)
+
+
+# ------------------------------------------------------
+# Importación
+# ------------------------------------------------------
+def ingest(path: str, fmt: Optional[str] = None, chunk_size: int = CHUNK_SIZE,
+           checkpoint: Optional[str] = None, resume: bool = True, dry_run: bool = False) -> Dict[str, Any]:
+    fmt = _detect_format(path, fmt)
+    cp_path = checkpoint or path + ".ingest.json"
+    total_bytes = os.path.getsize(path)
+
+    loader = None
+    if not dry_run:
+        from .migrations import migrate
+        from .persistence_sql import upsert_products
+        migrate()  # no-op si el esquema ya está al día
+        loader = upsert_products
+
+    header, offset = (_csv_header(path) if fmt == "csv" else (None, 0))
+    stats = {"read": 0, "loaded": 0, "duplicates": 0, "invalid": 0, "chunks": 0}
+    cp = load_checkpoint(cp_path, path) if resume else None
+    if cp:
+        offset = cp["offset"]
+        stats.update(cp["stats"])
+        log.info("ingest.resume", "Reanudando desde el punto de control", offset=offset, loaded=stats["loaded"])
+
+    seen = set()
+    chunk: List[Dict[str, Any]] = []
+    t0 = time.perf_counter()
+    leidos_sesion = 0
+
+    def flush(next_offset: int):
+        nonlocal chunk
+        if chunk and loader is not None:
+            loader(chunk)
+        stats["loaded"] += len(chunk)
+        stats["chunks"] += 1
+        chunk = []
+        if not dry_run:
+            save_checkpoint(cp_path, {"source": _fingerprint(path), "format": fmt,
+                                      "offset": next_offset, "stats": stats})
+        dt = max(time.perf_counter() - t0, 1e-9)
+        pct = 100.0 * next_offset / total_bytes if total_bytes else 100.0
+        log.info("ingest.progress", f"{pct:5.1f}%", read=stats["read"], loaded=stats["loaded"],
+                 duplicates=stats["duplicates"], invalid=stats["invalid"], rows_per_s=round(leidos_sesion / dt))
+
+    next_offset = offset
+    for row, next_offset in read_records(path, fmt, offset, header):
+        stats["read"] += 1
+        leidos_sesion += 1
+        p = normalize_row(row) if row is not None else None
+        if p is None:
+            stats["invalid"] += 1
+            continue
+        key = key_of(p)
+        if key in seen:
+            stats["duplicates"] += 1
+            continue
+        seen.add(key)
+        chunk.append(p)
+        if len(chunk) >= chunk_size:
+            flush(next_offset)
+    if chunk or stats["chunks"] == 0:
+        flush(next_offset)
+
+    if not dry_run:
+        from .kb import invalidate_products
+        invalidate_products()  # una recarga completa del catálogo en memoria
+        if os.path.exists(cp_path):
+            os.remove(cp_path)
+
+    dt = time.perf_counter() - t0
+    stats["seconds"] = round(dt, 2)
+    log.info("ingest.done", "Importación terminada", loaded=stats["loaded"], seconds=stats["seconds"],
+             rows_per_s=round(leidos_sesion / max(dt, 1e-9)))
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m app.ingest",
+                                 description="Importa un catálogo de laptops (CSV o JSONL) a la tabla products.")
+    ap.add_argument("path", help="archivo .csv o .jsonl")
+    ap.add_argument("--format", choices=["csv", "jsonl"], help="por defecto según la extensión")
+    ap.add_argument("--chunk", type=int, default=CHUNK_SIZE, help=f"filas por lote (por defecto {CHUNK_SIZE})")
+    ap.add_argument("--checkpoint", help="archivo de punto de control (por defecto <path>.ingest.json)")
+    ap.add_argument("--restart", action="store_true", help="ignorar el punto de control y empezar de cero")
+    ap.add_argument("--dry-run", action="store_true", help="leer y normalizar sin escribir en la BD")
+    args = ap.parse_args(argv)
+    # CLI: texto legible salvo que se pida otro formato
+    seac_log.setup(fmt=os.getenv("SEAC_LOG_FORMAT", "text"))
+
+    if not os.path.exists(args.path):
+        log.error("ingest.missing_file", f"No existe el archivo: {args.path}")
+        return 2
+    try:
+        ingest(args.path, args.format, max(1, args.chunk), args.checkpoint,
+               resume=not args.restart, dry_run=args.dry_run)
+    except KeyboardInterrupt:
+        log.warning("ingest.interrupted", "Interrumpido; vuelve a ejecutar el mismo comando para reanudar")
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,196 @@
 # =====================================================
-# SEAC v1.3 — Carga de productos desde SQL Server
+# SEAC v1.3 — Carga de productos desde la base de datos
 # =====================================================
-from typing import List, Dict, Any
+# El catálogo se mantiene en memoria como una "foto" por columnas
+# (marca/SO/categoría internadas, precio y características en array('d')). Se carga una vez
+# y se refresca de forma incremental cuando alguien escribe en 'products'.
+import os
+import sys
+import threading
+import time
+from array import array
+from typing import List, Dict, Any, Iterable, Optional
 from .db import get_conn
+from .specs import FEATURE_COLUMNS, feature_values
+from .normalize import product_key
+from .timing import stage
+
+_COLUMNAS = ("id", "name", "brand", "category", "cpu", "gpu", "ram", "storage", "os", "price", "url") + FEATURE_COLUMNS
+_TEXTO = ("name", "brand", "category", "cpu", "gpu", "ram", "storage", "os", "url")
+_NUMERICAS = ("price",) + FEATURE_COLUMNS
+_INTERNADAS = ("brand", "category", "os")
+_SELECT = f"SELECT {', '.join(_COLUMNAS)} FROM products"
+
+# Recarga completa periódica para ver escrituras de otros procesos (s)
+CATALOG_TTL = float(os.getenv("SEAC_CATALOG_TTL", "300"))
+# Con más ids pendientes que esto conviene recargar todo (límite de parámetros por sentencia)
+_MAX_INCREMENTAL = 500
+
+
+class CatalogSnapshot:
+    """Foto inmutable del catálogo. Cada cambio produce una copia con nueva versión."""
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.ids: List[str] = []
+        self.pos: Dict[str, int] = {}
+        self.text: Dict[str, List[str]] = {c: [] for c in _TEXTO}
+        self.num: Dict[str, array] = {c: array("d") for c in _NUMERICAS}
+        self._by_key: Optional[Dict[str, int]] = None  # product_key → posición
+
+    @property
+    def price(self) -> array:
+        return self.num["price"]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def copy(self, version: int) -> "CatalogSnapshot":
+        snap = CatalogSnapshot(version)
+        snap.ids = list(self.ids)
+        snap.pos = dict(self.pos)
+        snap.text = {c: list(v) for c, v in self.text.items()}
+        snap.num = {c: array("d", v) for c, v in self.num.items()}
+        return snap
+
+    def put(self, row: Dict[str, Any]):
+        """Inserta o reemplaza una fila (solo mientras se construye la foto)."""
+        pid = str(row["id"])
+        values = {}
+        for c in _TEXTO:
+            v = row.get(c)
+            v = "" if v is None else str(v)
+            values[c] = sys.intern(v) if c in _INTERNADAS else v
+        nums = {c: float(row.get(c) or 0.0) for c in _NUMERICAS}
+
+        i = self.pos.get(pid)
+        if i is None:
+            self.pos[pid] = len(self.ids)
+            self.ids.append(pid)
+            for c in _TEXTO:
+                self.text[c].append(values[c])
+            for c in _NUMERICAS:
+                self.num[c].append(nums[c])
+        else:
+            for c in _TEXTO:
+                self.text[c][i] = values[c]
+            for c in _NUMERICAS:
+                self.num[c][i] = nums[c]
+
+    def row(self, i: int) -> Dict[str, Any]:
+        d = {"id": self.ids[i]}
+        for c in _TEXTO:
+            d[c] = self.text[c][i]
+        for c in _NUMERICAS:
+            d[c] = self.num[c][i]
+        return d
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [self.row(i) for i in range(len(self.ids))]
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        i = self.pos.get(product_id)
+        return None if i is None else self.row(i)
+
+    def find(self, name: str, brand: str) -> Optional[Dict[str, Any]]:
+        """Producto con la misma product_key (marca|nombre normalizados); índice creado al primer uso."""
+        if self._by_key is None:
+            names, brands = self.text["name"], self.text["brand"]
+            index = {}
+            for i in range(len(self.ids)):
+                index.setdefault(product_key(brands[i], names[i]), i)
+            self._by_key = index
+        i = self._by_key.get(product_key(brand, name))
+        return None if i is None else self.row(i)
+
+
+_catalog: Optional[CatalogSnapshot] = None
+_loaded_at = 0.0
+_dirty_ids: set = set()
+_full_reload = False
+_lock = threading.Lock()
+
+
+def _fetch(ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    with get_conn() as conn:
+        cur = conn.cursor()
+        if ids is None:
+            cur.execute(_SELECT + ";")
+        else:
+            marks = ", ".join("?" for _ in ids)
+            cur.execute(f"{_SELECT} WHERE id IN ({marks});", ids)
+        cols = [c[0] for c in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+
+    # Solo lectura: las filas antiguas las completa la migración 3 y las nuevas se
+    # escriben con sus características. Si aun así falta alguna, se calcula en memoria.
+    for r in rows:
+        if r.get("cpu_score") is None:
+            r.update(zip(FEATURE_COLUMNS, feature_values(r)))
+    return rows
+
+
+def _refresh_locked():
+    """Aplica la recarga pendiente (completa o por ids). Requiere _lock."""
+    global _catalog, _loaded_at, _full_reload
+    version = (_catalog.version + 1) if _catalog else 1
+
+    if (_catalog is None or _full_reload or len(_dirty_ids) > _MAX_INCREMENTAL
+            or time.monotonic() - _loaded_at > CATALOG_TTL):
+        snap = CatalogSnapshot(version)
+        for row in _fetch():
+            snap.put(row)
+        _dirty_ids.clear()
+        _full_reload = False
+        _catalog, _loaded_at = snap, time.monotonic()
+        return
+
+    if _dirty_ids:
+        ids = list(_dirty_ids)
+        rows = _fetch(ids)
+        _dirty_ids.difference_update(ids)
+        found = {str(r["id"]) for r in rows}
+        if any(i in _catalog.pos and i not in found for i in ids):
+            # Algún producto conocido desapareció → recarga completa
+            _full_reload = True
+            _refresh_locked()
+            return
+        snap = _catalog.copy(version)
+        for row in rows:
+            snap.put(row)
+        _catalog = snap
+
+
+def get_catalog() -> CatalogSnapshot:
+    """Devuelve la foto vigente del catálogo; solo consulta la BD si hay cambios pendientes."""
+    snap = _catalog
+    if snap is not None and not _dirty_ids and not _full_reload and time.monotonic() - _loaded_at <= CATALOG_TTL:
+        return snap
+    with stage("catalog"), _lock:
+        _refresh_locked()
+        return _catalog
+
+
+def invalidate_products(ids: Optional[Iterable[str]] = None):
+    """
+    Marca productos modificados para que la próxima lectura los recargue.
+    Sin ids se fuerza una recarga completa.
+    """
+    global _full_reload
+    with _lock:
+        if ids is None:
+            _full_reload = True
+        else:
+            _dirty_ids.update(str(i) for i in ids if i)
+
+
+def catalog_version() -> int:
+    return _catalog.version if _catalog else 0
+
 
 def load_products() -> List[Dict[str, Any]]:
     """
-    Carga los productos directamente desde la base de datos SQL Server.
+    Devuelve los productos del catálogo en memoria (una copia por fila).
     """
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, name, brand, category, cpu, gpu, ram, storage, os, price, url FROM products;")
-    cols = [c[0] for c in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    # La etapa "catalog" la mide get_catalog (solo cuando consulta la BD)
+    return get_catalog().rows()
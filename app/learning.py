@@ -1,14 +1,15 @@
 # ======================================================
 # SEAC v1.4 — Lógica de aprendizaje y retroalimentación
 # ======================================================
-from typing import Dict
-from .persistence_sql import (
-    add_feedback as _add_feedback_db,
-    load_weights as _load_w_db,
-    save_weights as _save_w_db,
-    add_or_update_product
-)
-from .db import get_conn
+import os
+import threading
+import time
+from typing import Dict, Optional
+from .persistence_sql import load_weights as _load_w_db, save_weights as _save_w_db
+from .metrics import register_gauge
+from .log import get_logger
+
+log = get_logger("learning")
 
 # Pesos base por defecto
 DEFAULT_TEMPLATE = {
@@ -17,15 +18,149 @@ DEFAULT_TEMPLATE = {
     "preferencia_marca": 0.3
 }
 
+# Relectura periódica de la tabla weights para ver lo escrito por otros procesos (s)
+WEIGHTS_REFRESH = float(os.getenv("SEAC_WEIGHTS_REFRESH", "60"))
+# Los cambios se guardan cada tantos segundos o al acumular tantos cambios
+WEIGHTS_FLUSH_INTERVAL = float(os.getenv("SEAC_WEIGHTS_FLUSH_INTERVAL", "2"))
+WEIGHTS_FLUSH_CHANGES = int(os.getenv("SEAC_WEIGHTS_FLUSH_CHANGES", "50"))
+
+
+class WeightsStore:
+    """
+    Pesos aprendidos en memoria del proceso. Leerlos no toca la BD; cada cambio marca
+    su 'uso' como pendiente y un hilo de fondo guarda solo esas filas (un upsert por uso).
+    """
+
+    def __init__(self, refresh: float = WEIGHTS_REFRESH, flush_interval: float = WEIGHTS_FLUSH_INTERVAL,
+                 flush_changes: int = WEIGHTS_FLUSH_CHANGES):
+        self.refresh = refresh
+        self.flush_interval = flush_interval
+        self.flush_changes = max(1, flush_changes)
+        self._weights: Dict[str, Dict[str, float]] = {}  # se reemplaza entero en cada cambio
+        self._dirty: set = set()
+        self._changes = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()      # estado en memoria
+        self._io_lock = threading.Lock()   # una lectura/escritura de BD a la vez
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # --- lectura ---
+    def _reload(self):
+        rows = _load_w_db()
+        with self._lock:
+            # Lo modificado aquí y aún no guardado tiene prioridad sobre la BD
+            for uso in self._dirty:
+                if uso in self._weights:
+                    rows[uso] = self._weights[uso]
+            if "default" not in rows:
+                rows["default"] = DEFAULT_TEMPLATE.copy()
+                self._dirty.add("default")
+            self._weights = rows
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at <= self.refresh:
+            return
+        with self._io_lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh:
+                self._reload()
+        self.start()
+
+    def view(self) -> Dict[str, Dict[str, float]]:
+        """Pesos vigentes sin copiar (solo lectura)."""
+        self._ensure_fresh()
+        return self._weights
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {uso: dict(w) for uso, w in self.view().items()}
+
+    # --- escritura ---
+    def apply_feedback(self, uso: str, rating: float, lr: float = 0.05) -> Dict[str, float]:
+        """Aplica update_weights_from_feedback a un solo uso y devuelve sus nuevos pesos."""
+        self._ensure_fresh()
+        with self._lock:
+            actual = {uso: dict(self._weights[uso])} if uso in self._weights else {}
+            nuevo = update_weights_from_feedback(actual, uso, rating, lr)[uso]
+            self._set_locked({uso: nuevo})
+            trigger = self._changes >= self.flush_changes
+        if trigger:
+            self._wake.set()
+        return dict(nuevo)
+
+    def replace(self, weights: Dict[str, Dict[str, float]]):
+        """Reemplaza los usos indicados y los guarda de inmediato."""
+        self._ensure_fresh()
+        with self._lock:
+            self._set_locked({uso: dict(w) for uso, w in weights.items()})
+        self.flush()
+
+    def _set_locked(self, cambios: Dict[str, Dict[str, float]]):
+        self._weights = {**self._weights, **cambios}
+        self._dirty.update(cambios)
+        self._changes += len(cambios)
+
+    def flush(self) -> int:
+        """Guarda las filas pendientes (un upsert por uso). Devuelve cuántas se escribieron."""
+        with self._io_lock:
+            with self._lock:
+                if not self._dirty:
+                    return 0
+                pendientes = {uso: self._weights[uso] for uso in self._dirty if uso in self._weights}
+                self._dirty.clear()
+                self._changes = 0
+            try:
+                _save_w_db(pendientes)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(pendientes)  # se reintenta en el próximo ciclo
+                raise
+        return len(pendientes)
+
+    # --- hilo de guardado ---
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="seac-weights", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log.error("weights.flush_failed", f"No se pudieron guardar los pesos: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"usos": len(self._weights), "dirty": len(self._dirty)}
+
+
+_store = WeightsStore()
+
 # ------------------------------------------------------
 # Cargar pesos
 # ------------------------------------------------------
 def load_weights() -> Dict[str, Dict[str, float]]:
-    w = _load_w_db()
-    if not w or "default" not in w:
-        w = {"default": DEFAULT_TEMPLATE.copy(), **w}
-        _save_w_db(w)
-    return w
+    """Copia de los pesos en memoria (se leen de la BD solo al inicio y cada WEIGHTS_REFRESH)."""
+    return _store.snapshot()
+
+def current_weights() -> Dict[str, Dict[str, float]]:
+    """Pesos en memoria sin copiar; no modificar el resultado."""
+    return _store.view()
 
 # ------------------------------------------------------
 # Guardar pesos
@@ -34,7 +169,20 @@ def save_weights(w: Dict[str, Dict[str, float]]):
     for uso, block in w.items():
         for k, v in block.items():
             block[k] = float(round(v, 3))
-    _save_w_db(w)
+    _store.replace(w)
+
+def apply_feedback(uso: str, rating: float) -> Dict[str, float]:
+    """Actualiza en memoria los pesos de 'uso'; se guardan en segundo plano."""
+    return _store.apply_feedback(uso, rating)
+
+def flush_weights():
+    """Guarda los cambios pendientes y detiene el hilo de guardado (al apagar)."""
+    _store.stop()
+
+def weights_stats() -> dict:
+    return _store.stats()
+
+register_gauge("seac_weights", weights_stats, "Pesos en memoria y guardados pendientes")
 
 # ------------------------------------------------------
 # Actualizar pesos según feedback
@@ -58,21 +206,14 @@ def add_feedback_entry(session_id: str, product: dict, uso: str, rating: float):
     Registra feedback y crea la sesión si no existe.
     Solo guarda el producto si el usuario dio 'me gusta' (rating >= 0.8)
     """
-    from .persistence_sql import add_feedback as _add_feedback_db, add_or_update_product
-    from .db import get_conn
+    from .persistence_sql import add_feedback as _add_feedback_db, add_or_update_product, ensure_session
 
     # Crear sesión si no existe (para evitar FK)
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    IF NOT EXISTS (SELECT 1 FROM sessions WHERE session_id=?)
-        INSERT INTO sessions (session_id, uso, presupuesto) VALUES (?, ?, 0);
-    """, (session_id, session_id, uso))
-    conn.close()
+    ensure_session(session_id, uso)
 
     # Solo guardar el producto si el rating es alto (me gusta)
     if rating >= 0.8:
         add_or_update_product(product)
 
-    # Registrar feedback siempre
-    _add_feedback_db(session_id, product.get("id", ""), uso, rating)
\ No newline at end of file
+    # Registrar feedback siempre (con el dict completo para reconocer el producto)
+    _add_feedback_db(session_id, product, uso, rating)
\ No newline at end of file
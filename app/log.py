@@ -0,0 +1,230 @@
+# =====================================================
+# SEAC v1.8 — Logging estructurado sin bloquear (cola + hilo escritor)
+# =====================================================
+# log = get_logger("api_internet")
+# log.info("groq.products", "Productos recibidos desde Groq", count=8)
+#   - El primer argumento es el tipo de mensaje ('event'): clave del límite de
+#     frecuencia y del muestreo, y campo del JSON.
+#   - La ruta solo arma el registro y lo deja en una cola acotada; un hilo
+#     (QueueListener) lo formatea y escribe en stdout. Con la cola llena se descarta.
+#   - Límite por tipo: SEAC_LOG_RATE mensajes/s (ráfaga SEAC_LOG_BURST); los
+#     suprimidos se informan en el siguiente que pasa ("suppressed": n).
+#   - Muestreo por tipo para INFO/DEBUG: SEAC_LOG_SAMPLE="session.cached=0.1,product.*=0.5".
+#   - SEAC_LOG_FORMAT=json (por defecto) | text; SEAC_LOG_LEVEL=INFO.
+import atexit
+import datetime
+import fnmatch
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .metrics import register_gauge
+
+LOG_LEVEL = os.getenv("SEAC_LOG_LEVEL", "INFO").strip().upper()
+LOG_FORMAT = os.getenv("SEAC_LOG_FORMAT", "json").strip().lower()
+LOG_QUEUE_SIZE = int(os.getenv("SEAC_LOG_QUEUE_SIZE", "10000"))
+LOG_RATE = float(os.getenv("SEAC_LOG_RATE", "50"))       # mensajes/s por tipo (0 = sin límite)
+LOG_BURST = float(os.getenv("SEAC_LOG_BURST", "100"))
+
+
+def _parse_sample(spec: str) -> Dict[str, float]:
+    out = {}
+    for part in spec.split(","):
+        patron, _, frac = part.strip().partition("=")
+        if patron and frac:
+            out[patron.strip()] = float(frac)
+    return out
+
+
+LOG_SAMPLE = _parse_sample(os.getenv("SEAC_LOG_SAMPLE", ""))
+
+_ROOT = "seac"
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+# ------------------------------------------------------
+# Formato
+# ------------------------------------------------------
+def _ts(record: logging.LogRecord) -> str:
+    return datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _fields(record: logging.LogRecord) -> Dict[str, Any]:
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED and k != "event"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": _ts(record),
+            "level": record.levelname.lower(),
+            "logger": record.name[len(_ROOT) + 1:] or record.name,
+            "event": getattr(record, "event", None),
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        extra = " ".join(f"{k}={v}" for k, v in _fields(record).items())
+        line = f"{_ts(record)} {record.levelname:<7} [{record.name[len(_ROOT) + 1:]}] {record.getMessage()}"
+        if extra:
+            line += f" ({extra})"
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+# ------------------------------------------------------
+# Límite de frecuencia y muestreo por tipo de mensaje
+# ------------------------------------------------------
+class RateLimitFilter(logging.Filter):
+    """Token bucket por 'event'; los INFO/DEBUG además pasan por el muestreo de LOG_SAMPLE."""
+
+    def __init__(self, rate: float = LOG_RATE, burst: float = LOG_BURST, sample: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.sample = LOG_SAMPLE if sample is None else sample
+        self._buckets: Dict[str, Tuple[float, float, int]] = {}  # event → (tokens, último, suprimidos)
+        self._sample_cache: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _fraction(self, event: str) -> float:
+        frac = self._sample_cache.get(event)
+        if frac is None:
+            frac = next((f for p, f in self.sample.items() if fnmatch.fnmatchcase(event, p)), 1.0)
+            self._sample_cache[event] = frac
+        return frac
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None) or record.name
+        if record.levelno < logging.WARNING and self.sample and random.random() >= self._fraction(event):
+            return False
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suprimidos = self._buckets.get(event, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1.0:
+                self._buckets[event] = (tokens, now, suprimidos + 1)
+                return False
+            self._buckets[event] = (tokens - 1.0, now, 0)
+        if suprimidos:
+            record.suppressed = suprimidos
+        return True
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloquea: con la cola llena cuenta el descarte y sigue."""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # El mensaje se arma aquí (args pueden cambiar después); el formato final, en el hilo escritor
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _DroppingQueueHandler.dropped += 1
+
+
+# ------------------------------------------------------
+# Configuración
+# ------------------------------------------------------
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[_DroppingQueueHandler] = None
+_setup_lock = threading.Lock()
+
+
+def setup(fmt: Optional[str] = None, level: Optional[str] = None, stream=None):
+    """(Re)configura el logger 'seac'. Se llama solo al primer get_logger; los CLI pueden pedir fmt="text"."""
+    global _listener, _handler
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+        salida = logging.StreamHandler(stream or sys.stdout)
+        salida.setFormatter(TextFormatter() if (fmt or LOG_FORMAT) == "text" else JsonFormatter())
+        q: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        handler = _DroppingQueueHandler(q)
+        handler.addFilter(RateLimitFilter())
+        root = logging.getLogger(_ROOT)
+        if _handler is not None:
+            root.removeHandler(_handler)
+        root.addHandler(handler)
+        root.setLevel(level or LOG_LEVEL)
+        root.propagate = False
+        _handler = handler
+        _listener = logging.handlers.QueueListener(q, salida)
+        _listener.start()
+
+
+def shutdown():
+    """Escribe lo pendiente y detiene el hilo escritor (apagado de la app y atexit)."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown)
+
+
+def stats() -> dict:
+    return {"queued": _handler.queue.qsize() if _handler is not None else 0,
+            "dropped": _DroppingQueueHandler.dropped}
+
+
+register_gauge("seac_log", stats, "Cola del logging (mensajes en espera y descartados)")
+
+
+class Logger:
+    """Envoltura fina de logging.Logger: tipo de mensaje + texto + campos estructurados."""
+
+    __slots__ = ("_log",)
+
+    def __init__(self, log: logging.Logger):
+        self._log = log
+
+    def _emit(self, level: int, event: str, msg: str, fields: Dict[str, Any], exc_info=None):
+        if self._log.isEnabledFor(level):
+            self._log.log(level, msg, extra={"event": event, **fields}, exc_info=exc_info,
+                          stacklevel=3)  # funcName/lineno del llamador, no de esta envoltura
+
+    def debug(self, event: str, msg: str, **fields):
+        self._emit(logging.DEBUG, event, msg, fields)
+
+    def info(self, event: str, msg: str, **fields):
+        self._emit(logging.INFO, event, msg, fields)
+
+    def warning(self, event: str, msg: str, **fields):
+        self._emit(logging.WARNING, event, msg, fields)
+
+    def error(self, event: str, msg: str, exc_info=None, **fields):
+        self._emit(logging.ERROR, event, msg, fields, exc_info)
+
+    def enabled(self, level: int = logging.INFO) -> bool:
+        return self._log.isEnabledFor(level)
+
+
+def get_logger(name: str) -> Logger:
+    if _listener is None:
+        setup()
+    return Logger(logging.getLogger(f"{_ROOT}.{name}"))
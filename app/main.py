@@ -2,92 +2,188 @@
 # FastAPI — SEAC v1.4 (con caché temporal y feedback selectivo)
 # ===============================================
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import Response, HTMLResponse
+from fastapi.responses import Response, HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
 from typing import List
+import asyncio
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
 load_dotenv()
 
 from .schemas import Consulta, Recomendacion, Feedback, Producto
-from .inference_net import infer_hibrido
+from .inference_net import infer_hibrido_async, infer_hibrido_stream
 from .persistence_sql import add_session
-from .learning import load_weights, save_weights, update_weights_from_feedback
+from .learning import apply_feedback, flush_weights
 from .users_controller import router as users_router
 
-from .db import get_conn
-
+from .db import run_db, shutdown_db, storage
+from .connectors.async_http import aclose as close_http_client
+from .connectors import transport as llm_transport
+from .kb import get_catalog
+from .normalize import normalize_product
+from .fuzzy import best_match
+from . import session_cache, feedback_queue, migrations
+from .timing import collect, server_timing, stage
+from . import metrics, profiling
+from .log import get_logger
+
+
+log = get_logger("main")
+
+# ===================== CICLO DE VIDA =====================
+def migrar_esquema():
+    """Solo el worker líder migra y en segundo plano: el arranque no espera a la BD (ver /ready)."""
+    migrations.start_leader()
+
+def prewarm():
+    """Si SEAC_PREWARM_USOS está definido, precalienta en segundo plano las explicaciones del catálogo."""
+    usos = [u.strip() for u in os.getenv("SEAC_PREWARM_USOS", "").split(",") if u.strip()]
+    if not usos:
+        return
+    from .inference_net import prewarm_explicaciones
+    top_n = int(os.getenv("SEAC_PREWARM_TOP", "5"))
+    presupuestos = tuple(float(p) for p in os.getenv("SEAC_PREWARM_PRESUPUESTOS", "800").split(",") if p.strip())
+    threading.Thread(target=prewarm_explicaciones, args=(usos, top_n, presupuestos), daemon=True,
+                     name="seac-prewarm").start()
+
+async def cerrar_recursos():
+    await close_http_client()
+    # Escribir el feedback pendiente antes de cerrar el pool
+    await asyncio.get_running_loop().run_in_executor(None, feedback_queue.shutdown)
+    await asyncio.get_running_loop().run_in_executor(None, flush_weights)
+    shutdown_db()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque (migración, precalentamiento, cola de feedback) y cierre ordenado de recursos."""
+    migrar_esquema()
+    prewarm()
+    feedback_queue.start()
+    yield
+    await cerrar_recursos()
 
 # ===================== APP =====================
-app = FastAPI(title="SEAC — Sistema Experto Asistente de Compras", version="1.4")
+app = FastAPI(title="SEAC — Sistema Experto Asistente de Compras", version="1.4", lifespan=lifespan)
 
 if os.path.isdir("app/static"):
     app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
 templates = Jinja2Templates(directory="app/templates")
 
-# ===================== CACHE DE PRODUCTOS =====================
-cache_productos = {}  # Almacena productos de la última inferencia
-
+# ===================== TIEMPOS POR ETAPA =====================
+# Con SEAC_SERVER_TIMING=1 cada respuesta lleva la cabecera Server-Timing
+# (catalog, scoring, cbr, fuzzy, groq, llm, persistence, ...). La usa bench/.
+SERVER_TIMING = os.getenv("SEAC_SERVER_TIMING", "0") == "1"
+
+if SERVER_TIMING:
+    @app.middleware("http")
+    async def tiempos_por_etapa(request: Request, call_next):
+        with collect() as stages:
+            response = await call_next(request)
+        if stages:
+            response.headers["Server-Timing"] = server_timing(stages)
+        return response
+
+# ===================== MÉTRICAS =====================
+# Peticiones y latencia por ruta (plantilla de la ruta, no la URL: /users/{user_id}/...).
+# Se leen en GET /metrics (formato Prometheus); SEAC_METRICS=0 las desactiva.
+METRICS = os.getenv("SEAC_METRICS", "1") == "1"
+
+if METRICS:
+    @app.middleware("http")
+    async def metricas_http(request: Request, call_next):
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            path = getattr(route, "path", None) or "otras"
+            metrics.HTTP_SECONDS.observe(time.perf_counter() - t0, request.method, path)
+            metrics.HTTP_REQUESTS.inc(request.method, path, status)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metricas():
+        return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+# ===================== PERFILADO =====================
+# Con la cabecera X-SEAC-Profile: 1 | cpu (o SEAC_PROFILE_SAMPLE) la petición registra
+# su árbol de spans: resumen en Server-Timing (prof.*) y completo en /debug/profile/{id}.
+# Desactivado por defecto; con SEAC_PROFILE=1 solo lo usan clientes autorizados
+# (SEAC_PROFILE_TOKEN o conexión local directa, ver profiling.authorized).
+PROFILING = os.getenv("SEAC_PROFILE", "0") == "1"
+
+if PROFILING:
+    @app.middleware("http")
+    async def perfilado(request: Request, call_next):
+        host = request.client.host if request.client else None
+        if not profiling.authorized(host, request.headers):
+            return await call_next(request)
+        modo = profiling.wanted(request.headers.get(profiling.HEADER))
+        if modo is None:
+            return await call_next(request)
+        with profiling.profile("request", cpu=(modo == "cpu")) as prof:
+            response = await call_next(request)
+        response.headers.append("Server-Timing", prof.server_timing())
+        response.headers["X-SEAC-Profile-Id"] = prof.id
+        return response
+
+    @app.get("/debug/profile/{profile_id}", include_in_schema=False)
+    async def perfil(profile_id: str, request: Request):
+        if not profiling.authorized(request.client.host if request.client else None, request.headers):
+            raise HTTPException(status_code=403, detail="Perfilado solo para clientes autorizados.")
+        data = profiling.get_profile(profile_id)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Perfil no encontrado (o ya descartado).")
+        return data
+
+# ===================== MIGRACIONES =====================
+# /ready no espera más que esto a la BD (segundos)
+READY_TIMEOUT = float(os.getenv("SEAC_READY_TIMEOUT", "2"))
 
 # ===================== FRONTEND =====================
 @app.get("/favicon.ico")
-def favicon():
+async def favicon():
     return Response(status_code=204)
 
 
 @app.get("/", response_class=HTMLResponse)
-def home(request: Request):
+async def home(request: Request):
     return templates.TemplateResponse("bienvenida.html", {"request": request})
 
 @app.get("/index", response_class=HTMLResponse)
-def ui_index(request: Request):
+async def ui_index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 # ===================== BACKEND =====================
 @app.get("/health")
-def health():
-    return {"status": "ok", "version": "1.4"}
+async def health():
+    return {"status": "ok", "version": "1.4", "db": storage.describe(), "feedback_queue": feedback_queue.stats(),
+            "llm_transport": llm_transport.get_transport().describe()}
+
+@app.get("/ready")
+async def ready():
+    """200 cuando la BD responde y el esquema está al día; 503 mientras tanto (para el balanceador)."""
+    try:
+        estado = await asyncio.wait_for(run_db(migrations.readiness), READY_TIMEOUT)
+    except asyncio.TimeoutError:
+        estado = {"ready": False, "db": "timeout"}
+    return JSONResponse(estado, status_code=200 if estado["ready"] else 503)
 
 @app.get("/version")
-def version():
+async def version():
     return {"app": "SEAC — Sistema Experto Asistente de Compras", "version": "1.4"}
 
 
-# -------- Normalizador de productos --------
-def _normalize_product_dict(prod_dict: dict) -> dict:
-    """Convierte claves en español o inglés al formato estándar y asegura que todos los campos existan."""
-    def pick(*keys, default=""):
-        for k in keys:
-            if k in prod_dict and prod_dict[k] not in (None, ""):
-                return prod_dict[k]
-        return default
-
-    # Precio robusto
-    raw_price = pick("price", "precio", default=0)
-    if isinstance(raw_price, str):
-        try:
-            raw_price = float(raw_price.replace("$", "").replace(",", "").strip())
-        except Exception:
-            raw_price = 0.0
-    elif not isinstance(raw_price, (int, float)):
-        raw_price = 0.0
-
-    normalized = {
-        "id": pick("id", default=""),
-        "name": pick("name", "modelo", default=""),
-        "brand": pick("brand", "marca", default=""),
-        "category": pick("category", default="Laptop"),
-        "cpu": pick("cpu", "procesador", default=""),
-        "gpu": pick("gpu", "tarjeta_grafica", default=""),
-        "ram": pick("ram", "memoria_ram", default=""),
-        "storage": pick("storage", "almacenamiento", default=""),
-        "os": pick("os", "sistema_operativo", default=""),
-        "price": float(raw_price),
-        "url": pick("url", "link", default=""),
-    }
-    return normalized
+# -------- Normalizador de productos (ver app/normalize.py) --------
+_normalize_product_dict = normalize_product
 
 
 # -------- Descripción formal --------
@@ -106,156 +202,170 @@ def _descripcion_formal(prod: dict, uso: str) -> str:
     return f"{nombre} — {cuerpo}. {cierre}"
 
 
+def _recomendacion(item: dict, uso: str, session_id: str) -> dict:
+    """Normaliza un resultado del motor, lo recuerda en su sesión y le agrega la descripción formal."""
+    prod_norm = _normalize_product_dict(item.get("product", {}))
+
+    # Guardar producto en la caché de la sesión (lo usa /feedback)
+    if prod_norm.get("id") and prod_norm["id"] != "ajuste-info":
+        session_cache.remember(session_id, prod_norm, item.get("source"))
+
+    prod = Producto(**prod_norm)
+    descripcion = _descripcion_formal(prod_norm, uso)
+    return {
+        "product": prod.model_dump(),
+        "score": item.get("score", 0),
+        "reasons": item.get("reasons", []) + [descripcion],
+        "session_id": session_id,
+        "source": item.get("source")
+    }
+
+
 # -------- Endpoint principal /infer --------
 @app.post("/infer", response_model=List[Recomendacion])
-def inferir(consulta: Consulta):
+async def inferir(consulta: Consulta, response: Response):
     try:
-        from .persistence_sql import add_or_update_product
-
-        resultados = infer_hibrido(consulta.model_dump())
+        resultados = await infer_hibrido_async(consulta.model_dump())
         if not resultados:
             return []
 
-        out = []
         session_id = resultados[0].get("session_id")
         if session_id:
-            add_session(session_id, consulta.uso, consulta.presupuesto)
-
-        global cache_productos
-        cache_productos.clear()  # limpiar la caché anterior
-
-        for item in resultados:
-            prod_dict = item.get("product", {})
-            prod_norm = _normalize_product_dict(prod_dict)
-
-            # Guardar producto temporalmente en caché
-            if prod_norm.get("id"):
-                cache_productos[prod_norm["id"]] = prod_norm
-
-            prod = Producto(**prod_norm)
-            descripcion = _descripcion_formal(prod_norm, consulta.uso)
-            reasons = item.get("reasons", []) + [descripcion]
-            out.append({
-                "product": prod.model_dump(),
-                "score": item.get("score", 0),
-                "reasons": reasons,
-                "session_id": session_id
-            })
+            with stage("persistence"):
+                await run_db(add_session, session_id, consulta.uso, consulta.presupuesto)
+
+        out = [_recomendacion(item, consulta.uso, session_id) for item in resultados]
 
-        print(f"[CACHE] {len(cache_productos)} productos guardados temporalmente.")
+        log.debug("session.cached", "Productos guardados para la sesión", session_id=session_id,
+                  count=session_cache.session_size(session_id))
+        response.headers["X-SEAC-Source"] = resultados[0].get("source") or ""
         return out
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error interno en /infer: {e}")
 
+
+# -------- Endpoint /infer/stream (NDJSON progresivo) --------
+@app.post("/infer/stream")
+async def inferir_stream(consulta: Consulta):
+    """
+    Igual que /infer, pero responde una línea JSON por evento apenas está lista:
+    session → ajuste (opcional) → item (uno por recomendación) → done.
+    Si algo falla a mitad de camino se envía {"event": "error", "detail": ...}.
+    """
+    async def eventos():
+        sesion = None
+        try:
+            async for ev in infer_hibrido_stream(consulta.model_dump()):
+                if ev["event"] == "session":
+                    # La sesión se guarda mientras el motor sigue trabajando
+                    sesion = asyncio.ensure_future(
+                        run_db(add_session, ev["session_id"], consulta.uso, consulta.presupuesto))
+                elif "item" in ev:
+                    ev["item"] = _recomendacion(ev["item"], consulta.uso, ev["item"].get("session_id"))
+                elif ev["event"] == "done" and sesion is not None:
+                    await sesion
+                    log.debug("session.cached", "Productos guardados para la sesión", session_id=ev["session_id"],
+                              count=session_cache.session_size(ev["session_id"]))
+                yield json.dumps(ev, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "detail": f"Error interno en /infer/stream: {e}"},
+                             ensure_ascii=False) + "\n"
+
+    return StreamingResponse(eventos(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 app.include_router(users_router)
 
 # -------- Endpoint /feedback --------
-@app.post("/feedback")
-def feedback(fb: Feedback):
+@app.post("/feedback", status_code=202)
+async def feedback(fb: Feedback):
+    """
+    Valida, resuelve el producto en memoria y encola; la escritura en BD la hace feedback_queue.
+    Responde 202 con los mismos campos que la versión síncrona (ok, uso, rating,
+    producto_guardado, weights) más encolado y product_id. 503 si no se pudo resolver
+    el producto (catálogo o BD no disponibles) o si la cola está llena.
+    """
+    uso = fb.notes or "default"
     try:
-        from .learning import add_feedback_entry
-        conn = get_conn()
-        cur = conn.cursor()
-
-        # 🟢 Buscar producto por nombre + marca
-        cur.execute("""
-            SELECT TOP 1 * FROM products
-            WHERE LOWER(name)=LOWER(?) AND LOWER(brand)=LOWER(?)
-        """, (fb.product_name, fb.brand or ""))
-        row = cur.fetchone()
-
-        producto = None
-        if row:
-            cols = [c[0] for c in cur.description]
-            producto = dict(zip(cols, row))
-            print(f"✅ Producto encontrado → {fb.brand} {fb.product_name}")
-
-            # 🧩 Actualizar campos vacíos con nuevos datos
-            update_fields = {}
-            for field in ["cpu", "gpu", "ram", "storage", "os", "price"]:
-                valor_nuevo = getattr(fb, field, None)
-                if (not producto.get(field)) and valor_nuevo:
-                    update_fields[field] = valor_nuevo
-
-            if update_fields:
-                sets = ", ".join([f"{k}=?" for k in update_fields])
-                params = list(update_fields.values()) + [producto["id"]]
-                cur.execute(f"UPDATE products SET {sets} WHERE id=?", params)
-                conn.commit()
-                print(f"♻️ Producto actualizado → {fb.brand} {fb.product_name}")
-
-        # 🟠 Si no existe, crear producto completo
-        if not producto:
-            new_id = f"auto-{(fb.brand or 'unk')[:3]}-{(fb.product_name or 'prod')[:5]}".replace(" ", "").lower()
-            cur.execute("""
-                INSERT INTO products (id, name, brand, category, cpu, gpu, ram, storage, os, price, url)
-                VALUES (?, ?, ?, 'Laptop', ?, ?, ?, ?, ?, ?, '');
-            """, (
-                new_id,
-                fb.product_name or "Desconocido",
-                fb.brand or "(desconocida)",
-                getattr(fb, "cpu", ""),
-                getattr(fb, "gpu", ""),
-                getattr(fb, "ram", ""),
-                getattr(fb, "storage", ""),
-                getattr(fb, "os", ""),
-                getattr(fb, "price", 0.0)
-            ))
-            conn.commit()
-            producto = {
-                "id": new_id,
-                "name": fb.product_name,
-                "brand": fb.brand,
-                "cpu": getattr(fb, "cpu", ""),
-                "gpu": getattr(fb, "gpu", ""),
-                "ram": getattr(fb, "ram", ""),
-                "storage": getattr(fb, "storage", ""),
-                "os": getattr(fb, "os", ""),
-                "price": getattr(fb, "price", 0.0)
-            }
-            print(f"🆕 Producto creado → {producto['brand']} {producto['name']}")
-
-        # 💾 Guardar feedback en tabla feedback
-        add_feedback_entry(fb.session_id, producto, fb.notes or "default", fb.rating)
-
-        # ⭐ Agregar a favoritos solo si el usuario existe y no está repetido
-        if fb.rating >= 0.8 and fb.user_id:
-            cur.execute("""
-                SELECT TOP 1 f.product_id
-                FROM favorites f
-                JOIN products p ON p.id = f.product_id
-                WHERE f.user_id = ? AND LOWER(p.name)=LOWER(?) AND LOWER(p.brand)=LOWER(?)
-            """, (fb.user_id, producto["name"], producto["brand"]))
-            exists = cur.fetchone()
-
-            if exists:
-                print(f"⚠️ El usuario {fb.user_id} ya tenía este producto en favoritos ({producto['name']}).")
-            else:
-                cur.execute("""
-                    INSERT INTO favorites (user_id, product_id)
-                    VALUES (?, ?);
-                """, (fb.user_id, producto["id"]))
-                print(f"⭐ Producto agregado a favoritos → {producto['name']}")
-            conn.commit()
-
-        # 🧠 Aprendizaje adaptativo
-        weights = load_weights()
-        uso = fb.notes or "default"
-        new_w = update_weights_from_feedback(weights, uso, fb.rating)
-        save_weights(new_w)
-
-        conn.close()
-        return {
-            "ok": True,
-            "uso": uso,
-            "rating": fb.rating,
-            "producto_guardado": producto["name"],
-            "weights": new_w.get(uso, {})
-        }
-
+        with stage("resolve"):
+            producto, upsert = await run_db(_resolver_producto, fb)
     except Exception as e:
-        import traceback
-        print("❌ Error interno en /feedback:")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        log.error("feedback.resolve_failed", f"No se pudo resolver el producto del feedback: {e}",
+                  session_id=fb.session_id, product_id=fb.product_id, error=type(e).__name__)
+        raise HTTPException(status_code=503, detail="No se pudo resolver el producto; reintentar.",
+                            headers={"Retry-After": "1"})
+    try:
+        with stage("persistence"):
+            feedback_queue.enqueue({
+                "session_id": fb.session_id,
+                "uso": uso,
+                "rating": fb.rating,
+                "user_id": fb.user_id,
+                "product": producto,
+                "upsert": upsert,
+            })
+    except feedback_queue.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+    # 🧠 Aprendizaje adaptativo: en memoria; learning guarda la fila del uso en segundo plano
+    with stage("weights"):
+        new_w = await run_db(apply_feedback, uso, fb.rating)
+
+    return {
+        "ok": True,
+        "encolado": True,
+        "uso": uso,
+        "rating": fb.rating,
+        "producto_guardado": producto["name"],
+        "product_id": producto["id"],
+        "weights": new_w
+    }
+
+
+def _resolver_producto(fb: Feedback):
+    """
+    Producto del feedback sin consultar la BD: caché de la sesión → catálogo en memoria
+    (product_key y luego coincidencia difusa) → datos enviados por el cliente. Devuelve (producto, upsert), donde
+    upsert indica si la cola debe insertar o completar la fila en products.
+    """
+    encontrado = session_cache.lookup(fb.session_id, fb.product_id) if fb.product_id else None
+    mostrado, source = encontrado if encontrado else (None, None)
+
+    if mostrado is not None and source == "local":
+        producto, existe = mostrado, True
+    else:
+        nombre = mostrado["name"] if mostrado else fb.product_name
+        marca = mostrado["brand"] if mostrado else (fb.brand or "")
+        catalogo = get_catalog()
+        existente = catalogo.get(mostrado["id"]) if mostrado else None
+        if existente is None:
+            existente = catalogo.find(nombre, marca)
+        if existente is None:
+            match = best_match(mostrado or {"brand": marca, "name": nombre, "cpu": fb.cpu, "gpu": fb.gpu})
+            existente = match.product if match else None
+        if existente is not None:
+            producto, existe = existente, True
+            for k, v in (mostrado or {}).items():
+                if v and not producto.get(k):
+                    producto[k] = v
+        elif mostrado is not None:
+            producto, existe = mostrado, False
+        else:
+            producto, existe = {
+                "id": f"auto-{(fb.brand or 'unk')[:3]}-{(fb.product_name or 'prod')[:5]}".replace(" ", "").lower(),
+                "name": fb.product_name or "Desconocido",
+                "brand": fb.brand or "(desconocida)",
+                "category": "Laptop",
+                "url": "",
+            }, False
+
+    # 🧩 Completar campos vacíos con lo que envió el cliente
+    completados = False
+    for field in ["cpu", "gpu", "ram", "storage", "os", "price"]:
+        valor_nuevo = getattr(fb, field, None)
+        if (not producto.get(field)) and valor_nuevo:
+            producto[field] = valor_nuevo
+            completados = True
+
+    return producto, (not existe) or completados
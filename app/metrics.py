@@ -0,0 +1,230 @@
+# =====================================================
+# SEAC v1.8 — Métricas en formato de texto de Prometheus (/metrics)
+# =====================================================
+# Registro propio, sin dependencias ni servicios externos:
+#   Counter / Histogram con etiquetas → se actualizan en el camino de cada petición
+#   register_gauge(nombre, fn)        → fn() se evalúa al leer /metrics (cachés, pool, colas)
+# Métricas predefinidas: peticiones y latencia por ruta (middleware de main), etapas
+# del pipeline (timing.record), llamadas a Groq (connectors/transport) y consultas de
+# BD por función de persistencia (@db_timed).
+import bisect
+import functools
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .profiling import span
+
+# Segundos; cubre desde el scoring (ms) hasta Groq (decenas de segundos)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(v: Any) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Tuple[Any, ...]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: se esperaban las etiquetas {self.labelnames}, llegó {labels}")
+        return tuple(str(v) for v in labels)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas → [cuentas por bucket..., +Inf], suma
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: Any):
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[i] += 1
+            total[0] += value
+
+    def count(self, *labels: Any) -> int:
+        with self._lock:
+            item = self._values.get(self._key(labels))
+            return sum(item[0]) if item else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._values.items())
+        out = []
+        for key, (counts, total) in items:
+            acumulado = 0
+            for le, n in zip(self.buckets + (math.inf,), counts):
+                acumulado += n
+                le_label = 'le="' + _num(le) + '"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le_label)} {acumulado}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {acumulado}")
+        return out
+
+
+# ------------------------------------------------------
+# Registro
+# ------------------------------------------------------
+_registry: Dict[str, _Metric] = {}
+_gauges: List[Tuple[str, str, Callable[[], Any], Dict[str, str]]] = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        existente = _registry.get(metric.name)
+        if existente is not None:
+            return existente
+        _registry[metric.name] = metric
+    return metric
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help, labelnames, buckets))
+
+
+def register_gauge(name: str, fn: Callable[[], Any], help: str = "", labels: Optional[Dict[str, str]] = None):
+    """
+    Gauge evaluado al leer /metrics. fn() devuelve un número o un dict de estadísticas:
+    register_gauge("seac_cache", cache.stats, labels={"cache": "groq"}) →
+    seac_cache_size{cache="groq"} 12, seac_cache_hits{cache="groq"} 40, ...
+    Las claves no numéricas se ignoran. Varias cachés pueden compartir el nombre con
+    etiquetas distintas.
+    """
+    with _registry_lock:
+        _gauges.append((name, help, fn, dict(labels or {})))
+
+
+def _gauge_samples() -> Dict[str, Tuple[str, List[str]]]:
+    familias: Dict[str, Tuple[str, List[str]]] = {}
+    with _registry_lock:
+        gauges = list(_gauges)
+    for name, help, fn, labels in gauges:
+        try:
+            valor = fn()
+        except Exception:
+            continue  # una estadística rota no debe tumbar /metrics
+        items = valor.items() if isinstance(valor, dict) else [("", valor)]
+        for clave, v in items:
+            if isinstance(v, bool):
+                v = int(v)
+            if not isinstance(v, (int, float)):
+                continue
+            metrica = f"{name}_{clave}" if clave else name
+            familias.setdefault(metrica, (help, []))[1].append(
+                f"{metrica}{_labels(tuple(labels), tuple(labels.values()))} {_num(v)}")
+    return familias
+
+
+def render() -> str:
+    """Todas las métricas en el formato de texto de Prometheus 0.0.4."""
+    with _registry_lock:
+        metricas = sorted(_registry.values(), key=lambda m: m.name)
+    lines: List[str] = []
+    for m in metricas:
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.kind}")
+        lines.extend(m.samples())
+    for name, (help, samples) in sorted(_gauge_samples().items()):
+        if help:
+            lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ------------------------------------------------------
+# Métricas de SEAC
+# ------------------------------------------------------
+HTTP_REQUESTS = counter("seac_http_requests_total", "Peticiones HTTP por ruta y código", ("method", "route", "status"))
+HTTP_SECONDS = histogram("seac_http_request_duration_seconds", "Latencia de las peticiones HTTP", ("method", "route"))
+STAGE_SECONDS = histogram("seac_stage_duration_seconds",
+                          "Duración de cada etapa del pipeline (catalog, scoring, cbr, fuzzy, groq, llm, persistence...)",
+                          ("stage",))
+GROQ_REQUESTS = counter("seac_groq_requests_total", "Respuestas de Groq por origen (live/replay) y código",
+                        ("source", "status"))
+GROQ_ERRORS = counter("seac_groq_errors_total", "Fallos de las llamadas a Groq (timeout, network, http, cassette_miss, circuit_open)",
+                      ("kind",))
+DB_QUERIES = counter("seac_db_queries_total", "Llamadas a funciones de persistencia", ("function", "outcome"))
+DB_SECONDS = histogram("seac_db_query_duration_seconds", "Duración de las funciones de persistencia", ("function",))
+
+
+def db_timed(fn):
+    """Cuenta y cronometra una función de persistencia (etiqueta function=<nombre>; span db.<nombre>)."""
+    nombre = fn.__name__
+    span_name = f"db.{nombre}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(span_name):
+                result = fn(*args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            DB_SECONDS.observe(time.perf_counter() - t0, nombre)
+            DB_QUERIES.inc(nombre, outcome)
+    return wrapper
@@ -0,0 +1,214 @@
+# =====================================================
+# SEAC v1.8 — Migraciones versionadas del esquema
+# =====================================================
+# Importar app.db ya no toca la BD: el esquema se prepara aquí, una sola vez.
+#   python -m app.migrations            → aplica las pendientes
+#   python -m app.migrations --status   → versión actual y pendientes
+# o al arrancar la app (SEAC_MIGRATE_ON_START=1): solo el proceso que obtiene el
+# bloqueo de líder (un archivo) migra, en segundo plano; los demás workers no
+# tocan la BD al arrancar. /ready responde 200 cuando la BD contesta y el esquema
+# está al día.
+# Cada migración se aplica con el bloqueo del motor (storage.migration_lock) y
+# queda registrada en schema_version; volver a ejecutar no hace nada.
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .db import get_conn, storage
+from .log import get_logger
+from .normalize import product_key
+from .specs import FEATURE_COLUMNS, feature_values
+
+log = get_logger("migrations")
+
+MIGRATE_ON_START = os.getenv("SEAC_MIGRATE_ON_START", "1") == "1"
+# Archivo del bloqueo de líder (por defecto uno por BD en el directorio temporal)
+MIGRATE_LOCK_FILE = os.getenv("SEAC_MIGRATE_LOCK_FILE", "")
+
+
+# ------------------------------------------------------
+# Migraciones (agregar al final; nunca cambiar una ya publicada)
+# ------------------------------------------------------
+def _esquema_base(cur):
+    storage.create_schema(cur)
+
+
+def _backfill_product_keys(cur):
+    """product_key de las filas anteriores a la columna (misma normalización que Python)."""
+    cur.execute("SELECT id, brand, name FROM products WHERE product_key IS NULL;")
+    rows = cur.fetchall()
+    if rows:
+        storage.bulk(cur)
+        cur.executemany("UPDATE products SET product_key=? WHERE id=?;",
+                        [(product_key(brand, name), pid) for pid, brand, name in rows])
+        log.info("migrate.product_key_backfill", "product_key calculada para productos existentes", count=len(rows))
+
+
+def _backfill_features(cur):
+    """cpu_score/gpu_score/ram_gb/storage_gb de las filas anteriores a esas columnas (specs.feature_values)."""
+    cur.execute("SELECT id, cpu, gpu, ram, storage FROM products WHERE cpu_score IS NULL;")
+    rows = cur.fetchall()
+    if rows:
+        storage.bulk(cur)
+        cur.executemany(
+            f"UPDATE products SET {', '.join(c + '=?' for c in FEATURE_COLUMNS)} WHERE id=?;",
+            [feature_values({"cpu": cpu, "gpu": gpu, "ram": ram, "storage": sto}) + (pid,)
+             for pid, cpu, gpu, ram, sto in rows])
+        log.info("migrate.features_backfill", "Características calculadas para productos existentes", count=len(rows))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "Esquema base: sesiones, productos, feedback, pesos, usuarios y favoritos", _esquema_base),
+    (2, "product_key de los productos anteriores a la columna", _backfill_product_keys),
+    (3, "Características numéricas de los productos anteriores a esas columnas", _backfill_features),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+# ------------------------------------------------------
+# Ejecución
+# ------------------------------------------------------
+_state: Dict[str, object] = {"state": "idle", "error": None, "applied": []}
+
+
+def _applied(cur) -> List[int]:
+    cur.execute("SELECT version FROM schema_version ORDER BY version;")
+    return [int(r[0]) for r in cur.fetchall()]
+
+
+def migrate(target: Optional[int] = None) -> List[int]:
+    """Aplica las migraciones pendientes (hasta 'target') y devuelve las versiones aplicadas."""
+    _state.update(state="migrating", error=None)
+    raw = storage.connect()  # conexión propia: no hace falta el pool para migrar
+    nuevas: List[int] = []
+    try:
+        cur = raw.cursor()
+        with storage.migration_lock(raw):
+            cur.execute(storage.SCHEMA_VERSION_DDL)
+            hechas = set(_applied(cur))
+            for version, descripcion, fn in MIGRATIONS:
+                if version in hechas or (target is not None and version > target):
+                    continue
+                t0 = time.perf_counter()
+                fn(cur)
+                cur.execute("INSERT INTO schema_version (version, description) VALUES (?, ?);",
+                            (version, descripcion))
+                nuevas.append(version)
+                log.info("migrate.applied", descripcion, version=version,
+                         ms=round((time.perf_counter() - t0) * 1000, 1))
+    except Exception as e:
+        _state.update(state="error", error=str(e))
+        raise
+    finally:
+        raw.close()
+    _state.update(state="done", applied=nuevas)
+    log.info("migrate.done", "Esquema al día", version=LATEST, backend=storage.name, applied=len(nuevas))
+    return nuevas
+
+
+def status() -> dict:
+    raw = storage.connect()
+    try:
+        cur = raw.cursor()
+        try:
+            hechas = _applied(cur)
+        except storage.Error:
+            hechas = []  # sin tabla schema_version todavía
+    finally:
+        raw.close()
+    return {"backend": storage.name, "current": max(hechas, default=0), "latest": LATEST,
+            "pending": [v for v, _, _ in MIGRATIONS if v not in hechas]}
+
+
+def readiness() -> dict:
+    """Para /ready: la BD responde (conexión del pool) y el esquema está en LATEST."""
+    try:
+        with get_conn() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT MAX(version) FROM schema_version;")
+            version = int(cur.fetchone()[0] or 0)
+    except storage.Error as e:
+        return {"ready": False, "db": "error", "detail": str(e), "migration": dict(_state)}
+    return {"ready": version >= LATEST, "db": "ok", "schema_version": version, "latest": LATEST,
+            "migration": dict(_state)}
+
+
+# ------------------------------------------------------
+# Líder al arrancar (SEAC_MIGRATE_ON_START)
+# ------------------------------------------------------
+_leader_file = None
+
+
+def _lock_path() -> str:
+    if MIGRATE_LOCK_FILE:
+        return MIGRATE_LOCK_FILE
+    digest = hashlib.sha1(json.dumps(storage.describe(), sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"seac-migrate-{digest}.lock")
+
+
+def _acquire_leader() -> bool:
+    """Bloqueo de archivo no bloqueante; el líder lo mantiene mientras vive el proceso."""
+    global _leader_file
+    if _leader_file is not None:
+        return True
+    f = open(_lock_path(), "a+")
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _leader_file = f
+    return True
+
+
+def _migrar_con_reintentos():
+    espera = 1.0
+    while True:
+        try:
+            migrate()
+            return
+        except Exception as e:
+            log.error("migrate.failed", f"No se pudieron aplicar las migraciones: {e}", retry_in_s=espera)
+            time.sleep(espera)
+            espera = min(30.0, espera * 2)
+
+
+def start_leader() -> bool:
+    """Desde el arranque de la app: migra en segundo plano si este proceso es el líder."""
+    if not MIGRATE_ON_START:
+        return False
+    if not _acquire_leader():
+        _state.update(state="follower")
+        return False
+    threading.Thread(target=_migrar_con_reintentos, name="seac-migrate", daemon=True).start()
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from . import log as seac_log
+    ap = argparse.ArgumentParser(prog="python -m app.migrations", description="Migraciones del esquema de SEAC.")
+    ap.add_argument("--status", action="store_true", help="mostrar la versión actual y las pendientes")
+    ap.add_argument("--target", type=int, help="aplicar solo hasta esta versión")
+    args = ap.parse_args(argv)
+    seac_log.setup(fmt=os.getenv("SEAC_LOG_FORMAT", "text"))
+
+    if args.status:
+        sys.stdout.write(json.dumps(status(), ensure_ascii=False) + "\n")
+        return 0
+    migrate(args.target)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
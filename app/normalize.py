@@ -0,0 +1,90 @@
+# =====================================================
+# SEAC v1.8 — Normalización de productos
+# =====================================================
+# Reglas compartidas por la API (main), Groq (api_internet) y la importación
+# masiva (ingest), más la clave de identidad persistida en products.product_key.
+from typing import Any, Dict
+
+# NVARCHAR(450): tamaño máximo de una clave de índice en SQL Server (900 bytes)
+PRODUCT_KEY_MAX = 450
+
+
+def _fold(texto: Any) -> str:
+    return " ".join(str(texto or "").lower().split())
+
+
+def product_key(brand: Any, name: Any) -> str:
+    """'  ASUS ', 'TUF  Gaming F15' → 'asus|tuf gaming f15'"""
+    return f"{_fold(brand)}|{_fold(name)}"[:PRODUCT_KEY_MAX]
+
+
+def key_of(p: Dict[str, Any]) -> str:
+    """product_key de un dict con claves en inglés o en español."""
+    return product_key(p.get("brand") or p.get("marca"), p.get("name") or p.get("modelo"))
+
+
+# ------------------------------------------------------
+# Formato estándar (inglés) usado por la API y la BD
+# ------------------------------------------------------
+def normalize_product(prod_dict: dict) -> dict:
+    """Convierte claves en español o inglés al formato estándar y asegura que todos los campos existan."""
+    def pick(*keys, default=""):
+        for k in keys:
+            if k in prod_dict and prod_dict[k] not in (None, ""):
+                return prod_dict[k]
+        return default
+
+    # Precio robusto
+    raw_price = pick("price", "precio", default=0)
+    if isinstance(raw_price, str):
+        try:
+            raw_price = float(raw_price.replace("$", "").replace(",", "").strip())
+        except Exception:
+            raw_price = 0.0
+    elif not isinstance(raw_price, (int, float)):
+        raw_price = 0.0
+
+    normalized = {
+        "id": pick("id", default=""),
+        "name": pick("name", "modelo", default=""),
+        "brand": pick("brand", "marca", default=""),
+        "category": pick("category", default="Laptop"),
+        "cpu": pick("cpu", "procesador", default=""),
+        "gpu": pick("gpu", "tarjeta_grafica", default=""),
+        "ram": pick("ram", "memoria_ram", default=""),
+        "storage": pick("storage", "almacenamiento", default=""),
+        "os": pick("os", "sistema_operativo", default=""),
+        "price": float(raw_price),
+        "url": pick("url", "link", default=""),
+    }
+    return normalized
+
+
+# ------------------------------------------------------
+# Formato de Groq
+# ------------------------------------------------------
+def normalize_item(p: Dict[str, Any]) -> Dict[str, Any]:
+    """Formato en español de las listas de Groq (marca, modelo, procesador, ...)."""
+    def g(k, *alts):
+        for key in (k,) + alts:
+            if key in p and p[key] not in (None, ""):
+                return str(p[key])
+        return ""
+    def num_price(v):
+        try:
+            return float(str(v).replace("$", "").replace(",", "").strip())
+        except Exception:
+            return 0.0
+
+    return {
+        "marca": g("marca", "brand"),
+        "modelo": g("modelo", "name"),
+        "procesador": g("cpu"),
+        "tarjeta_grafica": g("gpu"),
+        "memoria_ram": g("ram"),
+        "almacenamiento": g("almacenamiento", "storage"),
+        "sistema_operativo": g("sistema_operativo", "os"),
+        "precio": num_price(p.get("precio", p.get("price", 0))),
+        "descripcion": g("descripcion", "description"),
+        "link": g("link", "url"),
+    }
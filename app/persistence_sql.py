@@ -1,245 +1,297 @@
 # ======================================================
-# SEAC v1.4 — Persistencia en SQL Server (sesiones, feedback, productos y pesos)
+# SEAC v1.4 — Persistencia (sesiones, feedback, productos y pesos)
 # ======================================================
-from typing import Dict, List, Any
-from .db import get_conn
+# Consultas comunes a todos los motores; los upserts y demás sentencias propias
+# de cada BD vienen del motor configurado (app/storage, 'backend').
+from typing import Dict, List, Any, Tuple
+from .db import get_conn, transaction, storage as backend
+from .kb import invalidate_products
+from .fuzzy import best_match
+from . import session_cache
+from .normalize import key_of, product_key
+from .specs import feature_values
+from .cbr import register_case, LIKE_THRESHOLD
+from .metrics import db_timed
+from .log import get_logger
+
+log = get_logger("persistence")
+
+def _product_params(p: Dict[str, Any]) -> tuple:
+    """Parámetros de backend.PRODUCT_UPSERT_MANY a partir de un dict con claves en inglés o en español."""
+    cpu = str(p.get("cpu") or p.get("procesador") or "")
+    gpu = str(p.get("gpu") or p.get("tarjeta_grafica") or "")
+    ram = str(p.get("ram") or p.get("memoria_ram") or "")
+    storage = str(p.get("storage") or p.get("almacenamiento") or "")
+    name = str(p.get("name") or p.get("modelo") or "")
+    brand = str(p.get("brand") or p.get("marca") or "Desconocido")
+    return (
+        str(p["id"]), product_key(brand, name), name, brand, str(p.get("category") or "Laptop"),
+        cpu, gpu, ram, storage, str(p.get("os") or p.get("sistema_operativo") or ""),
+        float(p.get("price", p.get("precio", 0)) or 0.0), str(p.get("url") or p.get("link") or ""),
+    ) + feature_values({"cpu": cpu, "gpu": gpu, "ram": ram, "storage": storage})
+
+def _upsert_product(cur, p: Dict[str, Any]) -> Tuple[str, str]:
+    """Upsert de un producto por id o product_key. Devuelve (id real, 'INSERT' | 'UPDATE')."""
+    return backend.upsert_product(cur, _product_params(p))
+
+def _insert_placeholder(cur, pid: str) -> Tuple[str, str, str]:
+    """Crea un producto provisional para un id desconocido (se completa en el próximo upsert)."""
+    name = f"Producto_{pid}"
+    cur.execute("""
+        INSERT INTO products (id, product_key, name, brand, category, cpu, gpu, ram, storage, os, price, url,
+                              cpu_score, gpu_score, ram_gb, storage_gb)
+        VALUES (?, ?, ?, 'Desconocido', 'Laptop', '', '', '', '', '', 0, '', 0, 0, 0, 0);
+    """, (pid, product_key("Desconocido", name), name))
+    return pid, name, "Desconocido"
 
 # ------------------------------------------------------
 # Sesiones
 # ------------------------------------------------------
+@db_timed
 def add_session(session_id: str, uso: str, presupuesto: float):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    IF NOT EXISTS (SELECT 1 FROM sessions WHERE session_id=?)
-        INSERT INTO sessions (session_id, uso, presupuesto) VALUES (?, ?, ?)
-    ELSE
-        UPDATE sessions SET uso=?, presupuesto=? WHERE session_id=?;
-    """, (session_id, session_id, uso, presupuesto, uso, presupuesto, session_id))
-    conn.close()
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(backend.SESSION_UPSERT, (session_id, uso, presupuesto))
+
+@db_timed
+def ensure_session(session_id: str, uso: str):
+    """Crea la sesión (presupuesto 0) solo si todavía no existe."""
+    with get_conn() as conn:
+        conn.cursor().execute(backend.SESSION_IF_MISSING, (session_id, uso, session_id))
 
 # ------------------------------------------------------
 # Feedback (versión final - evita duplicados por nombre)
 # ------------------------------------------------------
+@db_timed
 def add_feedback(session_id: str, product_or_id, uso: str, rating: float):
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # --- Si llega solo el id (string) ---
-    if isinstance(product_or_id, str):
-        pid = product_or_id.strip()
-
-        # Intentar obtener nombre real si es un ID tipo "groq-..."
-        if pid.startswith("groq-"):
-            # Buscar un producto similar existente (por nombre parcial del ID)
-            cur.execute("""
-                SELECT TOP 1 id, name, brand FROM products
-                WHERE name LIKE ? OR id LIKE ?;
-            """, (f"%{pid[-5:]}%", f"%{pid[-5:]}%"))
-            row = cur.fetchone()
+    with get_conn() as conn:
+        cur = conn.cursor()
 
-            if row:
-                real_id = row[0]
-                name = row[1]
-                brand = row[2]
-                print(f"🔁 Producto similar encontrado → {brand} {name} ({real_id})")
-            else:
-                # No existe → crear placeholder temporal
-                cur.execute("""
-                    INSERT INTO products (id, name, brand, category, cpu, gpu, ram, storage, os, price, url)
-                    VALUES (?, ?, 'Desconocido', 'Laptop', '', '', '', '', '', 0, '');
-                """, (pid, f"Producto_{pid}"))
-                conn.commit()
-                real_id = pid
-                name = f"Producto_{pid}"
-                brand = "Desconocido"
-                print(f"🆕 Placeholder creado → {name}")
-        else:
-            # Buscar producto normal por ID exacto
-            cur.execute("SELECT TOP 1 id, name, brand FROM products WHERE id=?", (pid,))
+        # --- Si llega solo el id (string) ---
+        if isinstance(product_or_id, str):
+            pid = product_or_id.strip()
+
+            cur.execute("SELECT id, name, brand FROM products WHERE id=?", (pid,))
             row = cur.fetchone()
+            mostrado = None if row else session_cache.lookup(session_id, pid)
             if row:
                 real_id, name, brand = row
+            elif mostrado is not None:
+                # Id de Groq ("groq-...") mostrado en esta sesión: se resuelve con sus datos
+                # (índice difuso y product_key) como si hubiera llegado el dict completo
+                product_or_id = mostrado[0]
             else:
-                cur.execute("""
-                    INSERT INTO products (id, name, brand, category, cpu, gpu, ram, storage, os, price, url)
-                    VALUES (?, ?, 'Desconocido', 'Laptop', '', '', '', '', '', 0, '');
-                """, (pid, f"Producto_{pid}"))
-                conn.commit()
-                real_id = pid
-                name = f"Producto_{pid}"
-                brand = "Desconocido"
-
-    # --- Si llega un diccionario completo ---
-    elif isinstance(product_or_id, dict):
-        p = product_or_id
-        name = (p.get("name") or p.get("modelo") or "").strip()
-        brand = (p.get("brand") or p.get("marca") or "Desconocido").strip()
-        category = p.get("category", "Laptop")
-        cpu = p.get("cpu", "") or p.get("procesador", "")
-        gpu = p.get("gpu", "") or p.get("tarjeta_grafica", "")
-        ram = p.get("ram", "") or p.get("memoria_ram", "")
-        storage = p.get("storage", "") or p.get("almacenamiento", "")
-        osys = p.get("os", "") or p.get("sistema_operativo", "")
-        price = float(p.get("price", p.get("precio", 0)) or 0.0)
-        url = p.get("url", "") or p.get("link", "")
-
-        # Buscar si ya existe un producto con el mismo nombre y marca
+                # No existe → crear placeholder temporal
+                real_id, name, brand = _insert_placeholder(cur, pid)
+                log.info("product.placeholder", "Placeholder creado", product_id=real_id, product=name)
+
+        # --- Si llega un diccionario completo ---
+        if isinstance(product_or_id, dict):
+            p = dict(product_or_id)
+            name = (p.get("name") or p.get("modelo") or "").strip()
+            brand = (p.get("brand") or p.get("marca") or "Desconocido").strip()
+            p.update(name=name, brand=brand)
+            match = best_match(p)
+            if match is not None:
+                # Mismo producto ya en el catálogo (p. ej. uno de Groq con id "groq-...")
+                p["id"] = match.product["id"]
+                log.info("product.matched", "Producto similar encontrado en el catálogo", product_id=p["id"],
+                         product=f"{match.product['brand']} {match.product['name']}", score=match.score)
+            else:
+                # Si no hay fila con el mismo product_key se crea con un id derivado del nombre
+                p["id"] = f"auto-{brand[:3]}-{name[:6]}".replace(" ", "").lower()
+
+            real_id, action = _upsert_product(cur, p)
+            log.info("product.upserted", "Producto guardado desde feedback", action=action.lower(),
+                     product_id=real_id, product=f"{brand} {name}")
+
+        elif not isinstance(product_or_id, str):
+            log.error("feedback.invalid", "add_feedback recibió un tipo no válido",
+                      type=type(product_or_id).__name__)
+            return
+
+        # --- Insertar feedback ---
         cur.execute("""
-            SELECT TOP 1 id FROM products
-            WHERE LOWER(name)=LOWER(?) AND LOWER(brand)=LOWER(?)
-        """, (name, brand))
-        row = cur.fetchone()
-
-        if not row:
-            real_id = f"auto-{brand[:3]}-{name[:6]}".replace(" ", "").lower()
-            cur.execute("""
-                INSERT INTO products (id, name, brand, category, cpu, gpu, ram, storage, os, price, url)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (real_id, name, brand, category, cpu, gpu, ram, storage, osys, price, url))
-            conn.commit()
-            print(f"🆕 Producto nuevo insertado → {brand} {name} ({real_id})")
-        else:
-            real_id = row[0]
-            cur.execute("""
-                UPDATE products SET
-                    brand = CASE WHEN brand='Desconocido' THEN ? ELSE brand END,
-                    cpu = CASE WHEN cpu='' OR cpu IS NULL THEN ? ELSE cpu END,
-                    gpu = CASE WHEN gpu='' OR gpu IS NULL THEN ? ELSE gpu END,
-                    ram = CASE WHEN ram='' OR ram IS NULL THEN ? ELSE ram END,
-                    storage = CASE WHEN storage='' OR storage IS NULL THEN ? ELSE storage END,
-                    os = CASE WHEN os='' OR os IS NULL THEN ? ELSE os END,
-                    price = CASE WHEN price=0 THEN ? ELSE price END,
-                    url = CASE WHEN url='' OR url IS NULL THEN ? ELSE url END
-                WHERE id=?;
-            """, (brand, cpu, gpu, ram, storage, osys, price, url, real_id))
-            conn.commit()
-            print(f"♻️ Producto actualizado → {brand} {name} ({real_id})")
-
-    else:
-        print("❌ add_feedback recibió un tipo no válido.")
-        conn.close()
-        return
+            INSERT INTO feedback (session_id, product_id, uso, rating)
+            VALUES (?, ?, ?, ?);
+        """, (session_id, real_id, uso, rating))
+        conn.commit()
 
-    # --- Insertar feedback ---
-    cur.execute("""
-        INSERT INTO feedback (session_id, product_id, uso, rating)
-        VALUES (?, ?, ?, ?);
-    """, (session_id, real_id, uso, rating))
-    conn.commit()
-    conn.close()
-    print(f"⭐ Feedback registrado para {brand} {name}")
+        # Mantener al día el índice CBR con los casos "me gusta"
+        if float(rating or 0) >= LIKE_THRESHOLD:
+            cur.execute("SELECT presupuesto FROM sessions WHERE session_id=?;", (session_id,))
+            row = cur.fetchone()
+            register_case(uso, float(row[0] or 0) if row else 0.0, rating)
+    invalidate_products([real_id])
+    log.info("feedback.saved", "Feedback registrado", product_id=real_id, product=f"{brand} {name}", rating=rating)
+
+# ------------------------------------------------------
+# Feedback por lotes (cola write-behind de feedback_queue)
+# ------------------------------------------------------
+_FAVORITE_IF_MISSING = """
+INSERT INTO favorites (user_id, product_id)
+SELECT ?, ?
+WHERE EXISTS (SELECT 1 FROM users WHERE id=?)
+  AND NOT EXISTS (SELECT 1 FROM favorites f JOIN products p ON p.id = f.product_id
+                  WHERE f.user_id=? AND p.product_key=?);
+"""
+
+def _chunks(items: List[Any], size: int = 500):
+    # SQL Server admite hasta 2100 parámetros por sentencia
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _real_ids(cur, productos: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """id propuesto → id real tras el upsert (el mismo id o el de la fila con igual product_key)."""
+    existentes = set()
+    for chunk in _chunks(list(productos)):
+        cur.execute(f"SELECT id FROM products WHERE id IN ({', '.join('?' for _ in chunk)});", chunk)
+        existentes.update(r[0] for r in cur.fetchall())
+    claves = {pid: key_of(p) for pid, p in productos.items() if pid not in existentes}
+    por_clave: Dict[str, str] = {}
+    for chunk in _chunks(sorted(set(claves.values()))):
+        cur.execute(f"""
+            SELECT product_key, MIN(id) FROM products
+            WHERE product_key IN ({', '.join('?' for _ in chunk)}) GROUP BY product_key;
+        """, chunk)
+        por_clave.update((k, pid) for k, pid in cur.fetchall())
+    return {pid: por_clave.get(claves[pid], pid) if pid in claves else pid for pid in productos}
+
+@db_timed
+def write_feedback_batch(entries: List[Dict[str, Any]]) -> int:
+    """
+    Escribe un lote de feedback en una sola transacción, con executemany en cada tabla:
+    sesiones faltantes → productos (upsert) → feedback → favoritos.
+    Cada entrada: {session_id, uso, rating, user_id, product, upsert}.
+    Devuelve cuántas filas de feedback se insertaron.
+    """
+    if not entries:
+        return 0
+
+    sesiones = {e["session_id"]: e["uso"] for e in entries}
+    productos = {e["product"]["id"]: e["product"] for e in entries if e.get("upsert")}
+    liked = {e["session_id"] for e in entries if float(e["rating"] or 0) >= LIKE_THRESHOLD}
+
+    with transaction() as conn:
+        cur = conn.cursor()
+        backend.bulk(cur)
+        cur.executemany(backend.SESSION_IF_MISSING, [(sid, uso, sid) for sid, uso in sesiones.items()])
+        real_ids: Dict[str, str] = {}
+        if productos:
+            cur.executemany(backend.PRODUCT_UPSERT_MANY, [_product_params(p) for p in productos.values()])
+            real_ids = _real_ids(cur, productos)
+        real = lambda e: real_ids.get(e["product"]["id"], e["product"]["id"])
+
+        cur.executemany("""
+            INSERT INTO feedback (session_id, product_id, uso, rating)
+            VALUES (?, ?, ?, ?);
+        """, [(e["session_id"], real(e), e["uso"], float(e["rating"])) for e in entries])
+
+        favoritos = {(e["user_id"], real(e)): key_of(e["product"]) for e in entries
+                     if e.get("user_id") and float(e["rating"] or 0) >= LIKE_THRESHOLD}
+        if favoritos:
+            cur.executemany(_FAVORITE_IF_MISSING, [(u, pid, u, u, key) for (u, pid), key in favoritos.items()])
+
+        # Presupuesto de las sesiones con "me gusta" para el índice CBR
+        presupuestos: Dict[str, float] = {}
+        for chunk in _chunks(list(liked)):
+            cur.execute(f"SELECT session_id, presupuesto FROM sessions WHERE session_id IN ({', '.join('?' for _ in chunk)});",
+                        chunk)
+            presupuestos.update((sid, float(p or 0)) for sid, p in cur.fetchall())
+
+    # Solo tras confirmar la transacción
+    if productos:
+        invalidate_products(real_ids.values())
+    for e in entries:
+        if e["session_id"] in liked:
+            register_case(e["uso"], presupuestos.get(e["session_id"], 0.0), e["rating"])
+    return len(entries)
 
 # ------------------------------------------------------
 # Historial de feedback + sesiones
 # ------------------------------------------------------
+@db_timed
 def load_history() -> List[Dict[str, Any]]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    SELECT f.session_id, f.product_id, f.uso, f.rating, f.ts, s.presupuesto
-    FROM feedback f
-    LEFT JOIN sessions s ON s.session_id = f.session_id
-    ORDER BY f.id DESC;
-    """)
-    cols = [c[0] for c in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+        SELECT f.session_id, f.product_id, f.uso, f.rating, f.ts, s.presupuesto
+        FROM feedback f
+        LEFT JOIN sessions s ON s.session_id = f.session_id
+        ORDER BY f.id DESC;
+        """)
+        cols = [c[0] for c in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
+        return rows
 
 # ------------------------------------------------------
 # Pesos de aprendizaje
 # ------------------------------------------------------
+@db_timed
 def load_weights() -> Dict[str, Dict[str, float]]:
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT uso, w_presupuesto, w_uso, w_marca FROM weights;")
-    rows = cur.fetchall()
-    cols = [c[0] for c in cur.description]
-    conn.close()
-    out: Dict[str, Dict[str, float]] = {}
-    for r in rows:
-        d = dict(zip(cols, r))
-        out[d["uso"]] = {
-            "presupuesto": float(d["w_presupuesto"] or 1.0),
-            "uso": float(d["w_uso"] or 1.0),
-            "preferencia_marca": float(d["w_marca"] or 0.3),
-        }
-    return out
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT uso, w_presupuesto, w_uso, w_marca FROM weights;")
+        rows = cur.fetchall()
+        cols = [c[0] for c in cur.description]
+        out: Dict[str, Dict[str, float]] = {}
+        for r in rows:
+            d = dict(zip(cols, r))
+            out[d["uso"]] = {
+                "presupuesto": float(d["w_presupuesto"] or 1.0),
+                "uso": float(d["w_uso"] or 1.0),
+                "preferencia_marca": float(d["w_marca"] or 0.3),
+            }
+        return out
 
+@db_timed
 def save_weights(weights: Dict[str, Dict[str, float]]):
-    conn = get_conn()
-    cur = conn.cursor()
-    for uso, w in weights.items():
-        cur.execute("""
-        IF EXISTS (SELECT 1 FROM weights WHERE uso=?)
-            UPDATE weights SET w_presupuesto=?, w_uso=?, w_marca=? WHERE uso=?;
-        ELSE
-            INSERT INTO weights (uso, w_presupuesto, w_uso, w_marca)
-            VALUES (?, ?, ?, ?);
-        """, (uso, w.get("presupuesto",1.0), w.get("uso",1.0), w.get("preferencia_marca",0.3),
-              uso, uso, w.get("presupuesto",1.0), w.get("uso",1.0), w.get("preferencia_marca",0.3)))
-    conn.close()
+    """Un upsert por uso recibido (pasar solo los usos modificados)."""
+    if not weights:
+        return
+    with get_conn() as conn:
+        cur = conn.cursor()
+        backend.bulk(cur)
+        cur.executemany(backend.WEIGHT_UPSERT, [
+            (uso, w.get("presupuesto", 1.0), w.get("uso", 1.0), w.get("preferencia_marca", 0.3))
+            for uso, w in weights.items()
+        ])
 
 # ------------------------------------------------------
 # Productos (upsert inteligente mejorado)
 # ------------------------------------------------------
+@db_timed
 def add_or_update_product(p: Dict[str, Any]):
     """
     Inserta o actualiza un producto. Si ya existe un placeholder
     (creado automáticamente) lo rellena con los datos reales.
+    Devuelve el id real del producto en la base de datos.
     """
     if not p:
         return
 
-    pid = p.get("id", "")
-    name = p.get("name", "") or p.get("modelo", "")
+    with get_conn() as conn:
+        cur = conn.cursor()
+        real_id, action = _upsert_product(cur, {**p, "id": p.get("id", "")})
+
     brand = p.get("brand", "") or p.get("marca", "")
-    category = p.get("category", "Laptop")
-    cpu = p.get("cpu", "") or p.get("procesador", "")
-    gpu = p.get("gpu", "") or p.get("tarjeta_grafica", "")
-    ram = p.get("ram", "") or p.get("memoria_ram", "")
-    storage = p.get("storage", "") or p.get("almacenamiento", "")
-    osys = p.get("os", "") or p.get("sistema_operativo", "")
-    price = float(p.get("price", p.get("precio", 0)) or 0)
-    url = p.get("url", "") or p.get("link", "")
-
-    conn = get_conn()
-    cur = conn.cursor()
-
-    # Buscar si ya existe por ID o por nombre+marca
-    cur.execute("""
-        SELECT TOP 1 id FROM products
-        WHERE id=? OR (LOWER(name)=LOWER(?) AND LOWER(brand)=LOWER(?))
-    """, (pid, name, brand))
-    row = cur.fetchone()
+    name = p.get("name", "") or p.get("modelo", "")
+    log.info("product.upserted", "Producto guardado", action=action.lower(), product_id=real_id,
+             product=f"{brand} {name}")
 
-    if not row:
-        # No existe → crear nuevo
-        cur.execute("""
-            INSERT INTO products (id, name, brand, category, cpu, gpu, ram, storage, os, price, url)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (pid, name, brand, category, cpu, gpu, ram, storage, osys, price, url))
-        conn.commit()
-        print(f"🆕 Producto insertado → {brand} {name}")
-    else:
-        # Existe → actualizar datos vacíos o placeholder
-        real_id = row[0]
-        cur.execute("""
-            UPDATE products SET
-                name = CASE WHEN (name IS NULL OR name LIKE 'Producto_%') THEN ? ELSE name END,
-                brand = CASE WHEN (brand IS NULL OR brand='Desconocido') THEN ? ELSE brand END,
-                category = ?,
-                cpu = CASE WHEN (cpu IS NULL OR cpu='') THEN ? ELSE cpu END,
-                gpu = CASE WHEN (gpu IS NULL OR gpu='') THEN ? ELSE gpu END,
-                ram = CASE WHEN (ram IS NULL OR ram='') THEN ? ELSE ram END,
-                storage = CASE WHEN (storage IS NULL OR storage='') THEN ? ELSE storage END,
-                os = CASE WHEN (os IS NULL OR os='') THEN ? ELSE os END,
-                price = CASE WHEN (price IS NULL OR price=0) THEN ? ELSE price END,
-                url = CASE WHEN (url IS NULL OR url='') THEN ? ELSE url END
-            WHERE id = ?;
-        """, (name, brand, category, cpu, gpu, ram, storage, osys, price, url, real_id))
-        conn.commit()
-        print(f"♻️ Producto actualizado → {brand} {name}")
+    invalidate_products([real_id])
+    return real_id
 
-    conn.close()
\ No newline at end of file
+@db_timed
+def upsert_products(products: List[Dict[str, Any]]) -> int:
+    """
+    Carga masiva: un upsert por producto enviado en un solo executemany
+    dentro de una transacción. No invalida el catálogo (hacerlo una vez al terminar).
+    """
+    if not products:
+        return 0
+    with transaction() as conn:
+        cur = conn.cursor()
+        backend.bulk(cur)
+        cur.executemany(backend.PRODUCT_UPSERT_MANY, [_product_params(p) for p in products])
+    return len(products)
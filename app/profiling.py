@@ -0,0 +1,183 @@
+# =====================================================
+# SEAC v1.8 — Perfilado por petición (árbol de spans y perfil de CPU)
+# =====================================================
+# Opcional y por petición:
+#   - cabecera X-SEAC-Profile: 1 (o "cpu"), o una fracción SEAC_PROFILE_SAMPLE de
+#     las peticiones → árbol de spans (stage(), span(), funciones de BD, cada
+#     explicación). Sale en Server-Timing como prof.<ruta> y completo en
+#     GET /debug/profile/{id} (id en la cabecera X-SEAC-Profile-Id).
+#   - X-SEAC-Profile: cpu, o una fracción SEAC_PROFILE_CPU_SAMPLE de las llamadas
+#     al scoring → perfil cProfile del bloque en SEAC_PROFILE_DIR (.prof, leer
+#     con pstats o snakeviz).
+# Sin perfilado activo, span() solo cuesta un ContextVar.get.
+# Acceso (cabecera y /debug/profile): con SEAC_PROFILE_TOKEN, quien envíe ese valor en
+# X-SEAC-Profile-Token; sin token, solo clientes locales directos (ngrok y otros proxies
+# reenvían desde 127.0.0.1 pero agregan X-Forwarded-For, así que no cuentan).
+import cProfile
+import hmac
+import itertools
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+PROFILE_SAMPLE = float(os.getenv("SEAC_PROFILE_SAMPLE", "0"))
+PROFILE_CPU_SAMPLE = float(os.getenv("SEAC_PROFILE_CPU_SAMPLE", "0"))
+PROFILE_DIR = os.getenv("SEAC_PROFILE_DIR", "profiles")
+# Árboles recientes consultables en /debug/profile/{id}
+PROFILE_KEEP = int(os.getenv("SEAC_PROFILE_KEEP", "100"))
+PROFILE_TOKEN = os.getenv("SEAC_PROFILE_TOKEN", "")
+
+HEADER = "X-SEAC-Profile"
+TOKEN_HEADER = "X-SEAC-Profile-Token"
+_LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def dur_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def to_dict(self, t0: Optional[float] = None) -> Dict[str, Any]:
+        t0 = self.start if t0 is None else t0
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - t0) * 1000, 2),
+            "dur_ms": round(self.dur_ms, 2),
+            "children": [c.to_dict(t0) for c in list(self.children)],
+        }
+
+    def walk(self, path: str = ""):
+        """(ruta, span) en preorden: 'request', 'request.groq', 'request.llm.explain', ..."""
+        ruta = f"{path}.{self.name}" if path else self.name
+        yield ruta, self
+        for c in list(self.children):
+            yield from c.walk(ruta)
+
+
+class Profile:
+    def __init__(self, pid: str, root: Span, cpu: bool):
+        self.id = pid
+        self.root = root
+        self.cpu = cpu
+        self.cpu_dumps: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "cpu_profiles": list(self.cpu_dumps), "tree": self.root.to_dict()}
+
+    def server_timing(self) -> str:
+        """Un elemento prof.<ruta> por span (los spans repetidos, p. ej. explain, se listan todos)."""
+        return ", ".join(f"prof.{ruta};dur={s.dur_ms:.2f}" for ruta, s in self.root.walk())
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("seac_span", default=None)
+_profile: ContextVar[Optional[Profile]] = ContextVar("seac_profile", default=None)
+_ids = itertools.count(1)
+_recent: "OrderedDict[str, Profile]" = OrderedDict()
+_recent_lock = threading.Lock()
+
+
+def authorized(client_host: Optional[str], headers) -> bool:
+    """Si la petición puede pedir un perfil o leer /debug/profile ('headers' sin distinguir mayúsculas)."""
+    if PROFILE_TOKEN:
+        return hmac.compare_digest(headers.get(TOKEN_HEADER, ""), PROFILE_TOKEN)
+    return client_host in _LOOPBACK and "x-forwarded-for" not in headers and "forwarded" not in headers
+
+
+def wanted(header_value: Optional[str]) -> Optional[str]:
+    """Modo de perfilado para una petición: None, "tree" o "cpu"."""
+    v = (header_value or "").strip().lower()
+    if v == "cpu":
+        return "cpu"
+    if v in ("1", "true", "tree"):
+        return "tree"
+    if PROFILE_SAMPLE > 0 and random.random() < PROFILE_SAMPLE:
+        return "tree"
+    return None
+
+
+@contextmanager
+def profile(name: str = "request", cpu: bool = False) -> Iterator[Profile]:
+    """Abre el árbol de spans de una petición; al salir queda en /debug/profile/{id}."""
+    prof = Profile(f"{os.getpid()}-{next(_ids)}", Span(name), cpu)
+    t_span = _current.set(prof.root)
+    t_prof = _profile.set(prof)
+    try:
+        yield prof
+    finally:
+        prof.root.end = time.perf_counter()
+        _current.reset(t_span)
+        _profile.reset(t_prof)
+        with _recent_lock:
+            _recent[prof.id] = prof
+            while len(_recent) > PROFILE_KEEP:
+                _recent.popitem(last=False)
+
+
+@contextmanager
+def span(name: str) -> Iterator[Optional[Span]]:
+    """Span hijo del actual; no hace nada si la petición no se está perfilando."""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    s = Span(name)
+    parent.children.append(s)
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        s.end = time.perf_counter()
+        _current.reset(token)
+
+
+def get_profile(pid: str) -> Optional[Dict[str, Any]]:
+    with _recent_lock:
+        prof = _recent.get(pid)
+    return prof.to_dict() if prof is not None else None
+
+
+# ------------------------------------------------------
+# Perfil de CPU (cProfile) de un bloque
+# ------------------------------------------------------
+# Un solo cProfile activo a la vez en el proceso: si otro hilo está perfilando, se omite.
+_cpu_lock = threading.Lock()
+
+
+@contextmanager
+def cpu_profile(name: str) -> Iterator[None]:
+    prof = _profile.get()
+    pedido = prof is not None and prof.cpu
+    if not pedido and not (PROFILE_CPU_SAMPLE > 0 and random.random() < PROFILE_CPU_SAMPLE):
+        yield
+        return
+    if not _cpu_lock.acquire(blocking=False):
+        yield
+        return
+    cp = cProfile.Profile()
+    try:
+        cp.enable()
+        try:
+            yield
+        finally:
+            cp.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        sufijo = prof.id if prof is not None else f"{os.getpid()}-sample"
+        path = os.path.join(PROFILE_DIR, f"{name}-{sufijo}-{int(time.time() * 1000)}.prof")
+        cp.dump_stats(path)
+        if prof is not None:
+            prof.cpu_dumps.append(path)
+    finally:
+        _cpu_lock.release()
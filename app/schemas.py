@@ -31,12 +31,14 @@ class Recomendacion(BaseModel):
     score: float
     reasons: List[str]
     session_id: str
+    source: Optional[str] = Field(None, description="groq|local")
 
 class Feedback(BaseModel):
     session_id: str
     rating: float = Field(..., ge=0, le=1)
     notes: Optional[str] = None
     user_id: Optional[int] = None
+    product_id: Optional[str] = Field(None, description="id devuelto por /infer en esta sesión")
     product_name: str
     brand: str
     cpu: Optional[str] = None
@@ -0,0 +1,208 @@
+# =====================================================
+# SEAC v1.6 — Puntuación de candidatos (escalar y vectorizada)
+# =====================================================
+# score_candidate evalúa un producto y genera sus razones; rank_catalog
+# calcula el mismo puntaje para todo el catálogo con operaciones de NumPy
+# y solo construye razones para los top-k.
+from typing import Dict, Any, List, Tuple, Sequence, Optional
+import numpy as np
+
+from .rules import USO_MIN_REQ, BASE_WEIGHTS, soft_threshold
+
+# -----------------------------------------------------
+# Versión escalar (referencia y generación de razones)
+# -----------------------------------------------------
+def score_candidate(p: Dict[str, Any], q: Dict[str, Any], weights: Dict[str, float]) -> Tuple[float, list[str]]:
+    uso = q.get("uso")
+    presupuesto = q.get("presupuesto")
+    prefs = q.get("preferencias") or {}
+    reasons: list[str] = []
+
+    # Presupuesto
+    if p["price"] <= presupuesto:
+        budget_score = 1.0
+        reasons.append(f"Precio dentro del presupuesto (${p['price']:.0f} ≤ ${presupuesto:.0f})")
+    else:
+        over = p["price"] - presupuesto
+        budget_score = max(0.0, 1.0 - over / max(1.0, 0.25 * presupuesto))
+        reasons.append(f"Precio sobre el presupuesto (+${over:.0f})")
+
+    # Requisitos por uso
+    min_req = USO_MIN_REQ.get(uso, {})
+    uso_components = []
+    uso_score_acc = 0.0
+    count = 0
+    for k, vmin in min_req.items():
+        val = p.get(k, 0)
+        s = soft_threshold(val, vmin)
+        uso_score_acc += s
+        count += 1
+        uso_components.append((k, val, vmin, s))
+    uso_score = uso_score_acc / count if count else 1.0
+    for k, val, vmin, s in uso_components:
+        if s >= 1.0:
+            reasons.append(f"{k} cumple (valor={val} ≥ mín={vmin})")
+        elif s == 0.0:
+            reasons.append(f"{k} insuficiente (valor={val} < 0.8×mín={int(0.8*vmin)})")
+        else:
+            reasons.append(f"{k} cercano al mínimo (valor={val}, mín={vmin})")
+
+    # Preferencia de marca
+    if prefs.get("marca"):
+        if p.get("brand","").lower() == prefs["marca"].lower():
+            reasons.append(f"Marca preferida ({prefs['marca']})")
+
+    # Pesos
+    w_pres = weights.get("presupuesto", BASE_WEIGHTS["presupuesto"])
+    w_uso  = weights.get("uso", BASE_WEIGHTS["uso"])
+    w_marca= weights.get("preferencia_marca", BASE_WEIGHTS["preferencia_marca"])
+
+    comp = (
+        w_pres * budget_score +
+        w_uso  * uso_score +
+        w_marca* (1.05 if prefs.get('marca') and p.get('brand','').lower()==prefs['marca'].lower() else 1.0)
+    ) / (w_pres + w_uso + w_marca)
+
+    return float(comp), reasons
+
+# -----------------------------------------------------
+# Catálogo en columnas (vistas NumPy sobre la foto de kb)
+# -----------------------------------------------------
+_NUM_COLS = ("price", "cpu_score", "gpu_score", "ram_gb", "storage_gb")
+
+
+class ColumnarCatalog:
+    """Columnas numéricas + códigos de marca listos para operar en bloque."""
+
+    def __init__(self, num: Dict[str, np.ndarray], brands: Sequence[str], row_fn):
+        self.num = num
+        self.n = len(num["price"])
+        vocab: Dict[str, int] = {}
+        self.brand_codes = np.fromiter((vocab.setdefault(b, len(vocab)) for b in brands),
+                                       dtype=np.int32, count=self.n)
+        self.brand_lower = [b.lower() for b in vocab]
+        self.row = row_fn
+
+    @classmethod
+    def from_snapshot(cls, snap) -> "ColumnarCatalog":
+        # np.frombuffer no copia: comparte memoria con los array('d') de la foto
+        num = {c: np.frombuffer(snap.num[c], dtype=np.float64) if len(snap) else np.zeros(0)
+               for c in _NUM_COLS}
+        return cls(num, snap.text["brand"], snap.row)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "ColumnarCatalog":
+        num = {c: np.array([float(r.get(c, 0) or 0) for r in rows], dtype=np.float64) for c in _NUM_COLS}
+        return cls(num, [r.get("brand", "") or "" for r in rows], lambda i: rows[i])
+
+
+_columnar_cache: Dict[str, Any] = {"key": None, "value": None}
+
+def columnar(snap) -> ColumnarCatalog:
+    """Vista columnar de la foto del catálogo; se reconstruye solo si cambia la versión."""
+    key = (id(snap), snap.version)
+    if _columnar_cache["key"] != key:
+        _columnar_cache["value"] = ColumnarCatalog.from_snapshot(snap)
+        _columnar_cache["key"] = key
+    return _columnar_cache["value"]
+
+# -----------------------------------------------------
+# Versión vectorizada
+# -----------------------------------------------------
+def _soft_threshold_vec(value: np.ndarray, min_required: float) -> np.ndarray:
+    if min_required <= 0:
+        return np.ones_like(value)
+    lo = 0.8 * min_required
+    mid = (value - lo) / (0.2 * min_required)
+    return np.where(value < lo, 0.0, np.where(value >= min_required, 1.0, mid))
+
+
+def _round4(x: np.ndarray) -> np.ndarray:
+    """round(x, 4) idéntico al de Python (np.round difiere en casos de empate .5)."""
+    r = np.round(x, 4)
+    y = x * 1e4
+    ties = np.flatnonzero(np.abs(y - np.floor(y) - 0.5) < 1e-6)
+    for i in ties:
+        r[i] = round(float(x[i]), 4)
+    return r
+
+
+def score_batch(cat: ColumnarCatalog, q: Dict[str, Any], weights: Dict[str, float],
+                sim_cbr: float, idx: Optional[np.ndarray] = None) -> np.ndarray:
+    """Puntaje final (ya redondeado) de los productos 'idx' — mismo resultado que score_candidate."""
+    uso = q.get("uso")
+    presupuesto = q.get("presupuesto")
+    prefs = q.get("preferencias") or {}
+    take = (lambda a: a) if idx is None else (lambda a: a[idx])
+
+    # Presupuesto
+    price = take(cat.num["price"])
+    over = price - presupuesto
+    budget = np.where(price <= presupuesto, 1.0,
+                      np.maximum(0.0, 1.0 - over / max(1.0, 0.25 * presupuesto)))
+
+    # Requisitos por uso
+    min_req = USO_MIN_REQ.get(uso, {})
+    if min_req:
+        acc = np.zeros_like(price)
+        for k, vmin in min_req.items():
+            acc = acc + _soft_threshold_vec(take(cat.num[k]), vmin)
+        uso_score = acc / len(min_req)
+    else:
+        uso_score = np.ones_like(price)
+
+    # Preferencia de marca
+    marca = prefs.get("marca")
+    if marca:
+        codes = [c for c, b in enumerate(cat.brand_lower) if b == marca.lower()]
+        bonus = np.where(np.isin(take(cat.brand_codes), codes), 1.05, 1.0)
+    else:
+        bonus = np.ones_like(price)
+
+    # Pesos
+    w_pres = weights.get("presupuesto", BASE_WEIGHTS["presupuesto"])
+    w_uso  = weights.get("uso", BASE_WEIGHTS["uso"])
+    w_marca= weights.get("preferencia_marca", BASE_WEIGHTS["preferencia_marca"])
+
+    comp = (w_pres * budget + w_uso * uso_score + w_marca * bonus) / (w_pres + w_uso + w_marca)
+    return _round4((comp * 0.8) + (sim_cbr * 0.2))
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Posiciones de los k mejores puntajes, de mayor a menor, con el mismo
+    desempate que un sort estable (a igual puntaje gana la posición menor).
+    """
+    n = len(scores)
+    if n == 0:
+        return np.zeros(0, dtype=np.intp)
+    k = min(k, n)
+    part = np.argpartition(-scores, k - 1)[:k]
+    threshold = scores[part].min()
+    above = np.flatnonzero(scores > threshold)
+    ties = np.flatnonzero(scores == threshold)[:k - len(above)]
+    sel = np.concatenate([above, ties])
+    return sel[np.lexsort((sel, -scores[sel]))]
+
+
+def rank_catalog(cat: ColumnarCatalog, q: Dict[str, Any], weights: Dict[str, float],
+                 sim_cbr: float, k: int, price_range: Optional[Tuple[float, float]] = None) -> List[Dict[str, Any]]:
+    """Puntúa el catálogo en bloque y devuelve los k mejores con sus razones."""
+    idx = None
+    if price_range is not None:
+        lo, hi = price_range
+        price = cat.num["price"]
+        mask = np.flatnonzero((lo <= price) & (price <= hi))
+        if len(mask):
+            idx = mask
+
+    scores = score_batch(cat, q, weights, sim_cbr, idx)
+    best = top_k(scores, k)
+    out = []
+    for j in best:
+        i = int(j) if idx is None else int(idx[j])
+        p = cat.row(i)
+        _, reasons = score_candidate(p, q, weights)
+        reasons.append(f"Ajuste CBR (+{round(sim_cbr*100)}% de similitud con casos previos)")
+        out.append({"product": p, "score": float(scores[j]), "reasons": reasons})
+    return out
@@ -0,0 +1,55 @@
+# =====================================================
+# SEAC v1.8 — Productos recomendados por sesión
+# =====================================================
+# Guarda, por session_id, los productos que /infer mostró al usuario para que
+# /feedback y favoritos los resuelvan por (session_id, product_id) sin volver
+# a buscar en la tabla products. Acotada (LRU) y con expiración (TTL).
+import os
+import threading
+from typing import Optional, Tuple
+
+from .cache import TTLCache
+from .metrics import register_gauge
+
+# Segundos que una sesión conserva sus productos y cantidad máxima de sesiones en memoria
+SESSION_CACHE_TTL = float(os.getenv("SEAC_SESSION_CACHE_TTL", "1800"))
+SESSION_CACHE_SIZE = int(os.getenv("SEAC_SESSION_CACHE_SIZE", "5000"))
+
+_cache = TTLCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL)
+_lock = threading.Lock()  # crea el dict de cada sesión una sola vez
+
+
+def remember(session_id: str, producto: dict, source: Optional[str] = None):
+    """Registra un producto (ya normalizado) mostrado en la sesión."""
+    if not session_id or not producto.get("id"):
+        return
+    with _lock:
+        productos = _cache.get(session_id)
+        if productos is None:
+            productos = {}
+            _cache.set(session_id, productos)
+        productos[producto["id"]] = (dict(producto), source)
+
+
+def lookup(session_id: str, product_id: str) -> Optional[Tuple[dict, Optional[str]]]:
+    """(copia del producto, origen) si la sesión sigue en memoria; None si no."""
+    productos = _cache.get(session_id)
+    if not productos:
+        return None
+    with _lock:
+        item = productos.get(product_id)
+    if item is None:
+        return None
+    producto, source = item
+    return dict(producto), source
+
+
+def session_size(session_id: str) -> int:
+    with _lock:
+        return len(_cache.get(session_id) or {})
+
+
+def stats() -> dict:
+    return _cache.stats()
+
+register_gauge("seac_cache", stats, "Estadísticas de las cachés en memoria", labels={"cache": "session"})
@@ -0,0 +1,127 @@
+# =====================================================
+# SEAC v1.6 — Extracción de características numéricas de hardware
+# =====================================================
+# Convierte los textos libres de cpu/gpu/ram/storage en los valores
+# que usan las reglas de USO_MIN_REQ (cpu_score, gpu_score, ram_gb, storage_gb).
+import re
+from functools import lru_cache
+from typing import Dict, Any, List, Tuple
+
+FEATURE_COLUMNS = ("cpu_score", "gpu_score", "ram_gb", "storage_gb")
+
+# -----------------------------------------------------
+# Tablas de referencia (puntaje relativo 0–100)
+# Se recorren en orden: los patrones más específicos van primero.
+# -----------------------------------------------------
+CPU_BENCH: List[Tuple[str, float]] = [
+    (r"\bm[1-4]\s*ultra\b", 98),
+    (r"\bm4\s*max\b", 97), (r"\bm3\s*max\b", 94), (r"\bm2\s*max\b", 90), (r"\bm1\s*max\b", 86),
+    (r"\bm4\s*pro\b", 93), (r"\bm3\s*pro\b", 88), (r"\bm2\s*pro\b", 84), (r"\bm1\s*pro\b", 80),
+    (r"\b(apple\s*)?m4\b", 88), (r"\b(apple\s*)?m3\b", 82), (r"\b(apple\s*)?m2\b", 76), (r"\b(apple\s*)?m1\b", 70),
+    (r"snapdragon\s*x\s*elite", 80), (r"snapdragon\s*x\s*plus", 72), (r"snapdragon", 50),
+    (r"ryzen\s*ai\s*9|ryzen\s*9", 90), (r"ryzen\s*ai\s*7|ryzen\s*7", 80),
+    (r"ryzen\s*5", 66), (r"ryzen\s*3", 48), (r"athlon", 25),
+    (r"core\s*ultra\s*9", 92), (r"core\s*ultra\s*7", 84), (r"core\s*ultra\s*5", 70),
+    (r"\bi9\b|core\s*i9", 90), (r"\bi7\b|core\s*i7", 80), (r"\bi5\b|core\s*i5", 66), (r"\bi3\b|core\s*i3", 48),
+    (r"core\s*[3579]\b", 60),
+    (r"pentium|celeron|\bn[12]00\b|\bn\d{4}\b", 25), (r"atom", 15),
+    (r"mediatek|kompanio", 22),
+]
+
+GPU_BENCH: List[Tuple[str, float]] = [
+    (r"rtx\s*5090", 100), (r"rtx\s*5080", 96), (r"rtx\s*5070\s*ti", 90), (r"rtx\s*5070", 86), (r"rtx\s*5060", 76), (r"rtx\s*5050", 66),
+    (r"rtx\s*4090", 98), (r"rtx\s*4080", 92), (r"rtx\s*4070", 80), (r"rtx\s*4060", 72), (r"rtx\s*4050", 62),
+    (r"rtx\s*3080", 85), (r"rtx\s*3070", 76), (r"rtx\s*3060", 66), (r"rtx\s*3050", 52),
+    (r"rtx\s*2080", 70), (r"rtx\s*2070", 64), (r"rtx\s*2060", 56), (r"rtx\s*2050", 40),
+    (r"rtx\s*a?\d{3,4}\s*ada|rtx\s*a\d{3,4}", 70),
+    (r"gtx\s*1660", 46), (r"gtx\s*1650", 38), (r"gtx\s*10[5-8]0", 32), (r"mx\s*\d{3}", 22),
+    (r"rx\s*7[6-9]00", 70), (r"rx\s*6[7-8]00", 70), (r"rx\s*7[5-6]00|rx\s*6[5-6]00", 58), (r"rx\s*\d{4}", 42),
+    (r"radeon\s*8[89]0m", 46), (r"radeon\s*7[6-8]0m", 38), (r"radeon\s*6[6-8]0m", 32),
+    (r"arc\s*a7[37]0m", 62), (r"arc\s*a5\d0m", 50), (r"arc\s*a3\d0m", 40), (r"\barc\b", 35),
+    (r"m[1-4]\s*max", 75), (r"m[1-4]\s*pro", 58), (r"apple|\bm[1-4]\b", 42),
+    (r"adreno", 30),
+    (r"iris\s*xe|iris", 25), (r"radeon", 20), (r"uhd|hd\s*graphics", 12),
+    (r"integrad[ao]|integrated|intel\s*graphics", 15),
+]
+
+_CPU_RX = [(re.compile(p, re.IGNORECASE), s) for p, s in CPU_BENCH]
+_GPU_RX = [(re.compile(p, re.IGNORECASE), s) for p, s in GPU_BENCH]
+
+_CAPACIDAD = re.compile(r"(\d+(?:[.,]\d+)?)\s*(tb|gb)\b", re.IGNORECASE)
+_NUMERO = re.compile(r"^\s*(\d+(?:[.,]\d+)?)\s*$")
+
+
+def _lookup(table, text: str) -> float:
+    for rx, score in table:
+        if rx.search(text):
+            return float(score)
+    return 0.0
+
+# -----------------------------------------------------
+# Parsers (memorizados: los catálogos repiten mucho los mismos textos)
+# -----------------------------------------------------
+@lru_cache(maxsize=4096)
+def cpu_score(text: str) -> float:
+    """Puntaje aproximado de CPU según la familia del procesador."""
+    if not text:
+        return 0.0
+    score = _lookup(_CPU_RX, text)
+    if score and re.search(r"\d{4,5}\s*hx\b|\d{4,5}\s*h[sk]?\b", text, re.IGNORECASE):
+        score += 4  # variantes de alto rendimiento
+    elif score and re.search(r"\d{4,5}\s*u\b", text, re.IGNORECASE):
+        score -= 4  # variantes de bajo consumo
+    return float(max(0.0, min(100.0, score)))
+
+
+@lru_cache(maxsize=4096)
+def gpu_score(text: str) -> float:
+    """Puntaje aproximado de GPU según el modelo de la tarjeta gráfica."""
+    if not text:
+        return 0.0
+    return _lookup(_GPU_RX, text)
+
+
+def _capacidades_gb(text: str) -> List[float]:
+    out = []
+    for num, unit in _CAPACIDAD.findall(text or ""):
+        value = float(num.replace(",", "."))
+        out.append(value * 1024 if unit.lower() == "tb" else value)
+    return out
+
+
+@lru_cache(maxsize=1024)
+def ram_gb(text: str) -> float:
+    """'16GB DDR5' → 16.0; un número suelto se interpreta en GB."""
+    caps = _capacidades_gb(text)
+    if caps:
+        return caps[0]
+    m = _NUMERO.match(text or "")
+    return float(m.group(1).replace(",", ".")) if m else 0.0
+
+
+@lru_cache(maxsize=1024)
+def storage_gb(text: str) -> float:
+    """'1TB SSD + 256GB HDD' → 1280.0 (suma de unidades)."""
+    caps = _capacidades_gb(text)
+    if caps:
+        return sum(caps)
+    m = _NUMERO.match(text or "")
+    return float(m.group(1).replace(",", ".")) if m else 0.0
+
+
+def extract_features(p: Dict[str, Any]) -> Dict[str, float]:
+    """Características numéricas de un producto a partir de sus campos de texto."""
+    cpu = str(p.get("cpu") or "")
+    gpu = str(p.get("gpu") or "")
+    return {
+        "cpu_score": cpu_score(cpu),
+        # Los SoC de Apple suelen traer la GPU descrita solo en el procesador
+        "gpu_score": gpu_score(gpu) or (gpu_score(cpu) if re.search(r"\bm[1-4]\b", cpu, re.IGNORECASE) else 0.0),
+        "ram_gb": ram_gb(str(p.get("ram") or "")),
+        "storage_gb": storage_gb(str(p.get("storage") or "")),
+    }
+
+
+def feature_values(p: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    f = extract_features(p)
+    return tuple(f[c] for c in FEATURE_COLUMNS)
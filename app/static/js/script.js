@@ -254,34 +254,110 @@ if (mensajes.length) {
     };
 
     try {
-      const res = await fetch("/infer", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify(query),
-      });
-      const data = await res.json();
+      // Respuesta progresiva; si el navegador no soporta streams se usa /infer
+      const ok = await consultarStream(query);
+      if (!ok) {
+        const res = await fetch("/infer", {
+          method: "POST",
+          headers: { "Content-Type": "application/json" },
+          body: JSON.stringify(query),
+        });
+        const data = await res.json();
         if (!res.ok) throw new Error(data.detail || "Error desconocido");
-
-        // ⬇️ INSERTA ESTE BLOQUE AQUÍ (antes de llamar a renderResults)
-        const { userId } = getSession();
-        let favSet = new Set();
-        try {
-          const fr = await fetch(`/users/${userId}/favorites`);
-          const fj = await fr.json();
-          if (fj.ok && Array.isArray(fj.favorites)) {
-            favSet = new Set(fj.favorites.map(x => x.id));
-          }
-        } catch (e) {
-        }
-        renderResults(data, favSet);
+        renderResults(data, await cargarFavoritosSet());
+      }
     } catch (err) {
       resultsDiv.innerHTML = `<div class="alert alert-warning">⚠️ ${err.message}</div>`;
     }
   });
 }
 
-// ⚠️ Reemplaza tu renderResults completo por este:
-async function renderResults(data) {
+// 🔎 Ids de los favoritos del usuario (se cargan UNA SOLA VEZ por consulta)
+async function cargarFavoritosSet() {
+  const { userId } = getSession();
+  const favSet = new Set();
+  try {
+    const resFav = await fetch(`/users/${userId}/favorites`);
+    const dataFav = await resFav.json();
+    if (dataFav.ok && Array.isArray(dataFav.favorites)) {
+      dataFav.favorites.forEach(f => { if (f.id) favSet.add(String(f.id)); });
+    }
+  } catch {
+    console.warn("⚠️ No se pudieron cargar favoritos previos.");
+  }
+  return favSet;
+}
+
+// ---------- INFERENCIA PROGRESIVA (NDJSON) ----------
+// Eventos: session → ajuste (opcional) → item (uno por producto, en orden de llegada) → done
+async function consultarStream(query) {
+  const res = await fetch("/infer/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(query),
+  });
+  if (!res.ok || !res.body || typeof TextDecoder === "undefined") return false;
+
+  const favPromise = cargarFavoritosSet();
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  resultsDiv.innerHTML = "";
+  const estado = document.createElement("p");
+  estado.className = "text-muted stream-estado";
+  estado.textContent = "🔍 Buscando recomendaciones...";
+  resultsDiv.appendChild(estado);
+
+  const procesar = async (ev) => {
+    if (ev.event === "session") {
+      currentSessionId = ev.session_id || null;
+    } else if (ev.event === "ajuste") {
+      renderAjuste(ev.item);
+    } else if (ev.event === "item") {
+      estado.textContent = "⏳ Preparando más recomendaciones...";
+      renderCard(ev.item, await favPromise, ev.index);
+    } else if (ev.event === "done") {
+      estado.remove();
+      if (!ev.total) {
+        resultsDiv.insertAdjacentHTML("beforeend", "<p>No se encontraron recomendaciones para esos parámetros.</p>");
+      }
+    } else if (ev.event === "error") {
+      throw new Error(ev.detail || "Error desconocido");
+    }
+  };
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf("\n")) >= 0) {
+      const linea = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (linea) await procesar(JSON.parse(linea));
+    }
+  }
+  if (buffer.trim()) await procesar(JSON.parse(buffer));
+  return true;
+}
+
+// --- Tarjeta de "Ajuste Automático del Sistema"
+const esAjuste = (item) => {
+  const n = (item?.product?.name || '').toLowerCase();
+  const b = (item?.product?.brand || '').toLowerCase();
+  return b === 'seac' || n.includes('ajuste automático del sistema');
+};
+
+function renderAjuste(ajusteItem) {
+  const nota = (Array.isArray(ajusteItem.reasons) && ajusteItem.reasons[0]) ? ajusteItem.reasons[0] : '';
+  const alert = document.createElement('div');
+  alert.className = 'alert alert-info d-flex align-items-center gap-2';
+  alert.innerHTML = `<span>${nota}</span>`;
+  resultsDiv.prepend(alert);
+}
+
+async function renderResults(data, favSet) {
   resultsDiv.innerHTML = '';
   if (!Array.isArray(data) || data.length === 0) {
     resultsDiv.innerHTML = '<p>No se encontraron recomendaciones para esos parámetros.</p>';
@@ -290,88 +366,70 @@ async function renderResults(data) {
 
   currentSessionId = data[0]?.session_id || null;
 
-  // --- Filtrar tarjeta de "Ajuste Automático del Sistema"
-  const esAjuste = (item) => {
-    const n = (item?.product?.name || '').toLowerCase();
-    const b = (item?.product?.brand || '').toLowerCase();
-    return b === 'seac' || n.includes('ajuste automático del sistema');
-  };
   const ajusteItem = data.find(esAjuste);
-  if (ajusteItem) {
-    const nota = (Array.isArray(ajusteItem.reasons) && ajusteItem.reasons[0]) ? ajusteItem.reasons[0] : '';
-    const alert = document.createElement('div');
-    alert.className = 'alert alert-info d-flex align-items-center gap-2';
-    alert.innerHTML = `<span>${nota}</span>`;
-    resultsDiv.appendChild(alert);
-  }
+  if (ajusteItem) renderAjuste(ajusteItem);
   const itemsVisibles = data.filter(item => !esAjuste(item));
   if (itemsVisibles.length === 0) return;
 
-  // 🔎 Cargar favoritos del usuario UNA SOLA VEZ
-  const { userId } = getSession();
-  let favSet = new Set();
-  try {
-    const resFav = await fetch(`/users/${userId}/favorites`);
-    const dataFav = await resFav.json();
-    if (dataFav.ok && Array.isArray(dataFav.favorites)) {
-      dataFav.favorites.forEach(f => { if (f.id) favSet.add(String(f.id)); });
-    }
-  } catch {
-    console.warn("⚠️ No se pudieron cargar favoritos previos.");
-  }
+  if (!favSet) favSet = await cargarFavoritosSet();
+  itemsVisibles.forEach((item, i) => renderCard(item, favSet, i));
+}
 
-  itemsVisibles.forEach(item => {
-    const p = item.product;
-    const descripcion = Array.isArray(item.reasons) && item.reasons.length
-      ? item.reasons[0]
-      : 'Sin descripción disponible.';
-
-    const yaFavorito = favSet.has(String(p.id || ""));
-
-    const card = document.createElement('div');
-    card.className = 'card mb-3 shadow-sm p-3';
-    card.dataset.productId = p.id || "";
-
-    // 👇 Todo el HTML del card en UNA SOLA asignación (sin +=)
-    card.innerHTML = `
-      <h5 class="text-primary fw-bold mb-2">${p.name || "Producto sin nombre"}</h5>
-      <p class="mb-1">
-        <strong>Marca:</strong> ${p.brand || "N/D"} &nbsp; | &nbsp;
-        <strong>Precio:</strong> $${p.price || p.precio || 0}
-      </p>
-      <p class="mb-1">
-        <strong>Procesador:</strong> ${p.cpu || "N/D"} &nbsp; | &nbsp;
-        <strong>Tarjeta gráfica:</strong> ${p.gpu || "N/D"}
-      </p>
-      <p class="mb-1">
-        <strong>RAM:</strong> ${p.ram || "N/D"} &nbsp; | &nbsp;
-        <strong>Almacenamiento:</strong> ${p.storage || "N/D"} &nbsp; | &nbsp;
-        <strong>SO:</strong> ${p.os || "N/D"}
-      </p>
-      <p class="text-muted mb-2">${descripcion}</p>
-      <div class="d-flex gap-2 mt-2">
-        <button class="btn ${yaFavorito ? "btn-warning" : "btn-outline-warning"} btn-sm btn-feedback fade-color"
-          data-rate="1" ${yaFavorito ? "disabled" : ""}>
-          ${yaFavorito ? "✔️ Ya en favoritos" : "⭐ Agregar a favoritos"}
-        </button>
-      </div>
-    `;
-
-    const btn = card.querySelector('.btn-feedback');
-    if (!yaFavorito) {
-      btn.addEventListener('click', async () => {
-        const rating = 1;
-        // ⚠️ Si tu enviarFeedback espera 'id', pásale p.id; si espera el objeto, pásale p.
-        await enviarFeedback(currentSessionId, p, rating, btn);
-        btn.textContent = "✔️ Ya en favoritos";
-        btn.classList.remove("btn-outline-warning");
-        btn.classList.add("btn-warning");
-        btn.disabled = true;
-      });
-    }
+// Inserta la tarjeta respetando la posición del ranking ('index'), aunque llegue antes que otras
+function renderCard(item, favSet, index) {
+  const p = item.product;
+  const descripcion = Array.isArray(item.reasons) && item.reasons.length
+    ? item.reasons[0]
+    : 'Sin descripción disponible.';
+
+  const yaFavorito = favSet.has(String(p.id || ""));
+
+  const card = document.createElement('div');
+  card.className = 'card mb-3 shadow-sm p-3';
+  card.dataset.productId = p.id || "";
+  card.dataset.rank = index ?? 0;
+
+  // 👇 Todo el HTML del card en UNA SOLA asignación (sin +=)
+  card.innerHTML = `
+    <h5 class="text-primary fw-bold mb-2">${p.name || "Producto sin nombre"}</h5>
+    <p class="mb-1">
+      <strong>Marca:</strong> ${p.brand || "N/D"} &nbsp; | &nbsp;
+      <strong>Precio:</strong> $${p.price || p.precio || 0}
+    </p>
+    <p class="mb-1">
+      <strong>Procesador:</strong> ${p.cpu || "N/D"} &nbsp; | &nbsp;
+      <strong>Tarjeta gráfica:</strong> ${p.gpu || "N/D"}
+    </p>
+    <p class="mb-1">
+      <strong>RAM:</strong> ${p.ram || "N/D"} &nbsp; | &nbsp;
+      <strong>Almacenamiento:</strong> ${p.storage || "N/D"} &nbsp; | &nbsp;
+      <strong>SO:</strong> ${p.os || "N/D"}
+    </p>
+    <p class="text-muted mb-2">${descripcion}</p>
+    <div class="d-flex gap-2 mt-2">
+      <button class="btn ${yaFavorito ? "btn-warning" : "btn-outline-warning"} btn-sm btn-feedback fade-color"
+        data-rate="1" ${yaFavorito ? "disabled" : ""}>
+        ${yaFavorito ? "✔️ Ya en favoritos" : "⭐ Agregar a favoritos"}
+      </button>
+    </div>
+  `;
 
-    resultsDiv.appendChild(card);
-  });
+  const btn = card.querySelector('.btn-feedback');
+  if (!yaFavorito) {
+    btn.addEventListener('click', async () => {
+      const rating = 1;
+      await enviarFeedback(currentSessionId, p, rating, btn);
+      btn.textContent = "✔️ Ya en favoritos";
+      btn.classList.remove("btn-outline-warning");
+      btn.classList.add("btn-warning");
+      btn.disabled = true;
+    });
+  }
+
+  const siguiente = Array.from(resultsDiv.querySelectorAll('.card[data-rank]'))
+    .find(c => Number(c.dataset.rank) > Number(card.dataset.rank));
+  const estado = resultsDiv.querySelector('.stream-estado');
+  resultsDiv.insertBefore(card, siguiente || estado || null);
 }
 
 // ---------- FEEDBACK ----------
@@ -381,6 +439,7 @@ async function enviarFeedback(session_id, product, rating, buttonEl) {
   // 🟢 Estructura simple alineada con el nuevo modelo de FastAPI
   const body = {
     session_id: session_id || "web-session",
+    product_id: product.id || null,
     product_name: product.name || product.modelo || "Desconocido",
     brand: product.brand || product.marca || "(desconocida)",
     rating,
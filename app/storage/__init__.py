@@ -0,0 +1,35 @@
+# =====================================================
+# SEAC v1.8 — Selección del motor de almacenamiento
+# =====================================================
+# SEAC_DB_BACKEND=sqlserver (por defecto, pyodbc) | sqlite (archivo local, WAL).
+# Cada motor se importa solo si se usa: con sqlite no hace falta pyodbc ni el driver ODBC.
+import os
+import threading
+from typing import Optional
+
+from .base import Storage
+
+DB_BACKEND = os.getenv("SEAC_DB_BACKEND", "sqlserver").strip().lower()
+
+_storage: Optional[Storage] = None
+_lock = threading.Lock()
+
+
+def _create(backend: str) -> Storage:
+    if backend == "sqlserver":
+        from .sqlserver import SQLServerStorage
+        return SQLServerStorage()
+    if backend == "sqlite":
+        from .sqlite import SQLiteStorage
+        return SQLiteStorage()
+    raise ValueError(f"SEAC_DB_BACKEND desconocido: {backend!r} (usar 'sqlserver' o 'sqlite').")
+
+
+def get_storage() -> Storage:
+    """Motor configurado (uno por proceso)."""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = _create(DB_BACKEND)
+    return _storage
@@ -0,0 +1,69 @@
+# =====================================================
+# SEAC v1.8 — Interfaz de almacenamiento
+# =====================================================
+# Lo que cambia entre motores de BD: cómo se conecta, el esquema, cómo se abre
+# una transacción y las pocas sentencias que no son SQL estándar (upserts,
+# id generado). El resto de consultas (SELECT, INSERT simples, parámetros '?')
+# es común y vive en persistence_sql, kb, cbr y users_controller.
+from abc import ABC, abstractmethod
+from typing import Any, ContextManager, Sequence, Tuple
+
+
+class Storage(ABC):
+    """
+    Motor de almacenamiento. Las subclases definen las sentencias de abajo e implementan
+    los métodos abstractos (si falta alguno, instanciar el motor falla de inmediato).
+    """
+
+    name = "base"
+    # Excepciones del driver: si escapan de una conexión prestada, el pool la descarta
+    Error: Tuple[type, ...] = ()
+
+    # --- Sentencias propias del motor (mismos parámetros en todos) ---
+    # (id, product_key, name, brand, category, cpu, gpu, ram, storage, os, price, url,
+    #  cpu_score, gpu_score, ram_gb, storage_gb) → inserta o completa campos vacíos, sin resultado
+    PRODUCT_UPSERT_MANY = ""
+    # (session_id, uso, presupuesto) → inserta o actualiza la sesión
+    SESSION_UPSERT = ""
+    # (session_id, uso, session_id) → inserta la sesión solo si no existe
+    SESSION_IF_MISSING = ""
+    # (uso, w_presupuesto, w_uso, w_marca) → inserta o reemplaza los pesos del uso
+    WEIGHT_UPSERT = ""
+    # Crea (si falta) la tabla schema_version(version, description, applied_at) de app/migrations
+    SCHEMA_VERSION_DDL = ""
+
+    # --- Conexión ---
+    @abstractmethod
+    def connect(self):
+        """Nueva conexión del driver en modo autocommit (la administra db.ConnectionPool)."""
+
+    @abstractmethod
+    def create_schema(self, cur):
+        """Crea las tablas e índices que falten (idempotente). Lo aplica la migración 1."""
+
+    @abstractmethod
+    def migration_lock(self, raw) -> ContextManager[None]:
+        """Bloqueo exclusivo entre procesos (y servidores) mientras se aplican migraciones."""
+
+    # --- Transacciones (db.transaction) ---
+    @abstractmethod
+    def begin(self, raw):
+        """Inicia una transacción explícita sobre la conexión cruda."""
+
+    def end(self, raw):
+        """Devuelve la conexión a modo autocommit tras commit/rollback."""
+
+    # --- Ayudas de escritura ---
+    def bulk(self, cur):
+        """Prepara el cursor para executemany grandes."""
+
+    @abstractmethod
+    def upsert_product(self, cur, params: Sequence[Any]) -> Tuple[str, str]:
+        """Upsert de un producto (parámetros de PRODUCT_UPSERT_MANY). Devuelve (id real, 'INSERT' | 'UPDATE')."""
+
+    @abstractmethod
+    def insert_returning_id(self, cur, table: str, columns: Sequence[str], params: Sequence[Any]) -> int:
+        """INSERT en una tabla con id autonumérico; devuelve el id generado."""
+
+    def describe(self) -> dict:
+        return {"backend": self.name}
@@ -0,0 +1,202 @@
+# =====================================================
+# SEAC v1.8 — Almacenamiento embebido en SQLite (WAL)
+# =====================================================
+# Un solo archivo local, sin servidor: instalaciones de un nodo, kioscos y
+# pruebas de carga. En modo WAL las lecturas no esperan a los escritores y
+# cada conexión del pool lee en paralelo; las escrituras se serializan.
+import os
+import sqlite3
+from contextlib import contextmanager
+from typing import Any, Iterator, Sequence, Tuple
+
+from .base import Storage
+
+# Archivo de la base de datos (se crea si no existe)
+SQLITE_PATH = os.getenv("SEAC_SQLITE_PATH", "seac.db")
+# Espera máxima (ms) por el bloqueo de escritura antes de fallar con "database is locked"
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SEAC_SQLITE_BUSY_TIMEOUT", "5000"))
+
+# Esquema base (migración 1 de app/migrations.py)
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT NOT NULL PRIMARY KEY,
+    uso TEXT NULL,
+    presupuesto REAL NULL,
+    created_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+);
+
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT NOT NULL PRIMARY KEY,
+    name TEXT NULL,
+    brand TEXT NULL,
+    category TEXT NULL,
+    cpu TEXT NULL,
+    gpu TEXT NULL,
+    ram TEXT NULL,
+    storage TEXT NULL,
+    os TEXT NULL,
+    price REAL NULL,
+    url TEXT NULL,
+    cpu_score REAL NULL,
+    gpu_score REAL NULL,
+    ram_gb REAL NULL,
+    storage_gb REAL NULL,
+    product_key TEXT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_products_product_key ON products(product_key);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NULL REFERENCES sessions(session_id),
+    product_id TEXT NULL REFERENCES products(id),
+    uso TEXT NULL,
+    rating REAL NULL,
+    ts TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+);
+
+CREATE TABLE IF NOT EXISTS weights (
+    uso TEXT NOT NULL PRIMARY KEY,
+    w_presupuesto REAL NULL,
+    w_uso REAL NULL,
+    w_marca REAL NULL
+);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password TEXT NOT NULL,
+    first_name TEXT NULL,
+    last_name TEXT NULL,
+    created_at TEXT DEFAULT (CURRENT_TIMESTAMP)
+);
+
+CREATE TABLE IF NOT EXISTS favorites (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    product_id TEXT NOT NULL REFERENCES products(id),
+    added_at TEXT DEFAULT (CURRENT_TIMESTAMP)
+);
+"""
+
+# Mismo criterio que el MERGE de SQL Server: destino = fila con el mismo id o, si no hay,
+# la de igual product_key (menor id); si tampoco existe, se inserta con el id recibido.
+_PRODUCT_UPSERT = """
+INSERT INTO products (id, product_key, name, brand, category, cpu, gpu, ram, storage, os, price, url,
+                      cpu_score, gpu_score, ram_gb, storage_gb)
+SELECT COALESCE((SELECT p.id FROM products p WHERE p.id = s.id),
+                (SELECT MIN(p.id) FROM products p WHERE p.product_key = s.product_key), s.id),
+       s.product_key, s.name, s.brand, s.category, s.cpu, s.gpu, s.ram, s.storage, s.os, s.price, s.url,
+       s.cpu_score, s.gpu_score, s.ram_gb, s.storage_gb
+FROM (SELECT ? AS id, ? AS product_key, ? AS name, ? AS brand, ? AS category, ? AS cpu, ? AS gpu,
+             ? AS ram, ? AS storage, ? AS os, ? AS price, ? AS url,
+             ? AS cpu_score, ? AS gpu_score, ? AS ram_gb, ? AS storage_gb) AS s
+WHERE true
+ON CONFLICT(id) DO UPDATE SET
+    product_key = CASE WHEN (product_key IS NULL OR name IS NULL OR name LIKE 'Producto_%'
+                             OR brand IS NULL OR brand='Desconocido') THEN excluded.product_key ELSE product_key END,
+    name = CASE WHEN (name IS NULL OR name LIKE 'Producto_%') THEN excluded.name ELSE name END,
+    brand = CASE WHEN (brand IS NULL OR brand='Desconocido') THEN excluded.brand ELSE brand END,
+    category = CASE WHEN (category IS NULL OR category='') THEN excluded.category ELSE category END,
+    cpu = CASE WHEN (cpu IS NULL OR cpu='') THEN excluded.cpu ELSE cpu END,
+    gpu = CASE WHEN (gpu IS NULL OR gpu='') THEN excluded.gpu ELSE gpu END,
+    ram = CASE WHEN (ram IS NULL OR ram='') THEN excluded.ram ELSE ram END,
+    storage = CASE WHEN (storage IS NULL OR storage='') THEN excluded.storage ELSE storage END,
+    os = CASE WHEN (os IS NULL OR os='') THEN excluded.os ELSE os END,
+    price = CASE WHEN (price IS NULL OR price=0) THEN excluded.price ELSE price END,
+    url = CASE WHEN (url IS NULL OR url='') THEN excluded.url ELSE url END,
+    cpu_score = CASE WHEN (cpu IS NULL OR cpu='' OR cpu_score IS NULL) THEN excluded.cpu_score ELSE cpu_score END,
+    gpu_score = CASE WHEN (gpu IS NULL OR gpu='' OR gpu_score IS NULL) THEN excluded.gpu_score ELSE gpu_score END,
+    ram_gb = CASE WHEN (ram IS NULL OR ram='' OR ram_gb IS NULL) THEN excluded.ram_gb ELSE ram_gb END,
+    storage_gb = CASE WHEN (storage IS NULL OR storage='' OR storage_gb IS NULL) THEN excluded.storage_gb ELSE storage_gb END
+"""
+
+
+class SQLiteStorage(Storage):
+    name = "sqlite"
+    Error = (sqlite3.Error,)
+
+    # El INSERT ... SELECT es una sola sentencia: SQLite la ejecuta con el bloqueo de escritura tomado
+    PRODUCT_UPSERT_MANY = _PRODUCT_UPSERT + ";"
+
+    SESSION_UPSERT = """
+    INSERT INTO sessions (session_id, uso, presupuesto) VALUES (?, ?, ?)
+    ON CONFLICT(session_id) DO UPDATE SET uso=excluded.uso, presupuesto=excluded.presupuesto;
+    """
+
+    SESSION_IF_MISSING = """
+    INSERT INTO sessions (session_id, uso, presupuesto)
+    SELECT ?, ?, 0
+    WHERE NOT EXISTS (SELECT 1 FROM sessions WHERE session_id=?);
+    """
+
+    SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER NOT NULL PRIMARY KEY,
+        description TEXT NULL,
+        applied_at TEXT NOT NULL DEFAULT (CURRENT_TIMESTAMP)
+    );
+    """
+
+    WEIGHT_UPSERT = """
+    INSERT INTO weights (uso, w_presupuesto, w_uso, w_marca) VALUES (?, ?, ?, ?)
+    ON CONFLICT(uso) DO UPDATE SET
+        w_presupuesto=excluded.w_presupuesto, w_uso=excluded.w_uso, w_marca=excluded.w_marca;
+    """
+
+    def __init__(self, path: str = SQLITE_PATH, busy_timeout: int = SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # isolation_level=None → autocommit; las transacciones se abren explícitamente en begin()
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout / 1000,
+                               isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute("PRAGMA foreign_keys=ON;")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout)};")
+        return conn
+
+    # -----------------------------------------------------
+    # Transacciones y escritura
+    # -----------------------------------------------------
+    def begin(self, raw):
+        # IMMEDIATE toma el bloqueo de escritura al inicio: sin interbloqueos al pasar de leer a escribir
+        raw.execute("BEGIN IMMEDIATE;")
+
+    def upsert_product(self, cur, params: Sequence[Any]) -> Tuple[str, str]:
+        pid, key = params[0], params[1]
+        cur.execute("SELECT 1 FROM products WHERE id=? OR product_key=? LIMIT 1;", (pid, key))
+        action = "UPDATE" if cur.fetchone() else "INSERT"
+        cur.execute(_PRODUCT_UPSERT + " RETURNING id;", tuple(params))
+        real_id = cur.fetchone()[0]
+        return real_id, action
+
+    def insert_returning_id(self, cur, table: str, columns: Sequence[str], params: Sequence[Any]) -> int:
+        cur.execute(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)});",
+                    tuple(params))
+        return cur.lastrowid
+
+    def describe(self) -> dict:
+        return {"backend": self.name, "path": os.path.abspath(self.path)}
+
+    # -----------------------------------------------------
+    # Esquema
+    # -----------------------------------------------------
+    def create_schema(self, cur):
+        # Sentencia por sentencia (executescript confirmaría la transacción de migration_lock)
+        for stmt in _SCHEMA.split(";"):
+            if stmt.strip():
+                cur.execute(stmt)
+
+    @contextmanager
+    def migration_lock(self, raw) -> Iterator[None]:
+        # BEGIN IMMEDIATE: un solo proceso migra; el DDL de SQLite es transaccional
+        raw.execute("BEGIN IMMEDIATE;")
+        try:
+            yield
+            raw.execute("COMMIT;")
+        except BaseException:
+            raw.execute("ROLLBACK;")
+            raise
@@ -0,0 +1,312 @@
+# =====================================================
+# SEAC v1.8 — Almacenamiento en SQL Server (pyodbc)
+# =====================================================
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Sequence, Tuple
+
+import pyodbc
+
+from .base import Storage
+
+# Cadena de conexión: lee del entorno o usa un valor por defecto
+SQLSERVER_CONN = os.getenv(
+    "SEAC_SQLSERVER_CONN",
+    "DRIVER={ODBC Driver 17 for SQL Server};SERVER=localhost\\SQLEXPRESS;DATABASE=SEACDB;Trusted_Connection=yes;TrustServerCertificate=yes;"
+)
+# Espera máxima (ms) por el bloqueo de migraciones que tenga otro proceso
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("SEAC_MIGRATION_LOCK_TIMEOUT", "60000"))
+
+# -----------------------------------------------------
+# Función auxiliar para reemplazar base de datos en cadena
+# -----------------------------------------------------
+def _conn_replace_db(conn_str: str, new_db: str) -> str:
+    parts = conn_str.split(";")
+    out = []
+    db_set = False
+    for p in parts:
+        if not p:
+            continue
+        kv = p.split("=", 1)
+        if len(kv) == 2 and kv[0].strip().lower() in ("database", "initial catalog"):
+            out.append(f"DATABASE={new_db}")
+            db_set = True
+        else:
+            out.append(p)
+    if not db_set:
+        out.append(f"DATABASE={new_db}")
+    return ";".join(out) + ";"
+
+
+# Inserta el producto o completa solo sus campos vacíos, en un único viaje a la BD.
+# El destino es la fila con el mismo id o, si no hay, la de igual product_key
+# (IX_products_product_key); los bloqueos evitan duplicados entre escritores concurrentes.
+_PRODUCT_MERGE = """
+MERGE products WITH (HOLDLOCK) AS t
+USING (
+    SELECT src.*, COALESCE(
+        (SELECT TOP 1 p.id FROM products p WITH (UPDLOCK, HOLDLOCK)
+         WHERE p.id = src.id OR p.product_key = src.product_key
+         ORDER BY CASE WHEN p.id = src.id THEN 0 ELSE 1 END, p.id), src.id) AS target_id
+    FROM (SELECT ? AS id, ? AS product_key, ? AS name, ? AS brand, ? AS category, ? AS cpu, ? AS gpu,
+                 ? AS ram, ? AS storage, ? AS os, ? AS price, ? AS url,
+                 ? AS cpu_score, ? AS gpu_score, ? AS ram_gb, ? AS storage_gb) AS src
+) AS s
+ON t.id = s.target_id
+WHEN MATCHED THEN UPDATE SET
+    product_key = CASE WHEN (t.product_key IS NULL OR t.name IS NULL OR t.name LIKE 'Producto_%'
+                             OR t.brand IS NULL OR t.brand='Desconocido') THEN s.product_key ELSE t.product_key END,
+    name = CASE WHEN (t.name IS NULL OR t.name LIKE 'Producto_%') THEN s.name ELSE t.name END,
+    brand = CASE WHEN (t.brand IS NULL OR t.brand='Desconocido') THEN s.brand ELSE t.brand END,
+    category = CASE WHEN (t.category IS NULL OR t.category='') THEN s.category ELSE t.category END,
+    cpu = CASE WHEN (t.cpu IS NULL OR t.cpu='') THEN s.cpu ELSE t.cpu END,
+    gpu = CASE WHEN (t.gpu IS NULL OR t.gpu='') THEN s.gpu ELSE t.gpu END,
+    ram = CASE WHEN (t.ram IS NULL OR t.ram='') THEN s.ram ELSE t.ram END,
+    storage = CASE WHEN (t.storage IS NULL OR t.storage='') THEN s.storage ELSE t.storage END,
+    os = CASE WHEN (t.os IS NULL OR t.os='') THEN s.os ELSE t.os END,
+    price = CASE WHEN (t.price IS NULL OR t.price=0) THEN s.price ELSE t.price END,
+    url = CASE WHEN (t.url IS NULL OR t.url='') THEN s.url ELSE t.url END,
+    cpu_score = CASE WHEN (t.cpu IS NULL OR t.cpu='' OR t.cpu_score IS NULL) THEN s.cpu_score ELSE t.cpu_score END,
+    gpu_score = CASE WHEN (t.gpu IS NULL OR t.gpu='' OR t.gpu_score IS NULL) THEN s.gpu_score ELSE t.gpu_score END,
+    ram_gb = CASE WHEN (t.ram IS NULL OR t.ram='' OR t.ram_gb IS NULL) THEN s.ram_gb ELSE t.ram_gb END,
+    storage_gb = CASE WHEN (t.storage IS NULL OR t.storage='' OR t.storage_gb IS NULL) THEN s.storage_gb ELSE t.storage_gb END
+WHEN NOT MATCHED THEN
+    INSERT (id, product_key, name, brand, category, cpu, gpu, ram, storage, os, price, url,
+            cpu_score, gpu_score, ram_gb, storage_gb)
+    VALUES (s.id, s.product_key, s.name, s.brand, s.category, s.cpu, s.gpu, s.ram, s.storage, s.os, s.price, s.url,
+            s.cpu_score, s.gpu_score, s.ram_gb, s.storage_gb)
+{output};
+"""
+
+
+class SQLServerStorage(Storage):
+    name = "sqlserver"
+    Error = (pyodbc.Error,)
+
+    PRODUCT_UPSERT_MANY = _PRODUCT_MERGE.format(output="")
+    PRODUCT_UPSERT = _PRODUCT_MERGE.format(output="OUTPUT inserted.id, $action")
+
+    SESSION_UPSERT = """
+    MERGE sessions WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS session_id, ? AS uso, ? AS presupuesto) AS s
+    ON t.session_id = s.session_id
+    WHEN MATCHED THEN UPDATE SET uso=s.uso, presupuesto=s.presupuesto
+    WHEN NOT MATCHED THEN INSERT (session_id, uso, presupuesto) VALUES (s.session_id, s.uso, s.presupuesto);
+    """
+
+    SESSION_IF_MISSING = """
+    INSERT INTO sessions (session_id, uso, presupuesto)
+    SELECT ?, ?, 0
+    WHERE NOT EXISTS (SELECT 1 FROM sessions WITH (UPDLOCK, HOLDLOCK) WHERE session_id=?);
+    """
+
+    SCHEMA_VERSION_DDL = """
+    IF OBJECT_ID(N'[dbo].[schema_version]', N'U') IS NULL
+    CREATE TABLE [dbo].[schema_version] (
+        version INT NOT NULL PRIMARY KEY,
+        description NVARCHAR(255) NULL,
+        applied_at DATETIME NOT NULL DEFAULT(GETDATE())
+    );
+    """
+
+    WEIGHT_UPSERT = """
+    MERGE weights WITH (HOLDLOCK) AS t
+    USING (SELECT ? AS uso, ? AS w_presupuesto, ? AS w_uso, ? AS w_marca) AS s
+    ON t.uso = s.uso
+    WHEN MATCHED THEN UPDATE SET w_presupuesto=s.w_presupuesto, w_uso=s.w_uso, w_marca=s.w_marca
+    WHEN NOT MATCHED THEN INSERT (uso, w_presupuesto, w_uso, w_marca)
+        VALUES (s.uso, s.w_presupuesto, s.w_uso, s.w_marca);
+    """
+
+    def __init__(self, conn_str: str = SQLSERVER_CONN):
+        self.conn_str = conn_str
+        self._db_checked = False
+        self._db_lock = threading.Lock()
+
+    # -----------------------------------------------------
+    # Creación de la base de datos (solo una vez por proceso)
+    # -----------------------------------------------------
+    def _ensure_database(self):
+        """Crea la base de datos desde 'master' si no existe. Se ejecuta una sola vez."""
+        with self._db_lock:
+            if self._db_checked:
+                return
+            self._db_checked = True
+            master_conn_str = _conn_replace_db(self.conn_str, "master")
+            mconn = pyodbc.connect(master_conn_str, autocommit=True)
+            try:
+                cur = mconn.cursor()
+                dbname = "SEACDB"
+                for frag in self.conn_str.split(";"):
+                    if "=" in frag and frag.split("=")[0].strip().lower() in ("database", "initial catalog"):
+                        dbname = frag.split("=", 1)[1].strip()
+                cur.execute(f"IF DB_ID('{dbname}') IS NULL CREATE DATABASE [{dbname}];")
+            finally:
+                mconn.close()
+
+    def connect(self):
+        try:
+            conn = pyodbc.connect(self.conn_str, autocommit=True)
+        except pyodbc.Error:
+            if self._db_checked:
+                raise
+            self._ensure_database()
+            conn = pyodbc.connect(self.conn_str, autocommit=True)
+        return conn
+
+    # -----------------------------------------------------
+    # Transacciones y escritura
+    # -----------------------------------------------------
+    def begin(self, raw):
+        raw.autocommit = False
+
+    def end(self, raw):
+        raw.autocommit = True
+
+    def bulk(self, cur):
+        cur.fast_executemany = True
+
+    def upsert_product(self, cur, params: Sequence[Any]) -> Tuple[str, str]:
+        cur.execute(self.PRODUCT_UPSERT, tuple(params))
+        real_id, action = cur.fetchone()
+        return real_id, action
+
+    def insert_returning_id(self, cur, table: str, columns: Sequence[str], params: Sequence[Any]) -> int:
+        cur.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            OUTPUT INSERTED.id
+            VALUES ({', '.join('?' for _ in columns)});
+        """, tuple(params))
+        return cur.fetchone()[0]
+
+    # -----------------------------------------------------
+    # Esquema
+    # -----------------------------------------------------
+    @contextmanager
+    def migration_lock(self, raw) -> Iterator[None]:
+        # Bloqueo de aplicación de la sesión: el resto de procesos espera (o falla tras el timeout)
+        cur = raw.cursor()
+        cur.execute("""
+        SET NOCOUNT ON;
+        DECLARE @r INT;
+        EXEC @r = sp_getapplock @Resource = N'seac_migrations', @LockMode = 'Exclusive',
+                                @LockOwner = 'Session', @LockTimeout = ?;
+        SELECT @r;
+        """, (MIGRATION_LOCK_TIMEOUT,))
+        if cur.fetchone()[0] < 0:
+            raise TimeoutError("Otro proceso está aplicando las migraciones (sp_getapplock).")
+        try:
+            yield
+        finally:
+            cur.execute("EXEC sp_releaseapplock @Resource = N'seac_migrations', @LockOwner = 'Session';")
+
+    def create_schema(self, cur):
+
+        # === Tabla de sesiones ===
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[sessions]') AND type in (N'U'))
+        CREATE TABLE [dbo].[sessions] (
+            session_id NVARCHAR(100) NOT NULL PRIMARY KEY,
+            uso NVARCHAR(255) NULL,
+            presupuesto FLOAT NULL,
+            created_at DATETIME NOT NULL DEFAULT(GETDATE())
+        );
+        """)
+
+        # === Tabla de productos ===
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[products]') AND type in (N'U'))
+        CREATE TABLE [dbo].[products] (
+            id NVARCHAR(100) NOT NULL PRIMARY KEY,
+            name NVARCHAR(255) NULL,
+            brand NVARCHAR(255) NULL,
+            category NVARCHAR(100) NULL,
+            cpu NVARCHAR(255) NULL,
+            gpu NVARCHAR(255) NULL,
+            ram NVARCHAR(50) NULL,
+            storage NVARCHAR(50) NULL,
+            os NVARCHAR(100) NULL,
+            price FLOAT NULL,
+            url NVARCHAR(MAX) NULL
+        );
+        """)
+
+        # === Características numéricas derivadas de cpu/gpu/ram/storage ===
+        cur.execute("""
+        IF COL_LENGTH('dbo.products', 'cpu_score') IS NULL
+        ALTER TABLE [dbo].[products] ADD
+            cpu_score FLOAT NULL,
+            gpu_score FLOAT NULL,
+            ram_gb FLOAT NULL,
+            storage_gb FLOAT NULL;
+        """)
+
+        # === Clave normalizada marca|nombre (indexada) para identificar productos ===
+        cur.execute("""
+        IF COL_LENGTH('dbo.products', 'product_key') IS NULL
+        ALTER TABLE [dbo].[products] ADD product_key NVARCHAR(450) NULL;
+        """)
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_products_product_key'
+                       AND object_id = OBJECT_ID(N'[dbo].[products]'))
+        CREATE INDEX IX_products_product_key ON [dbo].[products](product_key);
+        """)
+
+        # === Tabla de feedback ===
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[feedback]') AND type in (N'U'))
+        CREATE TABLE [dbo].[feedback] (
+            id INT IDENTITY(1,1) NOT NULL PRIMARY KEY,
+            session_id NVARCHAR(100) NULL,
+            product_id NVARCHAR(100) NULL,
+            uso NVARCHAR(255) NULL,
+            rating FLOAT NULL,
+            ts DATETIME NOT NULL DEFAULT(GETDATE()),
+            CONSTRAINT FK_feedback_sessions FOREIGN KEY (session_id) REFERENCES [dbo].[sessions](session_id)
+        );
+        """)
+
+        # === Relación feedback → products ===
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.foreign_keys WHERE name = 'FK_feedback_products')
+        ALTER TABLE [dbo].[feedback]
+        ADD CONSTRAINT FK_feedback_products FOREIGN KEY (product_id) REFERENCES [dbo].[products](id);
+        """)
+
+        # === Tabla de pesos ===
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[weights]') AND type in (N'U'))
+        CREATE TABLE [dbo].[weights] (
+            uso NVARCHAR(255) NOT NULL PRIMARY KEY,
+            w_presupuesto FLOAT NULL,
+            w_uso FLOAT NULL,
+            w_marca FLOAT NULL
+        );
+        """)
+
+        # Tabla de usuarios
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[users]') AND type in (N'U'))
+        CREATE TABLE [dbo].[users] (
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            email NVARCHAR(255) UNIQUE NOT NULL,
+            password NVARCHAR(255) NOT NULL,
+            first_name NVARCHAR(120) NULL,
+            last_name NVARCHAR(120) NULL,
+            created_at DATETIME DEFAULT(GETDATE())
+        );
+        """)
+
+        # Tabla de favoritos (relación usuario-producto)
+        cur.execute("""
+        IF NOT EXISTS (SELECT * FROM sys.objects WHERE object_id = OBJECT_ID(N'[dbo].[favorites]') AND type in (N'U'))
+        CREATE TABLE [dbo].[favorites] (
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            user_id INT NOT NULL,
+            product_id NVARCHAR(100) NOT NULL,
+            added_at DATETIME DEFAULT(GETDATE()),
+            CONSTRAINT FK_fav_user FOREIGN KEY (user_id) REFERENCES [dbo].[users](id),
+            CONSTRAINT FK_fav_product FOREIGN KEY (product_id) REFERENCES [dbo].[products](id)
+        );
+        """)
@@ -0,0 +1,68 @@
+# =====================================================
+# SEAC v1.8 — Tiempos por etapa del pipeline
+# =====================================================
+# stage("scoring") mide un bloque y suma su duración (ms) a la petición en curso.
+# La petición se abre con collect() (lo hace el middleware de main si
+# SEAC_SERVER_TIMING=1) y el resultado sale en la cabecera Server-Timing.
+# Cada duración va además al histograma seac_stage_duration_seconds de /metrics,
+# haya o no collect() activo, y es un span si la petición se está perfilando
+# (app/profiling.py).
+# Las tareas asyncio y run_db copian el contexto, así que ven el mismo acumulador.
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+from .metrics import STAGE_SECONDS
+from .profiling import span
+
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("seac_stages", default=None)
+
+
+def record(name: str, ms: float):
+    """Suma 'ms' a la etapa 'name' de la petición en curso (si hay una) y al histograma de la etapa."""
+    STAGE_SECONDS.observe(ms / 1000, name)
+    stages = _current.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + ms
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        with span(name):
+            yield
+    finally:
+        record(name, (time.perf_counter() - t0) * 1000)
+
+
+@contextmanager
+def collect() -> Iterator[Dict[str, float]]:
+    """Acumulador de etapas para el bloque (una petición): {etapa: ms}."""
+    stages: Dict[str, float] = {}
+    token = _current.set(stages)
+    try:
+        yield stages
+    finally:
+        _current.reset(token)
+
+
+def server_timing(stages: Dict[str, float]) -> str:
+    """{'scoring': 1.5} → 'scoring;dur=1.50' (formato de la cabecera Server-Timing)."""
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in stages.items())
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Inverso de server_timing (lo usa bench/ para leer las respuestas)."""
+    out: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        for p in params.split(";"):
+            k, _, v = p.strip().partition("=")
+            if name and k == "dur":
+                try:
+                    out[name] = out.get(name, 0.0) + float(v)
+                except ValueError:
+                    pass
+    return out
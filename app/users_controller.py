@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from .db import get_conn
+from .db import get_conn, run_db, storage
 import hashlib
 
 router = APIRouter(prefix="/users", tags=["Usuarios"])
@@ -8,40 +8,39 @@ def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
 @router.post("/register")
-def register(email: str, password: str, first_name: str = "", last_name: str = ""):
-    conn = get_conn()
-    cur = conn.cursor()
+async def register(email: str, password: str, first_name: str = "", last_name: str = ""):
+    return await run_db(_register, email, password, first_name, last_name)
 
-    cur.execute("SELECT 1 FROM users WHERE email=?", (email,))
-    if cur.fetchone():
-        conn.close()
-        raise HTTPException(status_code=400, detail="El usuario ya existe.")
+def _register(email: str, password: str, first_name: str, last_name: str):
+    with get_conn() as conn:
+        cur = conn.cursor()
 
-    hashed = hash_password(password)
-    cur.execute("""
-        INSERT INTO users (email, password, first_name, last_name)
-        OUTPUT INSERTED.id
-        VALUES (?, ?, ?, ?);
-    """, (email, hashed, first_name.strip(), last_name.strip()))
-    row = cur.fetchone()
-    conn.close()
+        cur.execute("SELECT 1 FROM users WHERE email=?", (email,))
+        if cur.fetchone():
+            raise HTTPException(status_code=400, detail="El usuario ya existe.")
+
+        hashed = hash_password(password)
+        user_id = storage.insert_returning_id(cur, "users", ("email", "password", "first_name", "last_name"),
+                                              (email, hashed, first_name.strip(), last_name.strip()))
 
     return {
         "ok": True,
         "msg": "Usuario registrado correctamente.",
-        "user_id": row[0],
+        "user_id": user_id,
         "email": email,
         "first_name": first_name.strip(),
         "last_name": last_name.strip()
     }
 
 @router.post("/login")
-def login(email: str, password: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT id, password, first_name, last_name, email FROM users WHERE email=?", (email,))
-    row = cur.fetchone()
-    conn.close()
+async def login(email: str, password: str):
+    return await run_db(_login, email, password)
+
+def _login(email: str, password: str):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id, password, first_name, last_name, email FROM users WHERE email=?", (email,))
+        row = cur.fetchone()
 
     if not row:
         raise HTTPException(status_code=404, detail="Usuario no encontrado.")
@@ -58,25 +57,28 @@ def login(email: str, password: str):
     }
 
 @router.get("/{user_id}/favorites")
-def get_favorites(user_id: int):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    SELECT p.id, p.name, p.brand, p.category, p.cpu, p.gpu, p.ram, p.storage, p.os, p.price, p.url, f.added_at
-    FROM favorites f
-    JOIN products p ON p.id = f.product_id
-    WHERE f.user_id = ?
-    ORDER BY f.added_at DESC;
-    """, (user_id,))
-    cols = [c[0] for c in cur.description]
-    rows = [dict(zip(cols, r)) for r in cur.fetchall()]
-    conn.close()
+async def get_favorites(user_id: int):
+    return await run_db(_get_favorites, user_id)
+
+def _get_favorites(user_id: int):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+        SELECT p.id, p.name, p.brand, p.category, p.cpu, p.gpu, p.ram, p.storage, p.os, p.price, p.url, f.added_at
+        FROM favorites f
+        JOIN products p ON p.id = f.product_id
+        WHERE f.user_id = ?
+        ORDER BY f.added_at DESC;
+        """, (user_id,))
+        cols = [c[0] for c in cur.description]
+        rows = [dict(zip(cols, r)) for r in cur.fetchall()]
     return {"ok": True, "favorites": rows, "total": len(rows)}
 
 @router.delete("/{user_id}/favorites/{product_id}")
-def remove_favorite(user_id: int, product_id: str):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM favorites WHERE user_id=? AND product_id=?;", (user_id, product_id))
-    conn.close()
+async def remove_favorite(user_id: int, product_id: str):
+    return await run_db(_remove_favorite, user_id, product_id)
+
+def _remove_favorite(user_id: int, product_id: str):
+    with get_conn() as conn:
+        conn.cursor().execute("DELETE FROM favorites WHERE user_id=? AND product_id=?;", (user_id, product_id))
     return {"ok": True, "msg": f"Producto {product_id} eliminado de favoritos del usuario {user_id}."}
\ No newline at end of file
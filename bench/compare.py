@@ -0,0 +1,80 @@
+# =====================================================
+# SEAC bench — Comparación de dos resultados de run_bench
+# =====================================================
+#   python -m bench.compare base.json nuevo.json [--threshold 10]
+# Muestra throughput y p50/p95/p99 por endpoint y p95 por etapa con la variación
+# relativa. Con --threshold termina con código 1 si algún p95 o p99 de endpoint
+# empeora más de ese porcentaje (o si el throughput cae más de ese porcentaje).
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _load(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _delta(a: float, b: float) -> Optional[float]:
+    if not a:
+        return None
+    return (b - a) / a * 100.0
+
+
+def _fmt(d: Optional[float]) -> str:
+    return "    n/a" if d is None else f"{d:+6.1f}%"
+
+
+def compare(base: Dict[str, Any], new: Dict[str, Any], threshold: Optional[float] = None
+            ) -> Tuple[List[str], List[str]]:
+    """Devuelve (líneas del informe, regresiones que superan el umbral)."""
+    lines, regresiones = [], []
+    lines.append(f"base: {base['meta'].get('label') or base['meta'].get('git')} ({base['meta']['timestamp']})")
+    lines.append(f"new:  {new['meta'].get('label') or new['meta'].get('git')} ({new['meta']['timestamp']})")
+    lines.append("")
+    lines.append(f"{'endpoint':<12}{'métrica':<9}{'base':>11}{'new':>11}{'Δ':>9}")
+
+    for ep in sorted(set(base["endpoints"]) | set(new["endpoints"])):
+        a, b = base["endpoints"].get(ep), new["endpoints"].get(ep)
+        if not a or not b:
+            lines.append(f"{ep:<12}(solo en {'base' if a else 'new'})")
+            continue
+        for m in ("rps", "p50_ms", "p95_ms", "p99_ms", "errors"):
+            d = _delta(a[m], b[m])
+            lines.append(f"{ep:<12}{m:<9}{a[m]:>11.2f}{b[m]:>11.2f}{_fmt(d):>9}")
+            if threshold is None or d is None:
+                continue
+            if m in ("p95_ms", "p99_ms") and d > threshold:
+                regresiones.append(f"{ep} {m} {d:+.1f}%")
+            if m == "rps" and d < -threshold:
+                regresiones.append(f"{ep} rps {d:+.1f}%")
+
+    lines.append("")
+    lines.append(f"{'endpoint':<12}{'etapa (p95)':<16}{'base':>11}{'new':>11}{'Δ':>9}")
+    for ep in sorted(set(base.get("stages", {})) & set(new.get("stages", {}))):
+        sa, sb = base["stages"][ep], new["stages"][ep]
+        for etapa in sorted(set(sa) | set(sb)):
+            a = sa.get(etapa, {}).get("p95_ms", 0.0)
+            b = sb.get(etapa, {}).get("p95_ms", 0.0)
+            lines.append(f"{ep:<12}{etapa:<16}{a:>11.2f}{b:>11.2f}{_fmt(_delta(a, b)):>9}")
+    return lines, regresiones
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.compare", description="Compara dos resultados de run_bench.")
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, help="porcentaje de empeoramiento tolerado (p95/p99/rps)")
+    args = ap.parse_args(argv)
+
+    lines, regresiones = compare(_load(args.base), _load(args.new), args.threshold)
+    print("\n".join(lines))
+    if regresiones:
+        print("\nRegresiones por encima del umbral:\n  " + "\n  ".join(regresiones))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+# =====================================================
+# SEAC bench — Groq falso (API compatible con OpenAI)
+# =====================================================
+# Responde /openai/v1/chat/completions con latencia y tasa de error ajustables:
+#   - con response_format=json_object → lista JSON de laptops (api_internet)
+#   - sin response_format            → explicación breve (llm_groq)
+# Uso suelto:  python -m bench.fake_groq --port 8900 --latency 300 --jitter 100 --error-rate 0.05
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from typing import Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+MARCAS = ["ASUS", "Lenovo", "HP", "Dell", "Acer", "MSI", "Apple"]
+CPUS = ["Intel Core i5-1235U", "Intel Core i7-12700H", "AMD Ryzen 5 7535HS", "AMD Ryzen 7 7840HS", "Apple M2"]
+GPUS = ["Intel Iris Xe", "NVIDIA RTX 3050", "NVIDIA RTX 4060", "AMD Radeon 780M", "Apple M2 GPU"]
+
+
+class FakeGroqConfig:
+    def __init__(self, latency_ms: float = 200.0, jitter_ms: float = 50.0, error_rate: float = 0.0,
+                 items: int = 8, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.items = items
+        self.rnd = random.Random(seed)
+        self.calls = {"products": 0, "explain": 0, "errors": 0}
+
+    def delay(self) -> float:
+        return max(0.0, self.latency_ms + self.rnd.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+
+def _laptops(n: int, prompt: str) -> list:
+    # Mismo prompt → misma lista (como una respuesta cacheable de verdad)
+    r = random.Random(prompt)
+    out = []
+    for _ in range(n):
+        marca = r.choice(MARCAS)
+        out.append({
+            "marca": marca,
+            "modelo": f"{marca} Modelo {r.randint(1, 400)}",
+            "cpu": r.choice(CPUS),
+            "gpu": r.choice(GPUS),
+            "ram": r.choice(["8GB", "16GB", "32GB"]),
+            "almacenamiento": r.choice(["256GB SSD", "512GB SSD", "1TB SSD"]),
+            "sistema_operativo": "Windows 11",
+            "precio": r.choice([499, 699, 899, 1099, 1499]),
+            "link": "https://example.com/laptop",
+            "descripcion": "Equipo equilibrado para el uso indicado.",
+        })
+    return out
+
+
+def create_app(cfg: FakeGroqConfig) -> FastAPI:
+    app = FastAPI(title="Groq falso (bench)")
+
+    @app.post("/openai/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(cfg.delay())
+        if cfg.rnd.random() < cfg.error_rate:
+            cfg.calls["errors"] += 1
+            return JSONResponse({"error": {"message": "fake: rate limit", "type": "rate_limit"}}, status_code=429)
+
+        prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+        if body.get("response_format", {}).get("type") == "json_object":
+            cfg.calls["products"] += 1
+            content = json.dumps({"laptops": _laptops(cfg.items, prompt)}, ensure_ascii=False)
+        else:
+            cfg.calls["explain"] += 1
+            content = "Equipo recomendable por su rendimiento y buena relación calidad-precio para el uso indicado."
+        return {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+
+    @app.get("/stats")
+    async def stats():
+        return cfg.calls
+
+    return app
+
+
+class FakeGroqServer:
+    """Servidor uvicorn en un hilo propio; endpoint → URL para SEAC_GROQ_ENDPOINT."""
+
+    def __init__(self, cfg: FakeGroqConfig, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+        self.cfg = cfg
+        self._server = uvicorn.Server(uvicorn.Config(create_app(cfg), host=host, port=port,
+                                                     log_level="warning", access_log=False))
+        self._thread = threading.Thread(target=self._server.run, name="fake-groq", daemon=True)
+
+    def start(self, timeout: float = 10.0) -> "FakeGroqServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("El Groq falso no arrancó.")
+            time.sleep(0.02)
+        return self
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/openai/v1/chat/completions"
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(5)
+
+
+def main():
+    ap = argparse.ArgumentParser(prog="python -m bench.fake_groq", description="Groq falso para pruebas de carga.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency", type=float, default=200.0, help="latencia media (ms)")
+    ap.add_argument("--jitter", type=float, default=50.0, help="variación uniforme ± (ms)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fracción de respuestas 429 (0–1)")
+    ap.add_argument("--items", type=int, default=8, help="laptops por respuesta")
+    args = ap.parse_args()
+
+    import uvicorn
+    cfg = FakeGroqConfig(args.latency, args.jitter, args.error_rate, args.items)
+    print(f"Groq falso en http://{args.host}:{args.port}/openai/v1/chat/completions")
+    uvicorn.run(create_app(cfg), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+# =====================================================
+# SEAC bench — Carga y latencia de /infer y /feedback
+# =====================================================
+# Levanta un Groq falso local y una BD SQLite temporal, siembra un catálogo
+# sintético y lanza N clientes concurrentes contra la app:
+#   --mode inprocess  → httpx + ASGITransport (mismo proceso y event loop)
+#   --mode http       → uvicorn en un subproceso (o --url de un servidor ya levantado)
+# Mide throughput y p50/p95/p99 por endpoint y, con la cabecera Server-Timing
+# (SEAC_SERVER_TIMING=1), por etapa del pipeline. Resultado en JSON para bench.compare.
+#
+#   python -m bench.run_bench --mode inprocess --concurrency 16 --requests 400 --out base.json
+#   python -m bench.run_bench --mode http --duration 30 --groq-latency 400 --groq-error-rate 0.05
+#   python -m bench.compare base.json nuevo.json
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .fake_groq import FakeGroqConfig, FakeGroqServer
+
+USOS = ["gaming", "oficina", "programación", "edicion", "estudio"]
+MARCAS = ["ASUS", "Lenovo", "HP", "Dell", "Acer", "MSI", "Apple", "Samsung"]
+CPUS = ["Intel Core i3-1215U", "Intel Core i5-1235U", "Intel Core i7-12700H", "Intel Core i9-13900H",
+        "AMD Ryzen 5 5500U", "AMD Ryzen 7 7840HS", "Apple M2"]
+GPUS = ["Intel UHD", "Intel Iris Xe", "NVIDIA RTX 3050", "NVIDIA RTX 4060", "NVIDIA RTX 4080", "AMD Radeon 780M"]
+
+
+# ------------------------------------------------------
+# Estadísticas
+# ------------------------------------------------------
+def percentile(ordenados: List[float], q: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return 0.0
+    k = max(0, min(len(ordenados) - 1, int(round(q / 100.0 * len(ordenados) + 0.5)) - 1))
+    return ordenados[k]
+
+
+def summarize(muestras: List[float]) -> Dict[str, float]:
+    s = sorted(muestras)
+    n = len(s)
+    return {
+        "count": n,
+        "mean_ms": round(sum(s) / n, 3) if n else 0.0,
+        "p50_ms": round(percentile(s, 50), 3),
+        "p95_ms": round(percentile(s, 95), 3),
+        "p99_ms": round(percentile(s, 99), 3),
+        "max_ms": round(s[-1], 3) if n else 0.0,
+    }
+
+
+def _parse_server_timing(header: str) -> Dict[str, float]:
+    from app.timing import parse_server_timing
+    return parse_server_timing(header)
+
+
+class Recorder:
+    def __init__(self):
+        self.lat: Dict[str, List[float]] = {}
+        self.stages: Dict[str, Dict[str, List[float]]] = {}
+        self.status: Dict[str, Dict[str, int]] = {}
+        self.sources: Dict[str, int] = {}
+
+    def add(self, endpoint: str, ms: float, status: int, server_timing: str = ""):
+        self.lat.setdefault(endpoint, []).append(ms)
+        codes = self.status.setdefault(endpoint, {})
+        codes[str(status)] = codes.get(str(status), 0) + 1
+        for etapa, dur in _parse_server_timing(server_timing).items():
+            self.stages.setdefault(endpoint, {}).setdefault(etapa, []).append(dur)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        endpoints = {}
+        for ep, muestras in self.lat.items():
+            codes = self.status.get(ep, {})
+            errores = sum(n for c, n in codes.items() if not c.startswith("2"))
+            endpoints[ep] = {**summarize(muestras), "rps": round(len(muestras) / elapsed, 2) if elapsed else 0.0,
+                             "errors": errores, "status": codes}
+        stages = {ep: {etapa: summarize(v) for etapa, v in sorted(por_etapa.items())}
+                  for ep, por_etapa in self.stages.items()}
+        total = sum(len(v) for v in self.lat.values())
+        return {"elapsed_s": round(elapsed, 3), "requests": total,
+                "rps": round(total / elapsed, 2) if elapsed else 0.0,
+                "endpoints": endpoints, "stages": stages, "sources": self.sources}
+
+
+# ------------------------------------------------------
+# Datos sintéticos
+# ------------------------------------------------------
+def catalogo_sintetico(n: int, seed: int) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        marca = rnd.choice(MARCAS)
+        out.append({
+            "id": f"bench-{i}", "name": f"{marca} Serie {i}", "brand": marca, "category": "Laptop",
+            "cpu": rnd.choice(CPUS), "gpu": rnd.choice(GPUS),
+            "ram": rnd.choice(["8GB", "16GB", "32GB"]), "storage": rnd.choice(["256GB SSD", "512GB SSD", "1TB SSD"]),
+            "os": "Windows 11", "price": float(rnd.randrange(300, 3000, 25)), "url": "",
+        })
+    return out
+
+
+def consultas(n: int, seed: int) -> List[Dict[str, Any]]:
+    """n consultas distintas (controla la tasa de aciertos de la caché de Groq)."""
+    rnd = random.Random(seed)
+    return [{"uso": rnd.choice(USOS), "presupuesto": float(rnd.randrange(400, 2500, 100)),
+             "gama": rnd.choice(["", "baja", "media", "alta"]), "top_k": 3} for _ in range(max(1, n))]
+
+
+def sembrar(n: int, seed: int):
+    """Carga el catálogo sintético en la BD configurada por el entorno."""
+    from app.migrations import migrate
+    from app.persistence_sql import upsert_products
+    migrate()
+    upsert_products(catalogo_sintetico(n, seed))
+
+
+# ------------------------------------------------------
+# Carga
+# ------------------------------------------------------
+async def _infer(client: httpx.AsyncClient, rec: Recorder, q: Dict[str, Any], vistos: deque):
+    t0 = time.perf_counter()
+    r = await client.post("/infer", json=q)
+    ms = (time.perf_counter() - t0) * 1000
+    rec.add("infer", ms, r.status_code, r.headers.get("server-timing", ""))
+    source = r.headers.get("x-seac-source") or "?"
+    rec.sources[source] = rec.sources.get(source, 0) + 1
+    if r.status_code == 200:
+        for item in r.json():
+            p = item["product"]
+            if p["id"] != "ajuste-info":
+                vistos.append((item["session_id"], q["uso"], p))
+
+
+async def _feedback(client: httpx.AsyncClient, rec: Recorder, vistos: deque, rnd: random.Random):
+    session_id, uso, p = rnd.choice(vistos)
+    fb = {"session_id": session_id, "rating": rnd.choice([0.2, 0.5, 0.9, 1.0]), "notes": uso,
+          "product_id": p["id"], "product_name": p["name"], "brand": p["brand"],
+          "cpu": p.get("cpu"), "gpu": p.get("gpu"), "price": p.get("price")}
+    t0 = time.perf_counter()
+    r = await client.post("/feedback", json=fb)
+    rec.add("feedback", (time.perf_counter() - t0) * 1000, r.status_code, r.headers.get("server-timing", ""))
+
+
+async def run_load(client: httpx.AsyncClient, args, rec: Recorder, medir: bool = True) -> float:
+    qs = consultas(args.distinct, args.seed)
+    rnd = random.Random(args.seed + 1)
+    vistos: deque = deque(maxlen=500)
+    total = args.warmup if not medir else args.requests
+    fin = (time.monotonic() + args.duration) if (medir and args.duration) else None
+    emitidas = 0
+    sink = Recorder() if not medir else rec
+
+    async def worker():
+        nonlocal emitidas
+        while True:
+            if fin is not None:
+                if time.monotonic() >= fin:
+                    return
+            elif emitidas >= total:
+                return
+            emitidas += 1
+            try:
+                if vistos and rnd.random() < args.feedback_ratio:
+                    await _feedback(client, sink, vistos, rnd)
+                else:
+                    await _infer(client, sink, rnd.choice(qs), vistos)
+            except httpx.HTTPError as e:
+                sink.add("transport_error", 0.0, 599)
+                if args.verbose:
+                    print(f"[bench] ⚠️ {type(e).__name__}: {e}", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return time.perf_counter() - t0
+
+
+# ------------------------------------------------------
+# Modos
+# ------------------------------------------------------
+def _entorno(args, db_path: str, groq_endpoint: str) -> Dict[str, str]:
+    env = {
+        "SEAC_DB_BACKEND": "sqlite",
+        "SEAC_SQLITE_PATH": db_path,
+        "SEAC_GROQ_ENDPOINT": groq_endpoint,
+        "GROQ_API_KEY": "bench",
+        "SEAC_SERVER_TIMING": "1",
+        "SEAC_INFER_MODE": args.infer_mode,
+        "SEAC_LOG_LEVEL": "INFO" if args.verbose else "WARNING",
+    }
+    if args.groq_off:
+        env["GROQ_API_KEY"] = ""
+    return env
+
+
+async def _modo_inprocess(args, rec: Recorder) -> Dict[str, Any]:
+    from app.main import app
+    from app import feedback_queue
+    from app.learning import flush_weights
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+        if args.warmup:
+            await run_load(client, args, rec, medir=False)
+        elapsed = await run_load(client, args, rec)
+        # El feedback se escribe en segundo plano: incluir el vaciado de la cola en el informe
+        t0 = time.perf_counter()
+        await asyncio.get_running_loop().run_in_executor(None, feedback_queue.flush, 60.0)
+        drain = (time.perf_counter() - t0) * 1000
+        await asyncio.get_running_loop().run_in_executor(None, flush_weights)
+        health = (await client.get("/health")).json()
+    return {"elapsed": elapsed, "queue_drain_ms": round(drain, 3), "health": health}
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _esperar_servidor(url: str, proc: Optional[subprocess.Popen], timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=url, timeout=2.0) as c:
+        while time.monotonic() < deadline:
+            if proc is not None and proc.poll() is not None:
+                raise RuntimeError(f"El servidor terminó al arrancar (código {proc.returncode}).")
+            with contextlib.suppress(httpx.HTTPError):
+                if (await c.get("/health")).status_code == 200:
+                    return
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en {timeout:.0f}s: {url}")
+
+
+async def _modo_http(args, rec: Recorder, env: Dict[str, str]) -> Dict[str, Any]:
+    proc = None
+    url = args.url
+    if not url:
+        port = _puerto_libre()
+        url = f"http://127.0.0.1:{port}"
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(args.workers), "--no-access-log", "--log-level", "warning"]
+        proc = subprocess.Popen(cmd, env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+                                stderr=None if args.verbose else subprocess.DEVNULL)
+    try:
+        await _esperar_servidor(url, proc)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+            if args.warmup:
+                await run_load(client, args, rec, medir=False)
+            elapsed = await run_load(client, args, rec)
+            health = (await client.get("/health")).json()
+    finally:
+        if proc is not None:
+            proc.terminate()  # SIGTERM → uvicorn ejecuta el shutdown (vacía la cola de feedback)
+            try:
+                proc.wait(30)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+    return {"elapsed": elapsed, "health": health}
+
+
+def _git_rev() -> str:
+    with contextlib.suppress(Exception):
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip()
+    return ""
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m bench.run_bench",
+                                 description="Benchmark de carga y latencia de SEAC (/infer y /feedback).")
+    ap.add_argument("--mode", choices=["inprocess", "http"], default="inprocess")
+    ap.add_argument("--url", help="modo http: servidor ya levantado (no se siembra ni se levanta nada)")
+    ap.add_argument("--workers", type=int, default=1, help="modo http: procesos de uvicorn")
+    ap.add_argument("--concurrency", type=int, default=16, help="clientes simultáneos")
+    ap.add_argument("--requests", type=int, default=400, help="peticiones medidas (si no hay --duration)")
+    ap.add_argument("--duration", type=float, default=0.0, help="segundos de carga (tiene prioridad)")
+    ap.add_argument("--warmup", type=int, default=20, help="peticiones previas sin medir")
+    ap.add_argument("--feedback-ratio", type=float, default=0.5, help="fracción de peticiones /feedback")
+    ap.add_argument("--distinct", type=int, default=40, help="consultas distintas (aciertos de caché de Groq)")
+    ap.add_argument("--products", type=int, default=2000, help="productos del catálogo sintético")
+    ap.add_argument("--groq-latency", type=float, default=200.0, help="latencia media del Groq falso (ms)")
+    ap.add_argument("--groq-jitter", type=float, default=50.0, help="variación de la latencia (± ms)")
+    ap.add_argument("--groq-error-rate", type=float, default=0.0, help="fracción de errores 429 del Groq falso")
+    ap.add_argument("--groq-off", action="store_true", help="sin GROQ_API_KEY: solo catálogo local y stub")
+    ap.add_argument("--infer-mode", choices=["groq", "hedged"], default="groq", help="SEAC_INFER_MODE")
+    ap.add_argument("--timeout", type=float, default=60.0, help="timeout por petición (s)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--db", help="archivo SQLite (por defecto uno temporal que se borra al terminar)")
+    ap.add_argument("--label", default="", help="etiqueta libre guardada en el resultado")
+    ap.add_argument("--out", help="archivo JSON de salida")
+    ap.add_argument("--verbose", action="store_true")
+    args = ap.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="seac-bench-")
+    db_path = args.db or os.path.join(tmpdir, "bench.db")
+    fake = FakeGroqServer(FakeGroqConfig(args.groq_latency, args.groq_jitter, args.groq_error_rate,
+                                         seed=args.seed)).start()
+    env = _entorno(args, db_path, fake.endpoint)
+    rec = Recorder()
+    try:
+        if not args.url:
+            os.environ.update(env)  # antes de importar app (la configuración se lee al importar)
+            sembrar(args.products, args.seed)
+        if args.mode == "inprocess":
+            extra = asyncio.run(_modo_inprocess(args, rec))
+        else:
+            extra = asyncio.run(_modo_http(args, rec, env))
+    finally:
+        fake.stop()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    result = {
+        "meta": {
+            "label": args.label,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "verbose")},
+        },
+        **rec.report(extra.pop("elapsed")),
+        "groq_fake": dict(fake.cfg.calls),
+        **extra,
+    }
+    _imprimir(result)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Resultado guardado en {args.out}")
+    return 0
+
+
+def _imprimir(r: Dict[str, Any]):
+    print(f"\n{r['requests']} peticiones en {r['elapsed_s']}s → {r['rps']} req/s "
+          f"(modo {r['meta']['config']['mode']}, concurrencia {r['meta']['config']['concurrency']})")
+    print(f"{'endpoint':<18}{'n':>7}{'rps':>9}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'err':>6}")
+    for ep, s in r["endpoints"].items():
+        print(f"{ep:<18}{s['count']:>7}{s['rps']:>9}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}"
+              f"{s['p99_ms']:>10.1f}{s['max_ms']:>10.1f}{s['errors']:>6}")
+    for ep, etapas in r["stages"].items():
+        print(f"\n  etapas de {ep} (ms)")
+        for etapa, s in etapas.items():
+            print(f"  {etapa:<16}{s['count']:>7}{'':>9}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+                  f"{s['max_ms']:>10.2f}")
+    if "queue_drain_ms" in r:
+        print(f"\nVaciado final de la cola de feedback: {r['queue_drain_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
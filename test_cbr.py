@@ -0,0 +1,86 @@
+# Índice CBR: la similitud por sumas prefijas coincide con el recorrido del historial
+# que hacía antes calcular_similitud (incluidos bucket vacío y presupuesto 0).
+# Ejecutar con: python -m pytest -q test_cbr.py
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("SEAC_DB_BACKEND", "sqlite")
+os.environ.setdefault("SEAC_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="seac-test-"), "seac.db"))
+
+import pytest  # noqa: E402
+
+from app.cbr import CBRIndex, _Bucket  # noqa: E402
+
+
+def similitud_lineal(hist, query):
+    """calcular_similitud anterior al índice: recorre todo el historial (sin el round final,
+    que calcular_similitud sigue aplicando igual a ambos)."""
+    uso_actual = query.get("uso", "default")
+    presupuesto_nuevo = float(query.get("presupuesto", 0) or 0.0)
+    similares = []
+    for h in hist:
+        if h.get("uso") == uso_actual and float(h.get("rating", 0)) >= 0.8:
+            pres_ant = float(h.get("presupuesto") or 0.0)
+            if pres_ant > 0 and presupuesto_nuevo > 0:
+                similares.append(max(0.0, min(1.0, 1 - abs(presupuesto_nuevo - pres_ant) / pres_ant)))
+    if not similares:
+        return 0.0
+    return sum(similares) / len(similares)
+
+
+class _IndiceEnMemoria(CBRIndex):
+    """CBRIndex que lee los casos de una lista en vez de la BD."""
+
+    def __init__(self, hist):
+        super().__init__()
+        self._hist = hist
+
+    def _reload_locked(self):
+        self._buckets = {}
+        self._loaded_at = time.monotonic()
+        for h in self._hist:
+            if float(h["rating"]) >= 0.8 and h["presupuesto"] > 0:
+                self._buckets.setdefault(h["uso"], _Bucket()).add(float(h["presupuesto"]))
+
+
+def _similitud(indice, query):
+    return pytest.approx(indice.similarity(query["uso"], float(query["presupuesto"])), abs=1e-9)
+
+
+def _historial(n, semilla=7):
+    rnd = random.Random(semilla)
+    return [{"uso": rnd.choice(["gaming", "oficina", "edicion"]),
+             "rating": rnd.choice([0.0, 0.5, 0.8, 1.0]),
+             "presupuesto": rnd.choice([0, 250, 400, 500, 800, 1000, 1600, rnd.uniform(100, 3000)])}
+            for _ in range(n)]
+
+
+@pytest.mark.parametrize("presupuesto", [0, 1, 199.5, 250, 400, 500, 800, 999.9, 1000, 1600, 3200, 10000])
+@pytest.mark.parametrize("uso", ["gaming", "oficina", "edicion", "sin-casos"])
+def test_igual_que_el_recorrido_lineal(uso, presupuesto):
+    hist = _historial(300)
+    query = {"uso": uso, "presupuesto": presupuesto}
+    assert _similitud(_IndiceEnMemoria(hist), query) == similitud_lineal(hist, query)
+
+
+def test_casos_borde():
+    vacio = _IndiceEnMemoria([])
+    assert _similitud(vacio, {"uso": "gaming", "presupuesto": 800}) == similitud_lineal([], {"uso": "gaming"}) == 0.0
+
+    hist = [{"uso": "gaming", "rating": 1.0, "presupuesto": 500}]
+    indice = _IndiceEnMemoria(hist)
+    assert _similitud(indice, {"uso": "gaming", "presupuesto": 0}) == 0.0
+    # límites del tramo: ant = nuevo/2 → 0; ant = nuevo → 1
+    assert _similitud(indice, {"uso": "gaming", "presupuesto": 1000}) == similitud_lineal(
+        hist, {"uso": "gaming", "presupuesto": 1000}) == 0.0
+    assert _similitud(indice, {"uso": "gaming", "presupuesto": 500}) == 1.0
+
+    # casos agregados después de cargar (add_case) cuentan igual que los del historial
+    indice.add_case("gaming", 400, 0.9)
+    indice.add_case("gaming", 900, 0.5)  # rating bajo: se ignora
+    hist.append({"uso": "gaming", "rating": 0.9, "presupuesto": 400})
+    for p in (300, 450, 700):
+        q = {"uso": "gaming", "presupuesto": p}
+        assert _similitud(indice, q) == similitud_lineal(hist, q)
@@ -0,0 +1,53 @@
+# Coincidencia difusa contra el catálogo: variantes de escritura del mismo modelo
+# coinciden; modelos vecinos (otro número, otro cpu/gpu) nunca.
+# Ejecutar con: python -m pytest -q test_fuzzy.py
+import os
+import tempfile
+
+os.environ.setdefault("SEAC_DB_BACKEND", "sqlite")
+os.environ.setdefault("SEAC_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="seac-test-"), "seac.db"))
+
+import pytest  # noqa: E402
+
+from app.fuzzy import FUZZY_THRESHOLD, TrigramIndex  # noqa: E402
+from app.kb import CatalogSnapshot  # noqa: E402
+
+CATALOGO = [
+    ("c1", "Lenovo", "Legion 5", "AMD Ryzen 7 5800H", "NVIDIA RTX 3060"),
+    ("c2", "Dell", "XPS 13", "Intel Core i7-1260P", "Intel Iris Xe"),
+    ("c3", "Apple", "MacBook Air M2", "Apple M2", "Apple M2 GPU"),
+    ("c4", "ASUS", "TUF F15", "Intel Core i5-11400H", "NVIDIA RTX 3050"),
+    ("c5", "Acer", "Nitro 5 AN515-57", "Intel Core i5-11400H", "NVIDIA RTX 3050"),
+]
+
+
+@pytest.fixture(scope="module")
+def indice():
+    snap = CatalogSnapshot(1)
+    for pid, brand, name, cpu, gpu in CATALOGO:
+        snap.put({"id": pid, "brand": brand, "name": name, "cpu": cpu, "gpu": gpu})
+    return TrigramIndex(snap)
+
+
+def _id(indice, brand, name, cpu="", gpu=""):
+    m = indice.match(brand, name, cpu, gpu)
+    return m.product["id"] if m is not None and m.score >= FUZZY_THRESHOLD else None
+
+
+@pytest.mark.parametrize("brand,name", [
+    ("Lenovo", "Legion 7"), ("Dell", "XPS 15"), ("Apple", "MacBook Air M3"),
+    ("ASUS", "TUF F17"), ("Acer", "Nitro 5 AN515-58"), ("Lenovo", "Legion"),
+])
+def test_modelos_vecinos_no_coinciden(indice, brand, name):
+    assert _id(indice, brand, name) is None
+
+
+def test_cpu_o_gpu_distintos_no_coinciden(indice):
+    assert _id(indice, "Lenovo", "Legion 5", "Ryzen 9 5900HX", "RTX 3080") is None
+    assert _id(indice, "Lenovo", "Legion 5", "AMD Ryzen 7 5800H", "RTX 3080") is None
+
+
+def test_variantes_del_mismo_modelo(indice):
+    assert _id(indice, "lenovo", "LEGION 5", "Ryzen 7 5800H", "GeForce RTX 3060 6GB") == "c1"
+    assert _id(indice, "DELL", "xps-13") == "c2"
+    assert _id(indice, "Acer", "Nitro 5 AN515 57") == "c5"
@@ -0,0 +1,85 @@
+# Importación masiva del catálogo: CSV/JSONL a la BD temporal, reanudación tras
+# una interrupción, ids cat- estables y punto de control invalidado si cambia el archivo.
+# Ejecutar con: python -m pytest -q test_ingest.py
+import json
+import os
+import tempfile
+
+os.environ.setdefault("SEAC_DB_BACKEND", "sqlite")
+os.environ.setdefault("SEAC_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="seac-test-"), "seac.db"))
+
+import pytest  # noqa: E402
+
+from app import ingest, kb, persistence_sql  # noqa: E402
+from app.db import get_conn  # noqa: E402
+
+
+def _filas(marca, n):
+    filas = [{"marca": marca, "modelo": f"Modelo {i}", "precio": f"${500 + i}", "procesador": "Intel Core i5",
+              "memoria_ram": "8GB", "almacenamiento": "256GB SSD"} for i in range(n)]
+    filas.insert(1, dict(filas[0]))              # duplicado por marca+modelo
+    filas.append({"marca": marca, "precio": 1})  # sin modelo: inválida
+    return filas
+
+
+def _escribir(path, filas):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in filas)
+        else:
+            cols = ["marca", "modelo", "precio", "procesador", "memoria_ram", "almacenamiento"]
+            f.write(",".join(cols) + "\n")
+            f.writelines(",".join(str(r.get(c, "")) for c in cols) + "\n" for r in filas)
+
+
+def _ids(marca):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM products WHERE brand = ?;", (marca,))
+        return [r[0] for r in cur.fetchall()]
+
+
+@pytest.mark.parametrize("ext", ["csv", "jsonl"])
+def test_interrumpir_y_reanudar(tmp_path, monkeypatch, ext):
+    marca = f"Ingestia{ext.upper()}"
+    path = str(tmp_path / f"catalogo.{ext}")
+    _escribir(path, _filas(marca, 7))
+
+    original, lotes = persistence_sql.upsert_products, []
+
+    def corta_en_el_tercero(chunk):
+        if len(lotes) == 2:
+            raise KeyboardInterrupt
+        lotes.append(len(chunk))
+        return original(chunk)
+
+    monkeypatch.setattr(persistence_sql, "upsert_products", corta_en_el_tercero)
+    with pytest.raises(KeyboardInterrupt):
+        ingest.ingest(path, chunk_size=2)
+    assert os.path.exists(path + ".ingest.json")
+    assert len(_ids(marca)) == 4
+
+    monkeypatch.setattr(persistence_sql, "upsert_products", original)
+    kb.load_products()  # instantánea previa: el final de la importación debe invalidarla
+    stats = ingest.ingest(path, chunk_size=2)
+    assert not os.path.exists(path + ".ingest.json")
+    assert stats["loaded"] == 7 and stats["duplicates"] == 1 and stats["invalid"] == 1
+
+    ids = _ids(marca)
+    assert len(ids) == len(set(ids)) == 7
+    assert all(i.startswith("cat-") for i in ids)
+    assert {p["id"] for p in kb.load_products() if p["brand"] == marca} == set(ids)
+
+    # Reimportar el mismo archivo no crea filas: los ids cat- son estables
+    ingest.ingest(path, chunk_size=2, resume=False)
+    assert sorted(_ids(marca)) == sorted(ids)
+
+
+def test_punto_de_control_se_invalida_si_cambia_el_archivo(tmp_path):
+    path = str(tmp_path / "catalogo.jsonl")
+    _escribir(path, _filas("Huella", 3))
+    cp_path = path + ".ingest.json"
+    ingest.save_checkpoint(cp_path, {"source": ingest._fingerprint(path), "offset": 10, "stats": {}})
+    assert ingest.load_checkpoint(cp_path, path)["offset"] == 10
+    _escribir(path, _filas("Huella", 4))
+    assert ingest.load_checkpoint(cp_path, path) is None
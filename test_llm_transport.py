@@ -0,0 +1,116 @@
+# Transporte grabar/reproducir de las llamadas a Groq: se graba contra el Groq
+# falso de bench/ y se reproduce sin red, con latencia y fallos sintéticos.
+# Ejecutar con: python -m pytest -q test_llm_transport.py
+import time
+
+import pytest
+
+from app import api_internet
+from app.connectors import llm_groq, transport
+from app.connectors.breaker import AdaptiveTimeout, CircuitBreaker
+from bench.fake_groq import FakeGroqConfig, FakeGroqServer
+
+
+@pytest.fixture(scope="module")
+def fake_groq():
+    server = FakeGroqServer(FakeGroqConfig(latency_ms=20, jitter_ms=0, seed=1)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture()
+def groq(fake_groq, tmp_path, monkeypatch):
+    monkeypatch.setattr(api_internet, "GROQ_ENDPOINT", fake_groq.endpoint)
+    monkeypatch.setattr(api_internet, "GROQ_API_KEY", "")
+    monkeypatch.setattr(llm_groq, "GROQ_ENDPOINT", fake_groq.endpoint)
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    anterior = transport.get_transport()
+    yield fake_groq, str(tmp_path / "cassettes")
+    monkeypatch.setattr(transport, "_transport", anterior)
+
+
+def _grabar(server, cassettes, monkeypatch):
+    monkeypatch.setattr(api_internet, "GROQ_API_KEY", "test")
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    transport.configure(mode="record", cassette_dir=cassettes)
+    items = api_internet._call_groq_json("transporte-gaming", 1200)
+    texto = llm_groq.summarize_reasons_groq("Equipo de prueba", ["RAM 16GB"], "transporte-gaming")
+    monkeypatch.setattr(api_internet, "GROQ_API_KEY", "")
+    monkeypatch.delenv("GROQ_API_KEY")
+    llm_groq._explain_cache.clear()
+    return items, texto
+
+
+def test_record_then_replay_offline(groq, monkeypatch):
+    server, cassettes = groq
+    items, texto = _grabar(server, cassettes, monkeypatch)
+    assert items and texto
+    llamadas = dict(server.cfg.calls)
+
+    t = transport.configure(mode="replay", cassette_dir=cassettes, latency_ms=40)
+    t0 = time.perf_counter()
+    assert api_internet._call_groq_json("transporte-gaming", 1200) == items
+    assert time.perf_counter() - t0 >= 0.04
+    assert llm_groq.summarize_reasons_groq("Equipo de prueba", ["RAM 16GB"], "transporte-gaming") == texto
+    assert server.cfg.calls == llamadas  # sin red y sin API key
+    assert t.describe()["replayed"] == 2
+
+
+def test_replay_miss_and_injected_failures(groq, monkeypatch):
+    server, cassettes = groq
+    _grabar(server, cassettes, monkeypatch)
+    body = api_internet._build_request("transporte-gaming", 1200)[1]
+
+    t = transport.configure(mode="replay", cassette_dir=cassettes)
+    with pytest.raises(transport.CassetteMiss):
+        t.post(server.endpoint, {}, {**body, "temperature": 0.1}, timeout=5)
+    assert api_internet._call_groq_json("otro uso sin cassette", 1200) == []
+
+    # Misma semilla → misma secuencia de fallos
+    def secuencia(seed):
+        # Sin breaker: con la mitad de fallos se abriría a mitad de la secuencia
+        t = transport.configure(mode="replay", cassette_dir=cassettes, failure_rate=0.5, failure_kind="429", seed=seed,
+                                breaker=CircuitBreaker(enabled=False))
+        return [t.post(server.endpoint, {}, body, timeout=5).status_code for _ in range(20)]
+    a = secuencia(7)
+    assert a == secuencia(7)
+    assert set(a) == {200, 429}
+
+    t = transport.configure(mode="replay", cassette_dir=cassettes, latency_ms=200)
+    with pytest.raises(transport.TransportTimeout):
+        t.post(server.endpoint, {}, body, timeout=0.05)
+
+
+def test_breaker_abre_cortocircuita_y_prueba(groq, monkeypatch):
+    server, cassettes = groq
+    _grabar(server, cassettes, monkeypatch)
+    reloj = [0.0]
+    t = transport.configure(mode="replay", cassette_dir=cassettes, failure_rate=1.0, failure_kind="500",
+                            breaker=CircuitBreaker(min_calls=3, cooldown=10, clock=lambda: reloj[0]))
+    for _ in range(3):
+        assert api_internet._call_groq_json("transporte-gaming", 1200) == []
+    assert t.breaker.state == "open"
+
+    # Abierto: ni siquiera se consulta el transporte; la explicación sale de llm_stub
+    fallos = t.stats["injected_failures"]
+    assert llm_groq.summarize_reasons_groq("Equipo de prueba", ["RAM 16GB"], "transporte-gaming") == \
+        "Equipo de prueba: RAM 16GB."
+    assert t.stats["injected_failures"] == fallos
+    assert t.breaker.describe()["short_circuited"] == 1
+
+    # Tras el enfriamiento, una llamada de prueba; si responde, se cierra
+    reloj[0] = 11
+    t.failure_rate = 0.0
+    assert api_internet._call_groq_json("transporte-gaming", 1200)
+    assert t.breaker.state == "closed"
+
+
+def test_timeout_adaptativo():
+    t = AdaptiveTimeout(quantile=0.99, factor=2, floor=0.1, min_samples=5)
+    assert t.current(25) == 25  # sin muestras suficientes: el techo
+    for _ in range(10):
+        t.observe(0.2)
+    assert t.current(25) == pytest.approx(0.4)
+    assert t.current(0.3) == 0.3
+    t.observe(0.0)
+    assert t.current(25) >= 0.1
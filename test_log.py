@@ -0,0 +1,65 @@
+# Logging estructurado: JSON por línea, límite de frecuencia y muestreo por tipo
+# de mensaje, y una cola que nunca bloquea a quien escribe.
+# Ejecutar con: python -m pytest -q test_log.py
+import io
+import json
+import logging
+
+from app import log as seac_log
+
+
+def _registro(event: str, level: int = logging.INFO) -> logging.LogRecord:
+    r = logging.LogRecord("seac.prueba", level, __file__, 1, "mensaje %s", ("x",), None)
+    r.event = event
+    return r
+
+
+def test_json_con_campos():
+    salida = io.StringIO()
+    seac_log.setup(fmt="json", level="INFO", stream=salida)
+    try:
+        seac_log.get_logger("prueba").info("cache.hit", "Productos servidos desde caché", count=3)
+        seac_log.get_logger("prueba").debug("cache.hit", "no se escribe (nivel)")
+    finally:
+        seac_log.shutdown()
+    lineas = [json.loads(x) for x in salida.getvalue().splitlines()]
+    assert len(lineas) == 1
+    assert lineas[0]["logger"] == "prueba"
+    assert lineas[0]["event"] == "cache.hit"
+    assert lineas[0]["count"] == 3
+    assert lineas[0]["level"] == "info"
+
+
+def test_limite_y_muestreo_por_tipo():
+    f = seac_log.RateLimitFilter(rate=0.001, burst=2, sample={})
+    assert [f.filter(_registro("a")) for _ in range(4)] == [True, True, False, False]
+    assert f.filter(_registro("b"))  # otro tipo tiene su propio cupo
+
+    f = seac_log.RateLimitFilter(rate=0, sample={"session.*": 0.0})
+    assert not f.filter(_registro("session.cached"))
+    assert f.filter(_registro("session.cached", logging.WARNING))  # los avisos no se muestrean
+    assert f.filter(_registro("product.upserted"))
+
+
+def test_cola_llena_descarta_sin_bloquear():
+    import queue
+    h = seac_log._DroppingQueueHandler(queue.Queue(maxsize=1))
+    antes = seac_log.stats()["dropped"]
+    h.handle(_registro("a"))
+    h.handle(_registro("a"))
+    assert seac_log.stats()["dropped"] == antes + 1
+    assert h.queue.get_nowait().getMessage() == "mensaje x"
+
+
+def test_registro_apunta_al_llamador():
+    registros = []
+    captura = logging.Handler()
+    captura.emit = registros.append
+    base = logging.getLogger(f"{seac_log._ROOT}.prueba")
+    base.addHandler(captura)
+    try:
+        seac_log.get_logger("prueba").warning("prueba.origen", "desde el test")
+    finally:
+        base.removeHandler(captura)
+    assert registros[0].funcName == "test_registro_apunta_al_llamador"
+    assert registros[0].pathname == __file__
@@ -0,0 +1,70 @@
+# /metrics: registro propio en formato Prometheus, histogramas por etapa,
+# consultas de BD por función y gauges de cachés/pool.
+# Ejecutar con: python -m pytest -q test_metrics.py
+import os
+import tempfile
+
+os.environ.setdefault("SEAC_DB_BACKEND", "sqlite")
+os.environ.setdefault("SEAC_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="seac-test-"), "seac.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import metrics  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.persistence_sql import load_history  # noqa: E402
+from app.timing import stage  # noqa: E402
+
+migrate()
+
+
+def test_histogram_and_gauges_render():
+    h = metrics.histogram("seac_test_seconds", "prueba", ("op",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v, "a")
+    metrics.register_gauge("seac_test_cache", lambda: {"size": 3, "enabled": True, "nombre": "x"},
+                           labels={"cache": "t"})
+    texto = metrics.render()
+    assert "# TYPE seac_test_seconds histogram" in texto
+    assert 'seac_test_seconds_bucket{op="a",le="0.1"} 1' in texto
+    assert 'seac_test_seconds_bucket{op="a",le="1"} 2' in texto
+    assert 'seac_test_seconds_bucket{op="a",le="+Inf"} 3' in texto
+    assert 'seac_test_seconds_count{op="a"} 3' in texto
+    assert 'seac_test_cache_size{cache="t"} 3' in texto
+    assert 'seac_test_cache_enabled{cache="t"} 1' in texto
+    assert "seac_test_cache_nombre" not in texto
+
+
+def test_metrics_endpoint():
+    antes = metrics.DB_QUERIES.value("load_history", "ok")
+    load_history()
+    with stage("scoring"):
+        pass
+    assert metrics.DB_QUERIES.value("load_history", "ok") == antes + 1
+
+    client = TestClient(app)
+    assert client.get("/health").status_code == 200
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain")
+    assert 'seac_http_requests_total{method="GET",route="/health",status="200"}' in r.text
+    assert 'seac_stage_duration_seconds_count{stage="scoring"}' in r.text
+    assert 'seac_db_query_duration_seconds_count{function="load_history"}' in r.text
+    assert "seac_db_pool_in_use" in r.text
+    assert 'seac_cache_hits{cache="explain"}' in r.text
+
+
+def test_feedback_contrato_y_503(monkeypatch):
+    from app import main
+    client = TestClient(app)
+    fb = {"session_id": "s-metrics", "rating": 0.5, "notes": "oficina", "product_name": "IdeaPad 3", "brand": "Lenovo"}
+    r = client.post("/feedback", json=fb)
+    assert r.status_code == 202
+    assert {"ok", "uso", "rating", "producto_guardado", "weights", "encolado", "product_id"} <= set(r.json())
+
+    def roto(_fb):
+        raise RuntimeError("catálogo no disponible")
+    monkeypatch.setattr(main, "_resolver_producto", roto)
+    r = client.post("/feedback", json=fb)
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
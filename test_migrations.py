@@ -0,0 +1,93 @@
+# Migraciones versionadas: importar la app no toca la BD, migrate() es idempotente
+# y /ready refleja el estado del esquema.
+# Ejecutar con: python -m pytest -q test_migrations.py
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+os.environ.setdefault("SEAC_DB_BACKEND", "sqlite")
+os.environ.setdefault("SEAC_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="seac-test-"), "seac.db"))
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import migrations  # noqa: E402
+from app.main import app  # noqa: E402
+
+_PROCESO_NUEVO = """
+import json, os
+import app.main
+from app import migrations
+creada = os.path.exists(os.environ["SEAC_SQLITE_PATH"])
+antes = migrations.status()
+print(json.dumps({"creada_al_importar": creada, "antes": antes,
+                  "primera": migrations.migrate(), "segunda": migrations.migrate()}))
+"""
+
+
+def test_importar_no_toca_la_bd_y_migrar_es_idempotente(tmp_path):
+    env = dict(os.environ, SEAC_DB_BACKEND="sqlite", SEAC_SQLITE_PATH=str(tmp_path / "nueva.db"),
+               SEAC_LOG_LEVEL="WARNING")
+    r = subprocess.run([sys.executable, "-c", _PROCESO_NUEVO], env=env, capture_output=True, text=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)), timeout=60)
+    assert r.returncode == 0, r.stderr
+    out = json.loads(r.stdout.strip().splitlines()[-1])
+    assert out["creada_al_importar"] is False
+    assert out["antes"]["pending"] == [v for v, _, _ in migrations.MIGRATIONS]
+    assert out["primera"] == [v for v, _, _ in migrations.MIGRATIONS]
+    assert out["segunda"] == []
+
+
+def test_ready_y_status():
+    migrations.migrate()
+    assert migrations.migrate() == []
+    st = migrations.status()
+    assert st["current"] == migrations.LATEST and st["pending"] == []
+    r = TestClient(app).get("/ready")
+    assert r.status_code == 200
+    assert r.json()["schema_version"] == migrations.LATEST
+
+
+def test_migracion_3_completa_caracteristicas_de_filas_antiguas():
+    from app.db import transaction
+    from app.kb import load_products, invalidate_products
+    migrations.migrate()
+    with transaction() as conn:
+        cur = conn.cursor()
+        cur.execute("""INSERT INTO products (id, product_key, name, brand, category, cpu, gpu, ram, storage, os, price, url)
+                       VALUES ('legacy-1', 'legacy|1', 'Legacy 1', 'Legacy', 'Laptop', 'Intel Core i7-1260P',
+                               'NVIDIA RTX 3060', '16GB', '1TB SSD', '', 900, '');""")
+        migrations._backfill_features(cur)
+        cur.execute("SELECT ram_gb, storage_gb FROM products WHERE id='legacy-1';")
+        assert tuple(cur.fetchone()) == (16, 1024)
+    invalidate_products()
+    fila = next(p for p in load_products() if p["id"] == "legacy-1")
+    assert fila["ram_gb"] == 16 and fila["cpu_score"] > 0
+
+
+_CICLO_DE_VIDA = """
+import json, threading, time
+from fastapi.testclient import TestClient
+from app.main import app
+vivos = lambda: sorted(t.name for t in threading.enumerate() if t.name.startswith("seac-feedback"))
+with TestClient(app) as c:
+    for _ in range(50):
+        if c.get("/ready").status_code == 200:
+            break
+        time.sleep(0.1)
+    durante = {"ready": c.get("/ready").status_code, "cola": vivos()}
+time.sleep(0.2)
+print(json.dumps({"durante": durante, "despues": vivos()}))
+"""
+
+
+def test_lifespan_migra_arranca_y_cierra(tmp_path):
+    env = dict(os.environ, SEAC_DB_BACKEND="sqlite", SEAC_SQLITE_PATH=str(tmp_path / "vida.db"),
+               SEAC_LOG_LEVEL="WARNING")
+    r = subprocess.run([sys.executable, "-c", _CICLO_DE_VIDA], env=env, capture_output=True, text=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)), timeout=60)
+    assert r.returncode == 0, r.stderr
+    out = json.loads(r.stdout.strip().splitlines()[-1])
+    assert out["durante"] == {"ready": 200, "cola": ["seac-feedback"]}
+    assert out["despues"] == []
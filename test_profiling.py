@@ -0,0 +1,134 @@
+# Perfilado por petición: árbol de spans (cabecera X-SEAC-Profile) y perfil de CPU
+# del scoring. Groq en modo replay sin cassettes → cae al catálogo local sin red.
+# Ejecutar con: python -m pytest -q test_profiling.py
+import importlib
+import os
+import pstats
+import tempfile
+
+os.environ.setdefault("SEAC_DB_BACKEND", "sqlite")
+os.environ.setdefault("SEAC_SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="seac-test-"), "seac.db"))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import main, profiling  # noqa: E402
+from app.connectors import transport  # noqa: E402
+from app.inference import infer  # noqa: E402
+from app.kb import invalidate_products  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.persistence_sql import upsert_products  # noqa: E402
+
+migrate()
+
+
+@pytest.fixture(scope="module")
+def app_perfilado():
+    # SEAC_PROFILE se lee al importar app.main: solo este módulo recarga la app con el
+    # perfilado activo y al terminar la deja como estaba (desactivado por defecto).
+    mp = pytest.MonkeyPatch()
+    mp.setenv("SEAC_PROFILE", "1")
+    yield importlib.reload(main).app
+    mp.undo()
+    importlib.reload(main)
+
+
+@pytest.fixture(autouse=True)
+def sin_red(tmp_path, monkeypatch):
+    monkeypatch.setattr(transport, "_transport", transport.Transport(mode="replay", cassette_dir=str(tmp_path)))
+    upsert_products([
+        {"id": f"prof-{i}", "name": f"Perfil {i}", "brand": "Profilia", "category": "laptop",
+         "cpu": "Intel Core i5", "gpu": "Intel Iris Xe", "ram": "16GB", "storage": "512GB SSD",
+         "os": "Windows 11", "price": 700 + i, "url": ""}
+        for i in range(3)
+    ])
+    invalidate_products()  # upsert_products no toca la instantánea: otros módulos pudieron cargarla antes
+
+
+def test_desactivado_por_defecto():
+    assert not any(getattr(r, "path", "").startswith("/debug") for r in main.app.routes)
+
+
+def test_span_tree_por_cabecera(app_perfilado, monkeypatch):
+    client = TestClient(app_perfilado)
+    consulta = {"uso": "oficina perfilado", "presupuesto": 800, "top_k": 3}
+    assert "X-SEAC-Profile-Id" not in client.post("/infer", json=consulta).headers
+
+    # Sin token: solo conexiones locales directas (ngrok reenvía desde 127.0.0.1 con X-Forwarded-For)
+    assert profiling.authorized("127.0.0.1", {})
+    assert not profiling.authorized("127.0.0.1", {"x-forwarded-for": "203.0.113.7"})
+    # TestClient no es una conexión local: sin token la cabecera se ignora y /debug responde 403
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secreto")
+    assert "X-SEAC-Profile-Id" not in client.post("/infer", json=consulta, headers={"X-SEAC-Profile": "1"}).headers
+    assert client.get("/debug/profile/no-existe").status_code == 403
+    client.headers["X-SEAC-Profile-Token"] = "secreto"
+
+    r = client.post("/infer", json=consulta, headers={"X-SEAC-Profile": "1"})
+    assert r.status_code == 200
+    timing = r.headers["Server-Timing"]
+    assert "prof.request;dur=" in timing
+    assert "prof.request.persistence.db.add_session" in timing
+
+    arbol = client.get(f"/debug/profile/{r.headers['X-SEAC-Profile-Id']}").json()["tree"]
+    assert arbol["name"] == "request"
+    nombres = [c["name"] for c in arbol["children"]]
+    assert "persistence" in nombres
+    assert nombres.count("explain") + sum(
+        [g["name"] for g in c["children"]].count("explain") for c in arbol["children"]) == 3
+    assert client.get("/debug/profile/no-existe").status_code == 404
+
+
+def test_cpu_profile_del_scoring(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    with profiling.span("fuera"):
+        pass  # sin perfil activo: no hace nada
+    with profiling.profile("request", cpu=True) as prof:
+        assert infer({"uso": "oficina", "presupuesto": 800, "top_k": 2})
+    assert len(prof.cpu_dumps) == 1
+    stats = pstats.Stats(prof.cpu_dumps[0])
+    assert any(fn == "rank_catalog" for (_, _, fn) in stats.stats)
+    assert [c["name"] for c in prof.to_dict()["tree"]["children"]][-3:] == ["columnar", "cbr", "scoring"]
+
+
+def test_respaldo_local_igual_en_ambos_modos(monkeypatch):
+    import asyncio
+    from app import inference_net
+    upsert_products([
+        {"id": f"resp-{i}", "name": f"Respaldo {i}", "brand": "Respaldia", "category": "laptop",
+         "cpu": "Intel Core i7", "gpu": "Intel Iris Xe", "ram": "16GB", "storage": "512GB SSD",
+         "os": "Windows 11", "price": 750 + i, "url": ""}
+        for i in range(3)
+    ])
+    invalidate_products()
+    consulta = {"uso": "oficina", "presupuesto": 800, "top_k": 3}
+    esperado = [p["id"] for p in inference_net._ranking_local(consulta, 800, 3)]
+    assert esperado
+    assert [r["product"]["id"] for r in inference_net.infer_hibrido(dict(consulta))] == esperado
+    for modo in ("groq", "hedged"):
+        monkeypatch.setattr(inference_net, "INFER_MODE", modo)
+        res = asyncio.run(inference_net.infer_hibrido_async(dict(consulta)))
+        assert [r["product"]["id"] for r in res] == esperado, modo
+
+
+def test_semaforo_de_explicaciones_por_loop(monkeypatch):
+    import asyncio
+    from app import inference_net
+    monkeypatch.setattr(inference_net, "EXPLAIN_WORKERS", 1)
+    en_curso, maximo = 0, 0
+
+    async def lenta(nombre, razones, uso):
+        nonlocal en_curso, maximo
+        en_curso += 1
+        maximo = max(maximo, en_curso)
+        await asyncio.sleep(0.01)
+        en_curso -= 1
+        return nombre
+
+    monkeypatch.setattr(inference_net, "summarize_reasons_groq_async", lenta)
+
+    async def tres():
+        return await asyncio.gather(*(inference_net._explicar_async(f"p{i}", [], "oficina") for i in range(3)))
+
+    # Dos loops seguidos (como dos asyncio.run): el segundo no reutiliza el semáforo del primero
+    assert asyncio.run(tres()) == asyncio.run(tres()) == ["p0", "p1", "p2"]
+    assert maximo == 1
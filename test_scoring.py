@@ -0,0 +1,76 @@
+# Paridad entre el puntaje vectorizado (NumPy) y score_candidate.
+# Ejecutar con: python -m pytest -q test_scoring.py   (o python test_scoring.py)
+import random
+
+from app.rules import USO_MIN_REQ, gama_to_price_range
+from app.scoring import ColumnarCatalog, score_candidate, rank_catalog
+
+MARCAS = ["Lenovo", "ASUS", "HP", "Dell", "Acer", "MSI", "Apple", "lenovo"]
+
+
+def _catalogo(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "id": f"p{i}", "name": f"Modelo {i}", "brand": rnd.choice(MARCAS), "category": "Laptop",
+            "cpu": "", "gpu": "", "ram": "", "storage": "", "os": "", "url": "",
+            # precios repetidos a propósito para forzar empates
+            "price": float(rnd.choice([299, 450, 699.99, 700, 899, 1200, 1500, 2500])),
+            "cpu_score": float(rnd.choice([0, 25, 48, 55, 66, 80, 90])),
+            "gpu_score": float(rnd.choice([0, 15, 38, 52, 72, 92])),
+            "ram_gb": float(rnd.choice([4, 8, 12, 13, 16, 32])),
+            "storage_gb": float(rnd.choice([128, 256, 410, 512, 1024])),
+        })
+    return rows
+
+
+def _referencia(rows, q, weights, sim_cbr, k):
+    """Implementación original: bucle + sort completo."""
+    gama = (q.get("gama") or "").lower().strip()
+    if gama in ["baja", "media", "alta"]:
+        lo, hi = gama_to_price_range(gama)
+        candidates = [p for p in rows if lo <= p["price"] <= hi] or rows
+    else:
+        candidates = rows
+    scored = []
+    for p in candidates:
+        s, reasons = score_candidate(p, q, weights)
+        score_total = (s * 0.8) + (sim_cbr * 0.2)
+        reasons.append(f"Ajuste CBR (+{round(sim_cbr*100)}% de similitud con casos previos)")
+        scored.append({"product": p, "score": round(float(score_total), 4), "reasons": reasons})
+    scored.sort(key=lambda x: x["score"], reverse=True)
+    return scored[:k]
+
+
+def test_paridad_con_score_candidate():
+    rows = _catalogo(600)
+    cat = ColumnarCatalog.from_rows(rows)
+    pesos = [{}, {"presupuesto": 1.7, "uso": 0.4, "preferencia_marca": 0.9}]
+    for uso in list(USO_MIN_REQ) + ["otro"]:
+        for gama in ["", "baja", "media", "alta", "x"]:
+            for presupuesto in [350.0, 700.0, 1199.5, 2000.0]:
+                for marca in [None, "lenovo", "Apple"]:
+                    for w in pesos:
+                        q = {"uso": uso, "gama": gama, "presupuesto": presupuesto,
+                             "preferencias": {"marca": marca}, "top_k": 10}
+                        for sim in (0.0, 0.437):
+                            rango = gama_to_price_range(gama) if gama in ("baja", "media", "alta") else None
+                            got = rank_catalog(cat, q, w, sim, 10, rango)
+                            exp = _referencia(rows, q, w, sim, 10)
+                            assert [g["product"]["id"] for g in got] == [e["product"]["id"] for e in exp]
+                            assert [g["score"] for g in got] == [e["score"] for e in exp]
+                            assert [g["reasons"] for g in got] == [e["reasons"] for e in exp]
+
+
+def test_catalogo_vacio_y_k_mayor_que_n():
+    assert rank_catalog(ColumnarCatalog.from_rows([]), {"uso": "gaming", "presupuesto": 500.0}, {}, 0.0, 3) == []
+    rows = _catalogo(2)
+    got = rank_catalog(ColumnarCatalog.from_rows(rows), {"uso": "gaming", "presupuesto": 500.0}, {}, 0.0, 10)
+    assert len(got) == 2
+
+
+if __name__ == "__main__":
+    test_paridad_con_score_candidate()
+    test_catalogo_vacio_y_k_mayor_que_n()
+    print("✅ Puntaje vectorizado idéntico a score_candidate.")
@@ -0,0 +1,143 @@
+# Persistencia sobre el motor SQLite (sin SQL Server): upserts por product_key,
+# feedback por lotes, favoritos, pesos y transacciones concurrentes.
+# Ejecutar con: python -m pytest -q test_storage_sqlite.py
+import os
+import tempfile
+import threading
+
+import pytest
+
+# El motor se elige al importar app.db
+_tmp = tempfile.mkdtemp(prefix="seac-test-")
+os.environ["SEAC_DB_BACKEND"] = "sqlite"
+os.environ["SEAC_SQLITE_PATH"] = os.path.join(_tmp, "seac.db")
+
+from app.db import get_conn, transaction, storage  # noqa: E402
+from app.migrations import migrate  # noqa: E402
+from app.kb import get_catalog, invalidate_products  # noqa: E402
+from app.persistence_sql import (  # noqa: E402
+    add_feedback, add_or_update_product, add_session, load_weights, save_weights,
+    upsert_products, write_feedback_batch,
+)
+
+migrate()
+
+
+def _scalar(sql, params=()):
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        return cur.fetchone()[0]
+
+
+def test_backend_wal():
+    assert storage.name == "sqlite"
+    assert _scalar("PRAGMA journal_mode;") == "wal"
+
+
+def test_motor_incompleto_falla_al_instanciar():
+    from app.storage.base import Storage
+    from app.storage.sqlite import SQLiteStorage
+
+    class SinBloqueo(SQLiteStorage):
+        migration_lock = Storage.migration_lock
+
+    with pytest.raises(TypeError, match="migration_lock"):
+        SinBloqueo()
+
+
+def test_upsert_por_product_key_completa_campos_vacios():
+    assert add_or_update_product({"id": "t-1", "name": "TUF Gaming F15", "brand": "ASUS", "price": 999}) == "t-1"
+    # Otro id, mismo producto escrito distinto → misma fila; solo se completan campos vacíos
+    assert add_or_update_product({"id": "groq-1", "name": "tuf  gaming F15", "brand": "asus",
+                                  "cpu": "i7-12700H", "price": 1}) == "t-1"
+    with get_conn() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT name, brand, cpu, price, cpu_score FROM products WHERE id='t-1';")
+        name, brand, cpu, price, cpu_score = cur.fetchone()
+    assert (name, brand, cpu, price) == ("TUF Gaming F15", "ASUS", "i7-12700H", 999.0)
+    assert cpu_score > 0
+    assert _scalar("SELECT COUNT(*) FROM products WHERE product_key='asus|tuf gaming f15';") == 1
+
+
+def test_placeholder_se_completa():
+    add_session("s-ph", "oficina", 500)
+    add_feedback("s-ph", "t-ph", "oficina", 0.5)
+    assert add_or_update_product({"id": "t-ph", "name": "ThinkPad E14", "brand": "Lenovo"}) == "t-ph"
+    assert _scalar("SELECT brand FROM products WHERE id='t-ph';") == "Lenovo"
+
+
+
+def test_id_de_groq_como_texto_se_resuelve_por_la_sesion():
+    from app import session_cache
+    assert add_or_update_product({"id": "t-legion", "name": "Legion 5", "brand": "Lenovo",
+                                  "cpu": "AMD Ryzen 7 5800H", "gpu": "NVIDIA RTX 3060"}) == "t-legion"
+    invalidate_products()
+    add_session("s-groq", "gaming", 1200)
+    session_cache.remember("s-groq", {"id": "groq-ab12cd", "name": "Legion 5", "brand": "Lenovo",
+                                      "cpu": "Ryzen 7 5800H", "gpu": "RTX 3060"}, "groq")
+    add_feedback("s-groq", "groq-ab12cd", "gaming", 0.9)
+    assert _scalar("SELECT product_id FROM feedback WHERE session_id='s-groq';") == "t-legion"
+    assert _scalar("SELECT COUNT(*) FROM products WHERE id='groq-ab12cd';") == 0
+
+def test_lote_de_feedback_y_favoritos():
+    with get_conn() as conn:
+        uid = storage.insert_returning_id(conn.cursor(), "users", ("email", "password"), ("lote@seac", "x"))
+    producto = {"id": "groq-lote", "name": "Aspire 5", "brand": "Acer"}
+    entries = [
+        {"session_id": "s-lote", "uso": "oficina", "rating": 1.0, "user_id": uid, "product": producto, "upsert": True},
+        {"session_id": "s-lote", "uso": "oficina", "rating": 0.9, "user_id": uid,
+         "product": {**producto, "id": "groq-lote-2", "name": "aspire 5"}, "upsert": True},
+    ]
+    assert write_feedback_batch(entries) == 2
+    assert _scalar("SELECT COUNT(*) FROM feedback WHERE session_id='s-lote';") == 2
+    # Las dos variantes son el mismo producto → un solo favorito
+    assert _scalar("SELECT COUNT(*) FROM favorites WHERE user_id=?;", (uid,)) == 1
+    invalidate_products()
+    assert get_catalog().find("Aspire 5", "Acer")["id"] == "groq-lote"
+
+
+
+def test_entrada_invalida_no_descarta_el_lote():
+    from app.feedback_queue import FeedbackQueue
+    q = FeedbackQueue(write_feedback_batch, batch_size=10, interval=0.05, retries=1)
+    producto = {"id": "t-veneno", "name": "Vivobook 15", "brand": "ASUS"}
+    for i in range(6):
+        q.put({"session_id": f"s-veneno-{i}", "uso": "oficina", "rating": "no-es-un-numero" if i == 3 else 0.5,
+               "user_id": None, "product": producto, "upsert": True})
+    assert q.flush()
+    q.stop()
+    assert _scalar("SELECT COUNT(*) FROM feedback WHERE session_id LIKE 's-veneno-%';") == 5
+    assert q.stats()["written"] == 5 and q.stats()["failed"] == 1
+
+def test_pesos_upsert():
+    save_weights({"gaming": {"presupuesto": 1.1, "uso": 1.2, "preferencia_marca": 0.4}})
+    save_weights({"gaming": {"presupuesto": 1.3, "uso": 1.2, "preferencia_marca": 0.4}})
+    assert load_weights()["gaming"]["presupuesto"] == 1.3
+
+
+def test_transaccion_revierte_y_concurrencia():
+    try:
+        with transaction() as conn:
+            conn.cursor().execute("INSERT INTO weights (uso, w_presupuesto) VALUES ('tmp', 1);")
+            raise RuntimeError("abortar")
+    except RuntimeError:
+        pass
+    assert _scalar("SELECT COUNT(*) FROM weights WHERE uso='tmp';") == 0
+
+    errores = []
+
+    def cargar(n):
+        try:
+            upsert_products([{"id": f"c-{n}-{i}", "name": f"Modelo {i}", "brand": "HP"} for i in range(50)])
+        except Exception as e:  # pragma: no cover - se reporta abajo
+            errores.append(e)
+
+    hilos = [threading.Thread(target=cargar, args=(n,)) for n in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert not errores
+    # Mismos modelos desde 8 hilos → una fila por product_key
+    assert _scalar("SELECT COUNT(*) FROM products WHERE brand='HP';") == 50